@@ -1,3 +1,194 @@
-from django.contrib import admin
+import uuid
+from decimal import Decimal
 
-# Register your models here.
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import DecimalField, F, Q, Value
+from django.db.models.functions import Coalesce, Round
+from django.utils.functional import cached_property
+
+from .models import Product, ProductVariant, Category, Subcategory, Brand, Size, Color, Tag
+
+# Below this many rows an exact COUNT(*) is cheap enough
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Use the planner's row estimate (pg_class.reltuples) instead of COUNT(*)
+    for unfiltered changelists on large Postgres tables. Filtered or small
+    result sets are still counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            # reltuples is -1 until the table is first analyzed
+            if row and row[0] >= ESTIMATED_COUNT_THRESHOLD:
+                return int(row[0])
+        return super().count
+
+
+class ProductActionForm(ActionForm):
+    percent = forms.DecimalField(
+        required=False, min_value=Decimal('0.01'), max_value=Decimal('99.99'), decimal_places=2,
+        help_text="Discount for “Put on sale”",
+    )
+
+
+class FilterAdmin(admin.ModelAdmin):
+    list_display = ['name', 'product_count']
+    search_fields = ['name']
+    ordering = ['name']
+
+
+class ProductVariantForm(forms.ModelForm):
+    adjustment = forms.IntegerField(required=False, help_text="Units to add, or negative to remove")
+
+    class Meta:
+        model = ProductVariant
+        fields = ['sku', 'size', 'color', 'priceOverride']
+
+    def clean_adjustment(self):
+        adjustment = self.cleaned_data['adjustment']
+        if adjustment and adjustment < -self.instance.stock:
+            raise ValidationError(f"Only {self.instance.stock} in stock")
+        return adjustment
+
+    def save(self, commit=True):
+        # Stock is reserved concurrently: never write back the value read
+        # with the form, apply the adjustment as a delta instead
+        variant = super().save(commit=False)
+        if commit:
+            if variant._state.adding:
+                variant.save()
+            else:
+                variant.save(update_fields=[name for name in self.changed_data if name != 'adjustment'])
+            if self.cleaned_data.get('adjustment'):
+                ProductVariant.objects.adjust(variant.pk, self.cleaned_data['adjustment'])
+        return variant
+
+
+class ProductVariantInline(admin.TabularInline):
+    model = ProductVariant
+    form = ProductVariantForm
+    extra = 0
+    autocomplete_fields = ['size', 'color']
+    fields = ['sku', 'size', 'color', 'stock', 'adjustment', 'priceOverride']
+    readonly_fields = ['stock']
+
+
+@admin.register(Product)
+class ProductAdmin(admin.ModelAdmin):
+    list_display = ['name', 'category', 'subcategory', 'brand', 'price', 'originalPrice', 'inStock', 'updatedAt']
+    # Subcategory.__str__ reads its category
+    list_select_related = ['category', 'subcategory__category', 'brand']
+    list_filter = ['inStock', 'category']
+    # See get_search_results
+    search_fields = ['^name']
+    autocomplete_fields = ['category', 'subcategory', 'brand', 'sizes', 'colors', 'tags']
+    readonly_fields = ['discountPercent', 'hasVariants', 'viewCount', 'createdAt', 'updatedAt']
+    inlines = [ProductVariantInline]
+    sortable_by = ['name', 'price', 'updatedAt']
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    action_form = ProductActionForm
+    actions = ['mark_in_stock', 'mark_out_of_stock', 'put_on_sale', 'end_sale']
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        One prefix match on the whole term (product_name_prefix_idx on
+        Postgres), or'ed with the primary key when the term is a UUID.
+        Both conditions use an index, unlike the admin's per-word search
+        and '=id', which compares the id cast to text.
+        """
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        condition = Q(name__istartswith=term)
+        try:
+            condition |= Q(pk=uuid.UUID(term))
+        except ValueError:
+            pass
+        return queryset.filter(condition), False
+
+    def manually_stocked(self, request, queryset):
+        """
+        The products in `queryset` whose inStock is set by hand. For products
+        with variants or a StockItem it follows their stock, so those are
+        left out (and counted in a warning).
+        """
+        derived = Q(hasVariants=True) | Q(stock__isnull=False)
+        skipped = queryset.filter(derived).count()
+        if skipped:
+            self.message_user(
+                request, f"Skipped {skipped} product(s) whose stock status follows their stock levels.",
+                messages.WARNING,
+            )
+        return queryset.exclude(derived)
+
+    @admin.action(description="Mark selected products in stock")
+    def mark_in_stock(self, request, queryset):
+        updated = Product.objects.update_and_record(self.manually_stocked(request, queryset), inStock=True)
+        self.message_user(request, f"{updated} product(s) marked in stock.", messages.SUCCESS)
+
+    @admin.action(description="Mark selected products out of stock")
+    def mark_out_of_stock(self, request, queryset):
+        updated = Product.objects.update_and_record(self.manually_stocked(request, queryset), inStock=False)
+        self.message_user(request, f"{updated} product(s) marked out of stock.", messages.SUCCESS)
+
+    @admin.action(description="Put selected products on sale (percent off)")
+    def put_on_sale(self, request, queryset):
+        try:
+            percent = self.action_form.base_fields['percent'].clean(request.POST.get('percent'))
+        except ValidationError:
+            percent = None
+        if percent is None:
+            self.message_user(request, "Enter a discount percent between 0.01 and 99.99.", messages.ERROR)
+            return
+
+        # Discount from the list price; products already on sale keep theirs
+        list_price = Coalesce(F('originalPrice'), F('price'))
+        sale_price = Round(
+            list_price * Value((100 - percent) / 100, output_field=DecimalField()),
+            2,
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        )
+        updated = Product.objects.update_and_record(queryset, originalPrice=list_price, price=sale_price)
+        self.message_user(request, f"{updated} product(s) put on sale at {percent}% off.", messages.SUCCESS)
+
+    @admin.action(description="End sale for selected products")
+    def end_sale(self, request, queryset):
+        updated = Product.objects.update_and_record(
+            queryset.filter(originalPrice__isnull=False), price=F('originalPrice'), originalPrice=None,
+        )
+        self.message_user(request, f"{updated} product(s) back at list price.", messages.SUCCESS)
+
+
+@admin.register(Subcategory)
+class SubcategoryAdmin(FilterAdmin):
+    list_display = ['name', 'category', 'product_count']
+    list_filter = ['category']
+    search_fields = ['name', 'category__name']
+    autocomplete_fields = ['category']
+
+
+admin.site.register(Category, FilterAdmin)
+admin.site.register(Brand, FilterAdmin)
+admin.site.register(Size, FilterAdmin)
+admin.site.register(Color, FilterAdmin)
+admin.site.register(Tag, FilterAdmin)
@@ -0,0 +1,196 @@
+# cache.py
+"""
+Catalog response caching.
+
+Cached entries are keyed by a global catalog version that is bumped after
+any catalog write commits, so invalidation is a single UPDATE and stale
+entries simply age out. The version lives in the database (a
+CatalogCounter row) rather than in the cache, so every worker and process
+sees a bump even when each has its own LocMemCache; each process re-reads
+it at most every CATALOG_VERSION_CHECK_INTERVAL seconds.
+"""
+import re
+import time
+from collections import Counter
+from functools import wraps
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.urls import Resolver404, resolve
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from config.db_router import primary_reads
+
+# CatalogCounter bumped on every catalog change
+VERSION_COUNTER = 'catalog_version'
+
+# This process's copy of the version and when to re-read it
+_version = {'value': 0, 'expires': 0.0}
+
+
+def get_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def catalog_version():
+    now = time.monotonic()
+    if now >= _version['expires']:
+        from .models import CatalogCounter
+
+        with primary_reads():
+            _version['value'] = CatalogCounter.objects.value(VERSION_COUNTER)
+        _version['expires'] = now + settings.CATALOG_VERSION_CHECK_INTERVAL
+    return _version['value']
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog response once the current transaction commits."""
+    transaction.on_commit(_bump)
+
+
+def _bump():
+    from .models import CatalogCounter
+
+    CatalogCounter.objects.advance(VERSION_COUNTER)
+    # This process serves the change right away; others within the interval
+    _version['expires'] = 0.0
+
+
+def response_cache_key(request):
+    """
+    Key on the absolute URL with the query string sorted, so parameter order
+    doesn't split entries. The host and scheme are part of the key because
+    paginated responses embed absolute next/previous links.
+    """
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    url = request.build_absolute_uri(request.path)
+    return f'catalog:v{catalog_version()}:response:{url}?{query}'
+
+
+def cached_response(view):
+    """
+    Cache successful GET responses of a catalog view by URL.
+
+    Wraps the undecorated view (inside @api_view) or a ViewSet method and
+    stores `response.data`, so content negotiation and rendering still
+    happen per request. Misses are filled from the primary: right after a
+    bump a lagging replica would otherwise get cached under the new version.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # (request, ...) for function views, (self, request, ...) for methods
+        request = args[0] if isinstance(args[0], Request) else args[1]
+        if request.method != 'GET':
+            return view(*args, **kwargs)
+
+        cache = get_cache()
+        key = response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        with primary_reads():
+            response = view(*args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.CATALOG_CACHE_TIMEOUT)
+        return response
+
+    return wrapper
+
+
+def cached_blob(name, build):
+    """
+    Pre-serialized bytes from `build()` for the current catalog version.
+    Built once per catalog change (from the primary, see cached_response);
+    every other request is one cache get.
+    """
+    cache = get_cache()
+    key = f'catalog:v{catalog_version()}:blob:{name}'
+    blob = cache.get(key)
+    if blob is None:
+        with primary_reads():
+            blob = build()
+        cache.set(key, blob, settings.CATALOG_CACHE_TIMEOUT)
+    return blob
+
+
+def product_cache_key(product_id, updated_at, variant):
+    """
+    Per-product payload key. The payload embeds brand, category and
+    subcategory names, which change without touching the product, so the
+    key carries the catalog version too; updatedAt still catches product
+    writes made with queryset.update().
+    """
+    return f'catalog:v{catalog_version()}:product:{product_id}:{updated_at.timestamp()}:{variant}'
+
+
+# Warm-up
+
+# URL names whose views go through cached_response
+CACHEABLE_URL_NAMES = {
+    'filters', 'categories-all', 'categories-tree', 'subcategories-all', 'brands-all', 'sizes-all', 'colors-all',
+    'tags-all', 'product-list', 'product-related',
+}
+
+ACCESS_LOG_REQUEST = re.compile(r'"GET (?P<url>/\S*) HTTP/[\d.]+" 200 ')
+
+
+def is_cacheable(url):
+    try:
+        match = resolve(urlsplit(url).path)
+    except Resolver404:
+        return False
+    return match.url_name in CACHEABLE_URL_NAMES
+
+
+def default_warm_urls(top):
+    """
+    CATALOG_CACHE_WARM_URLS, plus the first product page of the `top`
+    largest categories in each CATALOG_CACHE_WARM_SORTS order.
+    """
+    from .models import Category
+
+    urls = list(settings.CATALOG_CACHE_WARM_URLS)
+    categories = Category.objects.order_by('-product_count').values_list('name', flat=True)[:top]
+    for name in categories:
+        for sort in settings.CATALOG_CACHE_WARM_SORTS:
+            field, _, direction = sort.partition(':')
+            query = {'category': name, 'sortField': field, 'sortDirection': direction or 'desc'}
+            urls.append(f'/api/products/?{urlencode(query)}')
+    return urls
+
+
+def access_log_urls(lines, top):
+    """The `top` most requested cacheable URLs in a gunicorn/nginx access log."""
+    counts = Counter(
+        match['url'] for match in map(ACCESS_LOG_REQUEST.search, lines) if match
+    )
+    return [url for url, _ in counts.most_common() if is_cacheable(url)][:top]
+
+
+def warm(urls, base_url):
+    """
+    Render each URL through its view so the response lands in the cache
+    under the same key a real request to `base_url` would use. Returns
+    (url, status) pairs.
+    """
+    from django.test import RequestFactory
+
+    base = urlsplit(base_url)
+    factory = RequestFactory()
+    results = []
+    for url in urls:
+        parts = urlsplit(url)
+        if not is_cacheable(parts.path):
+            results.append((url, None))
+            continue
+        request = factory.get(
+            f'{parts.path}?{parts.query}', secure=base.scheme == 'https', HTTP_HOST=base.netloc
+        )
+        match = resolve(parts.path)
+        response = match.func(request, *match.args, **match.kwargs)
+        results.append((url, response.status_code))
+    return results
@@ -0,0 +1,249 @@
+# feeds.py
+"""
+Sitemaps and a product feed for the whole catalog, as static gzip files.
+
+Products are split, in primary key order, into chunks of at most
+CATALOG_FEEDS_CHUNK_SIZE (50k URLs, the sitemap limit). Each chunk is
+written to a sitemap file and a Google Shopping style RSS feed file, and
+sitemap.xml indexes the sitemap files. Rows are streamed from the database
+with iterator() (a server-side cursor on PostgreSQL) straight into the
+gzip files, so memory use doesn't grow with the catalog.
+
+manifest.json records each chunk's first product id and the ProductChange
+cursor the files reflect. An incremental run only rewrites the chunks that
+contain changed or deleted products. New (time-ordered) ids land in the
+last chunk, which is split when it fills up.
+
+The files live in CATALOG_FEEDS_ROOT and are served at CATALOG_FEEDS_URL by
+config.middleware.FeedFilesMiddleware.
+"""
+import bisect
+import gzip
+import json
+import os
+import uuid
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.utils import timezone
+
+MANIFEST = 'manifest.json'
+SITEMAP_INDEX = 'sitemap.xml'
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+GOOGLE_NS = 'http://base.google.com/ns/1.0'
+
+FEED_COLUMNS = (
+    'pk', 'name', 'description', 'price', 'originalPrice', 'image', 'inStock', 'updatedAt',
+    'brand__name', 'category__name', 'subcategory__name',
+)
+
+
+def sitemap_name(index):
+    return f'sitemap-products-{index + 1:04d}.xml.gz'
+
+
+def feed_name(index):
+    return f'feed-products-{index + 1:04d}.xml.gz'
+
+
+def feed_url(name):
+    return f"{settings.CATALOG_FEEDS_BASE_URL.rstrip('/')}/{name}"
+
+
+def product_url(product_id):
+    return settings.CATALOG_PRODUCT_URL.format(id=product_id)
+
+
+class FeedBuilder:
+    def __init__(self, root=None):
+        self.root = root or settings.CATALOG_FEEDS_ROOT
+        self.chunk_size = settings.CATALOG_FEEDS_CHUNK_SIZE
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def load_manifest(self):
+        try:
+            with open(self.path(MANIFEST)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('chunkSize') != self.chunk_size:
+            return None
+        return manifest
+
+    def save_manifest(self, manifest):
+        self.replace(MANIFEST, json.dumps(manifest, indent=1).encode())
+
+    def replace(self, name, data):
+        """Write a file atomically, so a request never sees it half written."""
+        tmp = self.path(f'.{name}.tmp')
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, self.path(name))
+
+    # Building
+
+    def build(self, full=False):
+        """
+        Bring the files up to date. Returns the indexes of the chunks that
+        were (re)written.
+        """
+        from .models import ProductChange
+
+        os.makedirs(self.root, exist_ok=True)
+        cursor = ProductChange.objects.sequence()
+
+        manifest = None if full else self.load_manifest()
+        if manifest is None:
+            chunks = self.write_chunks(None, 0)
+            written = range(len(chunks))
+        else:
+            chunks = manifest['chunks']
+            changed = ProductChange.objects.filter(seq__gt=manifest['cursor'], seq__lte=cursor)
+            dirty = {self.chunk_of(chunks, product_id) for product_id in changed.values_list('product_id', flat=True)}
+            written = sorted(dirty)
+            for index in written:
+                if index == len(chunks) - 1:
+                    # The last chunk runs to the end and splits when it fills up
+                    chunks[index:] = self.write_chunks(chunks[index]['start'], index)
+                    written = [*written[:-1], *range(index, len(chunks))]
+                else:
+                    chunk = self.write_chunk(index, chunks[index]['start'], chunks[index + 1]['start'])
+                    if chunk is None:
+                        # A middle chunk outgrew the limit (only with random ids)
+                        return self.build(full=True)
+                    chunks[index] = chunk
+
+        self.remove_stale(len(chunks))
+        self.write_index(chunks)
+        self.save_manifest({
+            'chunkSize': self.chunk_size, 'cursor': cursor, 'chunks': chunks,
+            'generatedAt': timezone.now().isoformat(),
+        })
+        return list(written)
+
+    @staticmethod
+    def chunk_of(chunks, product_id):
+        starts = [uuid.UUID(chunk['start']) for chunk in chunks[1:]]
+        return bisect.bisect_right(starts, product_id)
+
+    def products(self, start, stop):
+        """Feed rows with start <= pk < stop, in primary key order, streamed."""
+        from .models import Product
+
+        products = Product.objects.order_by('pk')
+        if start:
+            products = products.filter(pk__gte=start)
+        if stop:
+            products = products.filter(pk__lt=stop)
+        return products.values_list(*FEED_COLUMNS).iterator(chunk_size=2000)
+
+    def write_chunks(self, start, first_index):
+        """Write chunks from `start` to the end of the catalog; returns their manifest entries."""
+        chunks = []
+        writer = None
+        for row in self.products(start, None):
+            if writer is None or writer.count == self.chunk_size:
+                if writer:
+                    chunks.append(writer.close())
+                # The first chunk keeps its start (None: from the beginning)
+                writer = ChunkWriter(self, first_index + len(chunks), row[0] if writer else start)
+            writer.add(row)
+        if writer is None:
+            writer = ChunkWriter(self, first_index, start)
+        chunks.append(writer.close())
+        return chunks
+
+    def write_chunk(self, index, start, stop):
+        """Rewrite one bounded chunk; None if it no longer fits."""
+        writer = ChunkWriter(self, index, start)
+        for row in self.products(start, stop):
+            if writer.count == self.chunk_size:
+                writer.discard()
+                return None
+            writer.add(row)
+        return writer.close()
+
+    def remove_stale(self, count):
+        for name in os.listdir(self.root):
+            for prefix in ('sitemap-products-', 'feed-products-'):
+                if name.startswith(prefix) and name.endswith('.xml.gz'):
+                    if int(name[len(prefix):-len('.xml.gz')]) > count:
+                        os.remove(self.path(name))
+
+    def write_index(self, chunks):
+        entries = ''.join(
+            f"<sitemap><loc>{escape(feed_url(sitemap_name(index)))}</loc>"
+            + (f"<lastmod>{chunk['lastmod']}</lastmod>" if chunk['lastmod'] else '')
+            + "</sitemap>\n"
+            for index, chunk in enumerate(chunks)
+        )
+        data = (
+            f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NS}">\n{entries}</sitemapindex>\n'
+        ).encode()
+        # WhiteNoise serves the .gz next to it to clients that accept gzip
+        self.replace(SITEMAP_INDEX, data)
+        self.replace(f'{SITEMAP_INDEX}.gz', gzip.compress(data, mtime=0))
+
+
+class ChunkWriter:
+    """Streams one chunk's sitemap and feed into temporary gzip files."""
+
+    def __init__(self, builder, index, start):
+        self.builder = builder
+        self.names = (sitemap_name(index), feed_name(index))
+        self.start = str(start) if start else None
+        self.count = 0
+        self.lastmod = None
+        self.sitemap = gzip.open(builder.path(f'.{self.names[0]}.tmp'), 'wt', encoding='utf-8')
+        self.feed = gzip.open(builder.path(f'.{self.names[1]}.tmp'), 'wt', encoding='utf-8')
+        self.sitemap.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n')
+        self.feed.write(
+            f'<?xml version="1.0" encoding="UTF-8"?>\n<rss version="2.0" xmlns:g="{GOOGLE_NS}">\n<channel>\n'
+            f'<title>Products</title>\n<link>{escape(settings.CATALOG_FEEDS_BASE_URL)}</link>\n'
+        )
+
+    def add(self, row):
+        pk, name, description, price, original_price, image, in_stock, updated_at, brand, category, subcategory = row
+        url = escape(product_url(pk))
+        lastmod = updated_at.date().isoformat()
+        self.lastmod = max(self.lastmod or lastmod, lastmod)
+        self.count += 1
+
+        self.sitemap.write(f'<url><loc>{url}</loc><lastmod>{lastmod}</lastmod></url>\n')
+
+        currency = settings.CATALOG_FEED_CURRENCY
+        on_sale = original_price is not None and original_price > price
+        fields = [
+            ('g:id', pk),
+            ('g:title', name),
+            ('g:description', description),
+            ('g:link', product_url(pk)),
+            ('g:image_link', image),
+            ('g:availability', 'in_stock' if in_stock else 'out_of_stock'),
+            ('g:price', f'{original_price if on_sale else price} {currency}'),
+            ('g:sale_price', f'{price} {currency}' if on_sale else None),
+            ('g:brand', brand),
+            ('g:product_type', ' > '.join(filter(None, (category, subcategory)))),
+            ('g:condition', 'new'),
+        ]
+        self.feed.write(
+            '<item>' + ''.join(f'<{tag}>{escape(str(value))}</{tag}>' for tag, value in fields if value) + '</item>\n'
+        )
+
+    def close(self):
+        """Finish both files, move them into place and return the manifest entry."""
+        self.sitemap.write('</urlset>\n')
+        self.feed.write('</channel>\n</rss>\n')
+        self.sitemap.close()
+        self.feed.close()
+        for name in self.names:
+            os.replace(self.builder.path(f'.{name}.tmp'), self.builder.path(name))
+        return {'start': self.start, 'count': self.count, 'lastmod': self.lastmod}
+
+    def discard(self):
+        self.sitemap.close()
+        self.feed.close()
+        for name in self.names:
+            os.remove(self.builder.path(f'.{name}.tmp'))
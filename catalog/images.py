@@ -0,0 +1,65 @@
+# images.py
+from urllib.parse import quote
+
+from django.conf import settings
+
+
+def normalize_image_url(url):
+    """
+    Normalize an image URL so every product stores the same shape:
+    surrounding whitespace stripped and plain http upgraded to https.
+    """
+    if not url:
+        return ""
+    url = url.strip()
+    if url.startswith('//'):
+        return f'https:{url}'
+    if url.startswith('http://'):
+        return f'https://{url[len("http://"):]}'
+    return url
+
+
+def variant_url(url, width, height):
+    """
+    Build the CDN URL for a resized variant of an image.
+
+    IMAGE_VARIANT_URL is a template such as
+    'https://cdn.example.com/{width}x{height}/{url}' where {url} is the
+    percent-encoded source. Without a template the original URL is reused.
+    """
+    template = settings.CATALOG_IMAGE_VARIANT_URL
+    if not template:
+        return url
+    return template.format(url=quote(url, safe=''), width=width, height=height)
+
+
+def build_variants(url):
+    """
+    Return {variant_name: {url, width, height}} for a single image URL.
+    Without a CDN template every variant is the untouched original, whose
+    size is unknown, so width and height are left out.
+    """
+    if not settings.CATALOG_IMAGE_VARIANT_URL:
+        return {name: {'url': url} for name in settings.CATALOG_IMAGE_VARIANTS}
+    return {
+        name: {
+            'url': variant_url(url, width, height),
+            'width': width,
+            'height': height,
+        }
+        for name, (width, height) in settings.CATALOG_IMAGE_VARIANTS.items()
+    }
+
+
+def build_image_manifest(image, images):
+    """
+    Precompute resized variant URLs and dimensions for a product's images.
+    Generated at write time so list responses never compute it per row.
+    """
+    gallery = [normalize_image_url(url) for url in images or [] if url]
+    primary = normalize_image_url(image) or (gallery[0] if gallery else "")
+
+    return {
+        'primary': build_variants(primary) if primary else None,
+        'gallery': [build_variants(url) for url in gallery],
+    }
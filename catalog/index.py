@@ -0,0 +1,463 @@
+# index.py
+"""
+Optional in-process columnar index of the product catalog.
+
+When CATALOG_INDEX_ENABLED is set and numpy is installed, product list
+requests whose filters the index understands are answered from NumPy
+arrays held in each worker: the index evaluates filters and sorting and
+yields the page's ids, which are then hydrated from the database. Requests
+it can't answer (text search, variant-aware size/color filters) fall back
+to SQL.
+
+The index follows the ProductChange feed: a refresh, at most every
+CATALOG_INDEX_REFRESH_INTERVAL seconds and only when the catalog version
+(kept in the database, so writes from any process count) moved, patches
+the products changed since its last cursor. Builds and refreshes read the
+primary, like the feed cursor they start from.
+"""
+import functools
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+from config.db_router import primary_reads
+
+from .cache import catalog_version
+from .utils import parse_price_range
+
+# numpy, imported on first use by an enabled index (see load_numpy)
+np = None
+
+# sortField -> index column (see CatalogIndex.sort_keys)
+SORT_COLUMNS = {
+    'createdAt': 'created',
+    'name': 'name',
+    'price': 'price',
+    'rating': 'rating',
+    'brand': 'brand',
+    'discount': 'discount',
+}
+
+PRODUCT_COLUMNS = (
+    'id', 'name', 'price', 'discountPercent', 'rating', 'createdAt', 'inStock', 'hasVariants',
+    'category_id', 'subcategory_id', 'brand_id',
+)
+
+SCALAR_COLUMNS = (
+    'ids', 'alive', 'price', 'discount', 'rating', 'created', 'in_stock', 'has_variants',
+    'category', 'subcategory', 'brand',
+)
+BITSET_COLUMNS = ('size_bits', 'color_bits', 'tag_bits')
+
+
+def index_available():
+    return settings.CATALOG_INDEX_ENABLED and load_numpy()
+
+
+@functools.cache
+def load_numpy():
+    """Import numpy only once the index is used, so a disabled index costs nothing."""
+    global np
+    try:
+        import numpy
+    except ImportError:  # numpy is optional; the SQL path is always available
+        return False
+    np = numpy
+    return True
+
+
+class Codes:
+    """
+    Stable integer codes for the rows of a small filter table. Code 0 means
+    "none"; new rows get the next code, so existing encodings never move.
+    """
+
+    def __init__(self):
+        self.ids = [None]
+        self.names = ['']
+        self.code_of = {}
+
+    def update(self, rows):
+        for pk, name in rows:
+            code = self.code_of.get(pk)
+            if code is None:
+                self.code_of[pk] = len(self.ids)
+                self.ids.append(pk)
+                self.names.append(name)
+            else:
+                self.names[code] = name
+
+    def __len__(self):
+        return len(self.ids)
+
+    def code(self, pk):
+        return self.code_of.get(pk, 0)
+
+    def matching(self, predicate):
+        return [code for code, name in enumerate(self.names) if code and predicate(name)]
+
+    def ranks(self):
+        """Sort rank of each code by name; "none" sorts last."""
+        order = sorted(range(1, len(self.names)), key=self.names.__getitem__)
+        ranks = np.full(len(self.names), len(self.names), dtype=np.int32)
+        ranks[order] = np.arange(len(order), dtype=np.int32)
+        return ranks
+
+
+class CatalogIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checked_at = 0
+
+    # Building
+
+    def build(self):
+        """Load every product. Called on a fresh instance that isn't serving yet."""
+        from .models import Product, ProductChange
+
+        # Changes after this cursor are (re)applied on the next refresh
+        cursor = ProductChange.objects.sequence()
+        self.version = catalog_version()
+        self.categories, self.subcategories, self.brands = Codes(), Codes(), Codes()
+        self.sizes, self.colors, self.tags = Codes(), Codes(), Codes()
+        self.load_filters()
+
+        # Ordered by pk, so ids[:sorted_rows] can be binary searched
+        rows = list(Product.objects.order_by('pk').values_list(*PRODUCT_COLUMNS).iterator(chunk_size=5000))
+        self.allocate(len(rows))
+        self.sorted_rows = len(rows)
+        self.fill(range(len(rows)), rows)
+        self.load_options()
+
+        self.cursor = cursor
+        self.checked_at = time.monotonic()
+
+    def load_filters(self):
+        from .models import Category, Subcategory, Brand, Size, Color, Tag
+
+        for codes, model in (
+            (self.categories, Category), (self.subcategories, Subcategory), (self.brands, Brand),
+            (self.sizes, Size), (self.colors, Color), (self.tags, Tag),
+        ):
+            codes.update(model.objects.order_by('pk').values_list('pk', 'name'))
+        self.brand_ranks = self.brands.ranks()
+
+    def allocate(self, size):
+        self.ids = np.zeros(size, dtype='S16')
+        self.alive = np.zeros(size, dtype=bool)
+        self.names = [''] * size
+        self.price = np.zeros(size, dtype=np.float64)
+        self.discount = np.zeros(size, dtype=np.float32)
+        self.rating = np.zeros(size, dtype=np.float32)
+        self.created = np.zeros(size, dtype=np.int64)
+        self.in_stock = np.zeros(size, dtype=bool)
+        self.has_variants = np.zeros(size, dtype=bool)
+        self.category = np.zeros(size, dtype=np.int32)
+        self.subcategory = np.zeros(size, dtype=np.int32)
+        self.brand = np.zeros(size, dtype=np.int32)
+        for name, codes in zip(BITSET_COLUMNS, (self.sizes, self.colors, self.tags)):
+            setattr(self, name, np.zeros((size, (len(codes) + 63) // 64), dtype=np.uint64))
+        self._name_rank = None
+
+    def fill(self, positions, rows):
+        if not rows:
+            return
+        positions = np.asarray(positions, dtype=np.int64)
+        pks, names, price, discount, rating, created, in_stock, has_variants, category, subcategory, brand = zip(*rows)
+        self.ids[positions] = [pk.bytes for pk in pks]
+        self.alive[positions] = True
+        for position, name in zip(positions.tolist(), names):
+            self.names[position] = name
+        self.price[positions] = np.array(price, dtype=np.float64)
+        self.discount[positions] = [value or 0 for value in discount]
+        self.rating[positions] = np.array(rating, dtype=np.float64)  # None -> nan
+        self.created[positions] = [int(value.timestamp() * 1_000_000) for value in created]
+        self.in_stock[positions] = in_stock
+        self.has_variants[positions] = has_variants
+        self.category[positions] = [self.categories.code(pk) for pk in category]
+        self.subcategory[positions] = [self.subcategories.code(pk) for pk in subcategory]
+        self.brand[positions] = [self.brands.code(pk) for pk in brand]
+        self._name_rank = None
+
+    def load_options(self, product_ids=None):
+        """Set size/color/tag bits from the M2M tables (all products, or `product_ids`)."""
+        from .models import Product
+
+        for field, codes, bits in (
+            ('sizes', self.sizes, self.size_bits),
+            ('colors', self.colors, self.color_bits),
+            ('tags', self.tags, self.tag_bits),
+        ):
+            through = Product._meta.get_field(field).remote_field.through
+            links = through.objects.all()
+            if product_ids is not None:
+                links = links.filter(product_id__in=product_ids)
+            links = list(links.values_list('product_id', f'{field[:-1]}_id').iterator(chunk_size=10000))
+            if not links:
+                continue
+            positions = self.positions([product_id.bytes for product_id, _ in links])
+            option_codes = np.array([codes.code(option_id) for _, option_id in links], dtype=np.int64)
+            known = (positions >= 0) & (option_codes > 0)
+            positions, option_codes = positions[known], option_codes[known]
+            np.bitwise_or.at(
+                bits, (positions, option_codes // 64), np.left_shift(np.uint64(1), (option_codes % 64).astype(np.uint64))
+            )
+
+    def positions(self, keys):
+        """Rows of many product ids (-1 when absent)."""
+        keys = np.array(keys, dtype='S16')
+        head = self.ids[:self.sorted_rows]
+        positions = np.searchsorted(head, keys)
+        found = positions < len(head)
+        found[found] = head[positions[found]] == keys[found]
+        positions[~found] = -1
+        for i in np.flatnonzero(~found):
+            position = self.position(bytes(keys[i]))
+            positions[i] = -1 if position is None else position
+        return positions
+
+    def position(self, key):
+        """Row of a product id: binary search over the sorted prefix, then the appended tail."""
+        key = key.rstrip(b'\0')  # as stored in the 'S' array
+        head = self.ids[:self.sorted_rows]
+        position = int(np.searchsorted(head, key))
+        if position < len(head) and head[position] == key:
+            return position
+        tail = np.flatnonzero(self.ids[self.sorted_rows:] == key)
+        return self.sorted_rows + int(tail[0]) if len(tail) else None
+
+    @property
+    def name_rank(self):
+        # Only needed for sortField=name; recomputed lazily after changes
+        if self._name_rank is None:
+            order = np.array(sorted(range(len(self.names)), key=self.names.__getitem__), dtype=np.int64)
+            ranks = np.empty(len(self.names), dtype=np.int64)
+            ranks[order] = np.arange(len(order))
+            self._name_rank = ranks
+        return self._name_rank
+
+    # Incremental refresh
+
+    def refresh(self):
+        """
+        Apply catalog changes made since the last refresh (rate limited).
+        Returns False when the index must be rebuilt instead.
+        """
+        if time.monotonic() - self.checked_at < settings.CATALOG_INDEX_REFRESH_INTERVAL:
+            return True
+        if not self.lock.acquire(blocking=False):
+            return True  # another thread is refreshing; serve the current snapshot
+        try:
+            self.checked_at = time.monotonic()
+            version = catalog_version()
+            if version == self.version:
+                return True
+            # From the primary: the change feed cursor comes from there too
+            with primary_reads():
+                return self.apply_changes(version)
+        finally:
+            self.lock.release()
+
+    def apply_changes(self, version):
+        """Patch changed products in place; False when a full rebuild is cheaper or required."""
+        from .models import Product, ProductChange
+
+        head = ProductChange.objects.sequence()
+        changes = list(
+            ProductChange.objects.filter(seq__gt=self.cursor, seq__lte=head).values_list('product_id', flat=True)
+        )
+        if len(changes) > max(len(self.ids) // 10, 1000):
+            return False
+
+        self.load_filters()
+        for name, codes in zip(BITSET_COLUMNS, (self.sizes, self.colors, self.tags)):
+            if len(codes) > getattr(self, name).shape[1] * 64:
+                return False  # a new option doesn't fit the bitset width
+
+        product_ids = list(dict.fromkeys(changes))
+        rows = {row[0]: row for row in Product.objects.filter(pk__in=product_ids).values_list(*PRODUCT_COLUMNS)}
+
+        updates = []
+        for product_id in product_ids:
+            position = self.position(product_id.bytes)
+            if product_id not in rows:
+                if position is not None:
+                    self.alive[position] = False
+                continue
+            if position is None:
+                position = self.append_row()
+            updates.append((position, rows[product_id]))
+
+        if updates:
+            positions = [position for position, _ in updates]
+            for name in BITSET_COLUMNS:
+                getattr(self, name)[positions] = 0
+            self.fill(positions, [row for _, row in updates])
+            self.load_options([row[0] for _, row in updates])
+
+        self.cursor = head
+        self.version = version
+        return True
+
+    def append_row(self):
+        position = len(self.ids)
+        for name in SCALAR_COLUMNS:
+            column = getattr(self, name)
+            setattr(self, name, np.concatenate([column, np.zeros(1, dtype=column.dtype)]))
+        for name in BITSET_COLUMNS:
+            column = getattr(self, name)
+            setattr(self, name, np.concatenate([column, np.zeros((1, column.shape[1]), dtype=column.dtype)]))
+        self.names.append('')
+        return position
+
+    # Querying
+
+    def supports(self, params):
+        """Whether every filter in `params` can be answered from the index."""
+        if params.get('search'):
+            return False
+        if params.get('sortField') == 'popular':
+            # Popularity is flushed without a catalog version bump
+            return False
+        if (params.get('sizes') or params.get('colors')) and self.has_variants[self.alive].any():
+            # Variant products match per in-stock variant; leave that to SQL
+            return False
+        return True
+
+    def select(self, params):
+        """
+        Apply the ProductViewSet filters in `params`. Returns the matching
+        row positions and their sort keys (ascending order = response order).
+        """
+        with self.lock:
+            return self._select(params)
+
+    def _select(self, params):
+        mask = self.alive.copy()
+
+        category = params.get('category')
+        if category:
+            mask &= np.isin(self.category, self.categories.matching(lambda n: n.lower() == category.lower()))
+        subcategory = params.get('subcategory')
+        if subcategory:
+            mask &= np.isin(
+                self.subcategory, self.subcategories.matching(lambda n: n.lower() == subcategory.lower())
+            )
+        brands = params.get('brands')
+        if brands:
+            wanted = {b.strip() for b in brands.split(',')}
+            mask &= np.isin(self.brand, self.brands.matching(wanted.__contains__))
+        for param, codes, bits in (('sizes', self.sizes, self.size_bits), ('colors', self.colors, self.color_bits)):
+            value = params.get(param)
+            if value:
+                wanted = {v.strip() for v in value.split(',')}
+                mask &= self.any_bits(bits, codes.matching(wanted.__contains__))
+
+        min_price, max_price = parse_price_range(params)
+        if min_price is not None:
+            mask &= self.price >= float(min_price)
+        if max_price is not None:
+            mask &= self.price <= float(max_price)
+        on_sale = params.get('onSale')
+        if on_sale is not None and on_sale.lower() == 'true':
+            mask &= self.discount > 0
+        in_stock = params.get('inStock')
+        if in_stock is not None:
+            mask &= self.in_stock == (in_stock.lower() == 'true')
+
+        rows = np.flatnonzero(mask)
+        keys = self.sort_keys(SORT_COLUMNS.get(params.get('sortField', 'createdAt'), 'created'), rows)
+        if params.get('sortDirection', 'desc') == 'desc':
+            keys = -keys
+        return rows, keys
+
+    def sort_keys(self, column, rows):
+        if column == 'brand':
+            return self.brand_ranks[self.brand[rows]].astype(np.float64)
+        if column == 'name':
+            return self.name_rank[rows].astype(np.float64)
+        keys = getattr(self, column)[rows].astype(np.float64)
+        keys[np.isnan(keys)] = np.inf  # unrated products sort as NULLs do on Postgres
+        return keys
+
+    @staticmethod
+    def any_bits(bits, codes):
+        query = np.zeros(bits.shape[1], dtype=np.uint64)
+        for code in codes:
+            query[code // 64] |= np.uint64(1) << np.uint64(code % 64)
+        return (bits & query).any(axis=1)
+
+    def product_ids(self, rows):
+        # 'S' arrays drop trailing NUL bytes; pad back to 16
+        return [uuid.UUID(bytes=bytes(key).ljust(16, b'\0')) for key in self.ids[rows]]
+
+
+class IndexedProducts:
+    """
+    Lazy sequence over an index result for Django's Paginator: count()
+    comes from the index, and slicing sorts only as far as the requested
+    page (argpartition) and hydrates that page from `queryset`.
+    """
+
+    def __init__(self, index, rows, keys, queryset):
+        self.index = index
+        self.rows = rows
+        self.keys = keys
+        self.queryset = queryset
+
+    def count(self):
+        return len(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def ordered_rows(self, stop):
+        if stop < len(self.keys):
+            top = np.argpartition(self.keys, stop - 1)[:stop]
+            return self.rows[top[np.argsort(self.keys[top], kind='stable')]]
+        return self.rows[np.argsort(self.keys, kind='stable')]
+
+    def __getitem__(self, page):
+        start, stop, _ = page.indices(len(self))
+        if stop <= start:
+            return []
+        ids = self.index.product_ids(self.ordered_rows(stop)[start:stop])
+        products = {product.pk: product for product in self.queryset.filter(pk__in=ids)}
+        return [products[pk] for pk in ids if pk in products]
+
+
+_index = None
+_build_lock = threading.Lock()
+
+
+def get_catalog_index():
+    """
+    This process's index, built on first use and refreshed on access. A
+    rebuild happens on a new instance that replaces the old one when done,
+    so concurrent requests keep reading a consistent snapshot.
+    """
+    global _index
+    if not index_available():
+        return None
+    index = _index
+    if index is not None and index.refresh():
+        return index
+    with _build_lock:
+        # Concurrent requests wait for a single build
+        if _index is index:
+            rebuilt = CatalogIndex()
+            with primary_reads():
+                rebuilt.build()
+            _index = rebuilt
+    return _index
+
+
+def indexed_products(params, queryset):
+    """IndexedProducts for a list request, or None to take the SQL path."""
+    index = get_catalog_index()
+    if index is None or not index.supports(params):
+        return None
+    rows, keys = index.select(params)
+    return IndexedProducts(index, rows, keys, queryset)
@@ -0,0 +1,92 @@
+"""
+Shared helpers for the bench_* management commands.
+
+Benchmarks seed synthetic data inside a transaction that is rolled back at
+the end, so they can be pointed at a development database without leaving
+rows behind.
+"""
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from catalog.images import build_image_manifest
+from catalog.models import Brand, Category, Color, Product, Size, Subcategory, Tag
+
+
+def timed(func, repeat):
+    """Run func `repeat` times and return (median_ms, min_ms)."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), min(samples)
+
+
+def seed_catalog(product_count, batch_size=1000, seed=42):
+    """
+    Bulk-insert a synthetic catalog of `product_count` products with
+    realistic filter cardinalities. Returns the list of created product ids.
+    """
+    rng = random.Random(seed)
+
+    categories = [Category.objects.create(name=f'Bench Category {i}') for i in range(8)]
+    subcategories = [
+        Subcategory.objects.create(name=f'Bench Sub {i}', category=categories[i % len(categories)])
+        for i in range(24)
+    ]
+    brands = [Brand.objects.create(name=f'Bench Brand {i}') for i in range(40)]
+    sizes = [Size.objects.create(name=f'BENCH-{s}') for s in ('XS', 'S', 'M', 'L', 'XL', 'XXL')]
+    colors = [Color.objects.create(name=f'Bench Color {i}') for i in range(12)]
+    tags = [Tag.objects.create(name=f'bench-tag-{i}') for i in range(60)]
+
+    SizeThrough = Product.sizes.through
+    ColorThrough = Product.colors.through
+    TagThrough = Product.tags.through
+
+    product_ids = []
+    for offset in range(0, product_count, batch_size):
+        products = []
+        for i in range(offset, min(offset + batch_size, product_count)):
+            subcategory = rng.choice(subcategories)
+            price = Decimal(rng.randint(500, 50000)) / 100
+            image = f'https://images.example.com/products/{i}.jpg'
+            images = [image, f'https://images.example.com/products/{i}-2.jpg']
+            products.append(Product(
+                name=f'Bench Product {i}',
+                price=price,
+                originalPrice=price * Decimal('1.25') if rng.random() < 0.3 else None,
+                description='Synthetic benchmark product. ' * 8,
+                image=image,
+                images=images,
+                imageManifest=build_image_manifest(image, images),
+                inStock=rng.random() < 0.85,
+                rating=round(rng.uniform(0, 5), 1),
+                reviewCount=rng.randint(0, 500),
+                category=subcategory.category,
+                subcategory=subcategory,
+                brand=rng.choice(brands),
+            ))
+        Product.objects.bulk_create(products, batch_size=batch_size)
+
+        SizeThrough.objects.bulk_create([
+            SizeThrough(product_id=p.id, size_id=s.id)
+            for p in products for s in rng.sample(sizes, rng.randint(1, 4))
+        ], batch_size=batch_size)
+        ColorThrough.objects.bulk_create([
+            ColorThrough(product_id=p.id, color_id=c.id)
+            for p in products for c in rng.sample(colors, rng.randint(1, 3))
+        ], batch_size=batch_size)
+        TagThrough.objects.bulk_create([
+            TagThrough(product_id=p.id, tag_id=t.id)
+            for p in products for t in rng.sample(tags, rng.randint(0, 5))
+        ], batch_size=batch_size)
+
+        product_ids.extend(p.id for p in products)
+
+    # bulk_create bypasses the product_count bookkeeping
+    for model in (Category, Subcategory, Brand, Size, Color, Tag):
+        model.objects.recount_products()
+
+    return product_ids
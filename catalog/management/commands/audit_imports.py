@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Report what a worker imports at startup (django.setup() plus the "
+        "WSGI app and URLconf), using python -X importtime in a fresh process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=25, help='Packages/modules to list')
+        parser.add_argument('--modules', action='store_true', help='List individual modules instead of packages')
+
+    def handle(self, *args, **options):
+        code = "import django; django.setup(); import config.wsgi, config.urls"
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            capture_output=True,
+            text=True,
+            env=os.environ.copy(),
+            check=False,
+        )
+        if result.returncode:
+            self.stderr.write(result.stderr)
+            return
+
+        self_times = defaultdict(int)
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, _cumulative_us, name = line[len('import time:'):].split('|')
+            name = name.strip()
+            key = name if options['modules'] else name.split('.')[0]
+            self_times[key] += int(self_us)
+
+        total = sum(self_times.values())
+        self.stdout.write(f"total import time: {total / 1000:.1f} ms\n")
+        self.stdout.write(f"{'self ms':>10}  {'module' if options['modules'] else 'package'}")
+        ranked = sorted(self_times.items(), key=lambda item: item[1], reverse=True)
+        for name, self_us in ranked[:options['top']]:
+            self.stdout.write(f"{self_us / 1000:>10.1f}  {name}")
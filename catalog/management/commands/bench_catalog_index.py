@@ -0,0 +1,81 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+
+from catalog.index import CatalogIndex, IndexedProducts, np
+from catalog.views import ProductViewSet
+
+from ._bench import seed_catalog, timed
+
+CASES = [
+    {},
+    {'sortField': 'price', 'sortDirection': 'asc'},
+    {'category': 'Bench Category 3', 'sortField': 'rating'},
+    {'brands': 'Bench Brand 1,Bench Brand 2', 'minPrice': '50', 'maxPrice': '200'},
+    {'sizes': 'BENCH-M', 'colors': 'Bench Color 4', 'inStock': 'true'},
+    {'onSale': 'true', 'sortField': 'discount'},
+    {'subcategory': 'Bench Sub 5', 'sortField': 'name', 'sortDirection': 'asc'},
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark product list filtering/sorting in SQL (count + page of ids) "
+        "against the in-memory catalog index, at one or more catalog sizes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--products', type=int, nargs='+', default=[100_000, 1_000_000], help='Synthetic catalog sizes'
+        )
+        parser.add_argument('--page-size', type=int, default=24, help='Products per page')
+        parser.add_argument('--repeat', type=int, default=5, help='Iterations per case')
+
+    def handle(self, *args, **options):
+        if np is None:
+            raise CommandError("numpy is not installed")
+        for product_count in options['products']:
+            with transaction.atomic():
+                seed_catalog(product_count)
+                self.run(product_count, options['page_size'], options['repeat'])
+                transaction.set_rollback(True)
+
+    def run(self, product_count, page_size, repeat):
+        index = CatalogIndex()
+        build_ms, _ = timed(index.build, 1)
+        columns = [getattr(index, name) for name in ('ids', 'price', 'discount', 'rating', 'created', 'in_stock',
+                                                     'has_variants', 'category', 'subcategory', 'brand',
+                                                     'size_bits', 'color_bits', 'tag_bits')]
+        self.stdout.write(
+            f"\n{product_count} products: index built in {build_ms:.0f} ms, "
+            f"{sum(column.nbytes for column in columns) / 2**20:.1f} MiB of arrays (+ names)"
+        )
+        header = f"{'query':<64}{'matches':>9}{'sql ms':>10}{'index ms':>10}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        factory = APIRequestFactory()
+        for params in CASES:
+            view = ProductViewSet(action_map={'get': 'list'}, format_kwarg=None, kwargs={})
+            view.request = view.initialize_request(factory.get('/api/products/', params))
+            queryset = view.get_queryset()
+
+            def sql():
+                return queryset.count(), list(queryset.values_list('pk', flat=True)[:page_size])
+
+            def indexed():
+                products = IndexedProducts(index, *index.select(params), queryset=None)
+                return products.count(), index.product_ids(products.ordered_rows(page_size)[:page_size])
+
+            sql_count, _ = sql()
+            index_count, _ = indexed()
+            if not index.supports(params):
+                label = ' (SQL fallback)'
+            elif sql_count != index_count:
+                label = f' (MISMATCH: sql {sql_count})'
+            else:
+                label = ''
+            sql_ms, _ = timed(sql, repeat)
+            index_ms, _ = timed(indexed, repeat)
+            query = '&'.join(f'{key}={value}' for key, value in params.items()) or '(default)'
+            self.stdout.write(f"{(query + label)[:63]:<64}{index_count:>9}{sql_ms:>10.1f}{index_ms:>10.2f}")
@@ -0,0 +1,101 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from config.database import pool_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark per-request connection overhead under concurrent load: "
+        "a new connection per request, persistent connections, and the "
+        "psycopg 3 pool (PostgreSQL only)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16, help='Concurrent simulated requests')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per thread')
+        parser.add_argument('--pool-size', type=int, default=8, help='max_size for the pooled mode')
+
+    def handle(self, *args, **options):
+        base = connections.settings[DEFAULT_DB_ALIAS]
+        modes = {
+            'connect per request': {**base, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+            'persistent + health checks': {**base, 'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True},
+        }
+        if base['ENGINE'] == 'django.db.backends.postgresql':
+            options_without_pool = {k: v for k, v in base['OPTIONS'].items() if k != 'pool'}
+            modes['psycopg pool'] = {
+                **base,
+                'CONN_MAX_AGE': 0,
+                'CONN_HEALTH_CHECKS': False,
+                'OPTIONS': {
+                    **options_without_pool,
+                    'pool': {'min_size': options['pool_size'], 'max_size': options['pool_size'], 'timeout': 30},
+                },
+            }
+        else:
+            self.stdout.write("Not PostgreSQL: skipping the pooled mode.\n")
+
+        header = f"{'mode':<30}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for index, (name, config) in enumerate(modes.items()):
+            alias = f'bench_{index}'
+            connections.settings[alias] = config
+            try:
+                throughput, p50, p99 = self.run_mode(alias, options['threads'], options['requests'])
+                self.stdout.write(f"{name:<30}{throughput:>10.0f}{p50:>10.3f}{p99:>10.3f}")
+                stats = pool_stats().get(alias)
+                if stats:
+                    self.stdout.write(
+                        f"  pool: waited={stats.get('requests_waiting', 0)} "
+                        f"wait_ms={stats.get('requests_wait_ms', 0)} "
+                        f"queued={stats.get('requests_queued', 0)} "
+                        f"timeouts={stats.get('requests_errors', 0)}"
+                    )
+            finally:
+                self.close_alias(alias)
+
+    def run_mode(self, alias, thread_count, request_count):
+        latencies = []
+        lock = threading.Lock()
+
+        def simulate_requests():
+            connection = connections[alias]
+            samples = []
+            for _ in range(request_count):
+                start = time.perf_counter()
+                # What a request does: (re)use a connection, query, then let
+                # Django decide whether to keep it at request_finished
+                connection.close_if_unusable_or_obsolete()
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+                connection.close_if_unusable_or_obsolete()
+                samples.append((time.perf_counter() - start) * 1000)
+            connection.close()
+            with lock:
+                latencies.extend(samples)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=thread_count) as executor:
+            for future in [executor.submit(simulate_requests) for _ in range(thread_count)]:
+                future.result()
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        return len(latencies) / elapsed, statistics.median(latencies), p99
+
+    def close_alias(self, alias):
+        connection = connections[alias]
+        connection.close()
+        if hasattr(connection, 'close_pool'):
+            connection.close_pool()
+        del connections[alias]
+        del connections.settings[alias]
@@ -0,0 +1,117 @@
+import time
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+
+# The single MIDDLEWARE list every request went through before ROUTE_MIDDLEWARE
+FULL_STACK = [
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'config.middleware.FeedFilesMiddleware',
+    'config.middleware.CompressionMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'config.middleware.ReplicaPinningMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+
+@csrf_exempt  # like every DRF view
+def api_view(request):
+    return HttpResponse(b'{"results": []}', content_type='application/json')
+
+
+def admin_view(request):
+    return HttpResponse(f'<p>{getattr(request, "user", None)}</p>')
+
+
+class BenchUrls:
+    urlpatterns = [
+        path('api/products/', api_view),
+        path('api/carts/', api_view),
+        path('admin/', admin_view),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark per-request middleware overhead (time spent around a "
+        "trivial view) with the old single MIDDLEWARE list and with the "
+        "current MIDDLEWARE + ROUTE_MIDDLEWARE configuration."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=50, help='Timed batches per case and stack')
+        parser.add_argument('--batch', type=int, default=200, help='Requests per timed batch')
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        headers = {
+            'HTTP_AUTHORIZATION': 'Bearer x.y.z',
+            'HTTP_ORIGIN': 'http://localhost:3000',
+            'HTTP_ACCEPT_ENCODING': 'gzip, br',
+            'HTTP_COOKIE': 'csrftoken=abcdefghijklmnopqrstuvwxyzABCDEF',
+        }
+        cases = {
+            'GET /api/products/': lambda: factory.get('/api/products/', secure=True, **headers),
+            'POST /api/carts/': lambda: factory.post(
+                '/api/carts/', b'{}', content_type='application/json', secure=True, **headers
+            ),
+            'GET /admin/': lambda: factory.get('/admin/', secure=True, **headers),
+        }
+        with override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False):
+            handlers = {
+                'bare': self.handler([]),
+                'before': self.handler(FULL_STACK),
+                'after': self.handler(settings.MIDDLEWARE),
+            }
+            header = f"{'request':<20}{'view µs':>9}{'before µs':>11}{'after µs':>10}{'saved':>8}"
+            self.stdout.write(header)
+            self.stdout.write('-' * len(header))
+            for name, make_request in cases.items():
+                for kind, handler in handlers.items():
+                    response = handler.get_response(self.request(make_request))
+                    assert response.status_code == 200, (name, kind, response.status_code)
+                times = self.measure(handlers, make_request, options['rounds'], options['batch'])
+                before = times['before'] - times['bare']
+                after = times['after'] - times['bare']
+                self.stdout.write(
+                    f"{name:<20}{times['bare']:>9.1f}{before:>11.1f}{after:>10.1f}"
+                    f"{(1 - after / before) if before else 0:>8.0%}"
+                )
+        self.stdout.write("before/after: middleware overhead per request on top of the bare view time")
+
+    def measure(self, handlers, make_request, rounds, batch):
+        """Best per-request µs of each handler; rounds alternate between them to even out noise."""
+        best = dict.fromkeys(handlers, float('inf'))
+        for _ in range(rounds):
+            for kind, handler in handlers.items():
+                requests = [self.request(make_request) for _ in range(batch)]
+                start = time.perf_counter()
+                for request in requests:
+                    handler.get_response(request)
+                best[kind] = min(best[kind], (time.perf_counter() - start) / batch * 1e6)
+        return best
+
+    @staticmethod
+    def handler(middleware):
+        with override_settings(MIDDLEWARE=middleware):
+            handler = BaseHandler()
+            handler.load_middleware()
+        return handler
+
+    @staticmethod
+    def request(make_request):
+        request = make_request()
+        request.urlconf = BenchUrls
+        return request
@@ -0,0 +1,67 @@
+import gzip
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from config.renderers import FastJSONRenderer, orjson
+from config.middleware import brotli
+from catalog.views import ProductViewSet, filters_view
+
+from ._bench import seed_catalog, timed
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark JSON encode time and bytes-on-the-wire (raw, gzip, brotli) "
+        "for a product list page and /filters/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=2000, help='Synthetic products to seed')
+        parser.add_argument('--page-size', type=int, default=100, help='Products per list page')
+        parser.add_argument('--repeat', type=int, default=50, help='Encode iterations per case')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            seed_catalog(options['products'])
+            payloads = self.collect_payloads(options['page_size'])
+            self.report(payloads, options['repeat'])
+            transaction.set_rollback(True)
+
+    def collect_payloads(self, page_size):
+        factory = APIRequestFactory()
+        list_view = ProductViewSet.as_view({'get': 'list'})
+        return {
+            f'products (limit={page_size})': list_view(factory.get('/api/products/', {'limit': page_size})).data,
+            f'products card (limit={page_size})': list_view(
+                factory.get('/api/products/', {'limit': page_size, 'view': 'card'})
+            ).data,
+            'filters': filters_view(factory.get('/api/filters/')).data,
+        }
+
+    def report(self, payloads, repeat):
+        stdlib = JSONRenderer()
+        fast = FastJSONRenderer()
+        self.stdout.write(
+            f"fast renderer: {'orjson' if orjson else 'stdlib fallback'}, "
+            f"brotli: {'available' if brotli else 'not installed'}\n"
+        )
+        header = f"{'endpoint':<28}{'stdlib ms':>11}{'fast ms':>10}{'raw B':>10}{'gzip B':>10}{'br B':>10}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        for name, data in payloads.items():
+            stdlib_ms, _ = timed(lambda: stdlib.render(data), repeat)
+            fast_ms, _ = timed(lambda: fast.render(data), repeat)
+            body = fast.render(data)
+            gzip_size = len(gzip.compress(body, compresslevel=6))
+            br_size = (
+                len(brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY))
+                if brotli else '-'
+            )
+            self.stdout.write(
+                f"{name:<28}{stdlib_ms:>11.3f}{fast_ms:>10.3f}{len(body):>10}{gzip_size:>10}{br_size:>10}"
+            )
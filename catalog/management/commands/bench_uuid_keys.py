@@ -0,0 +1,90 @@
+import random
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from catalog.models import Brand, Category, Product, Subcategory, Tag
+from catalog.utils import uuid7
+
+KEY_KINDS = {'uuid4': uuid.uuid4, 'uuid7': uuid7}
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark insert throughput with random (v4) vs time-ordered (v7) "
+        "primary keys into Product and its tag through table, on top of an "
+        "existing catalog. Reports index sizes on PostgreSQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--existing', type=int, default=50000, help='Products inserted before measuring')
+        parser.add_argument('--products', type=int, default=50000, help='Products inserted while measuring')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        header = f"{'keys':<8}{'products/s':>12}{'links/s':>10}{'product idx MiB':>17}{'link idx MiB':>14}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, make_id in KEY_KINDS.items():
+            # Each run starts from the same empty tables and is rolled back
+            with transaction.atomic():
+                stats = self.run(make_id, options['existing'], options['products'], options['batch_size'])
+                transaction.set_rollback(True)
+            self.stdout.write(
+                f"{name:<8}{stats['products/s']:>12.0f}{stats['links/s']:>10.0f}"
+                f"{stats['product_idx']:>17}{stats['link_idx']:>14}"
+            )
+
+    def run(self, make_id, existing, product_count, batch_size):
+        rng = random.Random(42)
+        category = Category.objects.create(name='Bench Keys Category')
+        subcategory = Subcategory.objects.create(name='Bench Keys Sub', category=category)
+        brand = Brand.objects.create(name='Bench Keys Brand')
+        tags = [Tag.objects.create(name=f'bench-keys-tag-{i}') for i in range(20)]
+        TagThrough = Product.tags.through
+
+        def insert(count):
+            product_seconds = link_seconds = links = 0
+            for offset in range(0, count, batch_size):
+                products = [
+                    Product(
+                        id=make_id(), name=f'Bench Keys Product {offset + i}', price=Decimal('9.99'),
+                        description='Synthetic benchmark product.', image='https://images.example.com/p.jpg',
+                        category=category, subcategory=subcategory, brand=brand,
+                    )
+                    for i in range(min(batch_size, count - offset))
+                ]
+                start = time.perf_counter()
+                Product.objects.bulk_create(products)
+                product_seconds += time.perf_counter() - start
+
+                rows = [
+                    TagThrough(product_id=p.id, tag_id=t.id) for p in products for t in rng.sample(tags, 3)
+                ]
+                start = time.perf_counter()
+                TagThrough.objects.bulk_create(rows)
+                link_seconds += time.perf_counter() - start
+                links += len(rows)
+            return product_seconds, link_seconds, links
+
+        insert(existing)
+        product_seconds, link_seconds, links = insert(product_count)
+        return {
+            'products/s': product_count / product_seconds,
+            'links/s': links / link_seconds,
+            'product_idx': self.index_size(Product._meta.db_table),
+            'link_idx': self.index_size(TagThrough._meta.db_table),
+        }
+
+    def index_size(self, table):
+        if connection.vendor != 'postgresql':
+            return '-'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT COALESCE(SUM(pg_relation_size(indexrelid)), 0) FROM pg_index WHERE indrelid = %s::regclass",
+                [table],
+            )
+            return f"{cursor.fetchone()[0] / 2**20:.1f}"
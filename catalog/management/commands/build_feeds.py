@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from catalog.feeds import FeedBuilder
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the sitemap index, product sitemaps and product feed to CATALOG_FEEDS_ROOT. "
+        "Only chunks with changed products are rewritten unless --full is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rewrite every chunk')
+        parser.add_argument('--every', type=float, default=0, help='Keep running, updating every this many seconds')
+
+    def handle(self, *args, **options):
+        builder = FeedBuilder()
+        full = options['full']
+        while True:
+            start = time.perf_counter()
+            try:
+                written = builder.build(full=full)
+            except Exception as exc:
+                if not options['every']:
+                    raise
+                self.stderr.write(f"Building feeds failed: {exc!r}")
+            else:
+                if written or not options['every']:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"Wrote {len(written)} chunk(s) to {builder.root} ({time.perf_counter() - start:.1f}s)"
+                    ))
+            if not options['every']:
+                return
+            full = False
+            connection.close()
+            time.sleep(options['every'])
@@ -0,0 +1,28 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from drf_spectacular.generators import SchemaGenerator
+from drf_spectacular.renderers import OpenApiJsonRenderer
+from whitenoise.compress import Compressor
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-generate the OpenAPI schema into STATIC_ROOT (plus .gz/.br "
+        "variants) so it is served as a static file. Run after collectstatic."
+    )
+
+    def handle(self, *args, **options):
+        schema = SchemaGenerator().get_schema(request=None, public=True)
+        content = OpenApiJsonRenderer().render(schema, renderer_context={})
+
+        path = settings.OPENAPI_SCHEMA_FILE
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+
+        compressed = Compressor(quiet=True).compress(path)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {path} ({len(content)} bytes) and {len(compressed)} compressed variant(s)"
+        ))
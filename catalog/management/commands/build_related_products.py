@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.related import build_related_products, np
+from jobs.models import Job
+
+
+class Command(BaseCommand):
+    help = "Recompute the precomputed related products served by /api/products/<id>/related/."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--k', type=int, default=settings.CATALOG_RELATED_K, help='Neighbours per product')
+        parser.add_argument('--enqueue', action='store_true', help='Queue the job for a worker instead of running it here')
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            job = Job.objects.enqueue('catalog.build_related_products', {'k': options['k']})
+            self.stdout.write(self.style.SUCCESS(f"Queued job {job.pk}"))
+            return
+        if np is None:
+            raise CommandError("numpy and scipy are required")
+
+        start = time.perf_counter()
+        stats = build_related_products(options['k'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['relations']} relations for {stats['products']} products in {stats['categories']} "
+            f"categories ({time.perf_counter() - start:.1f}s)"
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from catalog.models import Category, Subcategory, Brand, Size, Color, Tag
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized product_count on every filter table."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            for model in (Category, Subcategory, Brand, Size, Color, Tag):
+                updated = model.objects.recount_products()
+                self.stdout.write(f"{model._meta.verbose_name_plural}: {updated} rows recounted")
+        self.stdout.write(self.style.SUCCESS("Filter product counts are up to date"))
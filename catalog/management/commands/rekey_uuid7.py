@@ -0,0 +1,93 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models, transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+
+from catalog.cache import bump_catalog_version
+from catalog.models import Product, ProductChange
+from catalog.utils import uuid7
+
+
+class Command(BaseCommand):
+    help = (
+        "Replace the random (v4) primary keys of existing rows with time-ordered "
+        "UUIDv7 ids derived from createdAt, rewriting every foreign key and M2M "
+        "row that points at them. Rows that already have v7 ids are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models', nargs='*', default=['catalog.Product'], help='app_label.Model to rekey (default: catalog.Product)'
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many rows would change')
+
+    def handle(self, *args, **options):
+        for label in options['models']:
+            try:
+                model = apps.get_model(label)
+            except (LookupError, ValueError) as e:
+                raise CommandError(f"Unknown model {label!r}") from e
+            if not isinstance(model._meta.pk, models.UUIDField):
+                raise CommandError(f"{label} doesn't have a UUID primary key")
+
+            references = self.references(model)
+            rows = self.rows_to_rekey(model)
+            self.stdout.write(
+                f"{label}: {len(rows)} rows to rekey, referenced by "
+                f"{', '.join(f'{ref.model._meta.label}.{ref.attname}' for ref in references) or 'nothing'}"
+            )
+            if options['dry_run']:
+                continue
+
+            batch_size = options['batch_size']
+            for offset in range(0, len(rows), batch_size):
+                self.rekey(model, references, rows[offset:offset + batch_size])
+                self.stdout.write(f"  {min(offset + batch_size, len(rows))}/{len(rows)}")
+
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS("Primary keys rekeyed"))
+
+    def references(self, model):
+        """Foreign key fields (including auto-created M2M through tables) that point at model's pk."""
+        return [
+            relation.field
+            for relation in model._meta.get_fields(include_hidden=True)
+            if relation.auto_created and not relation.concrete and (relation.one_to_many or relation.one_to_one)
+            and relation.field.target_field == model._meta.pk
+        ]
+
+    def rows_to_rekey(self, model):
+        """(pk, timestamp) of non-v7 rows, oldest first when the model has createdAt."""
+        fields = {field.name for field in model._meta.concrete_fields}
+        if 'createdAt' in fields:
+            rows = model._base_manager.order_by('createdAt', 'pk').values_list('pk', 'createdAt')
+        else:
+            now = timezone.now()
+            rows = ((pk, now) for pk in model._base_manager.order_by('pk').values_list('pk', flat=True))
+        return [(pk, created) for pk, created in rows if pk.version != 7]
+
+    def rekey(self, model, references, rows):
+        new_ids = {old: uuid7(created) for old, created in rows}
+
+        def remap(column):
+            return Case(
+                *[When(**{column: old}, then=Value(new)) for old, new in new_ids.items()],
+                output_field=models.UUIDField(),
+            )
+
+        with transaction.atomic():
+            # Foreign keys are checked at commit, so children can move first
+            for field in references:
+                field.model._base_manager.filter(**{f'{field.attname}__in': new_ids}).update(
+                    **{field.attname: remap(field.attname)}
+                )
+            pk = model._meta.pk.attname
+            model._base_manager.filter(pk__in=new_ids).update(**{pk: remap(pk)})
+
+            if model is Product:
+                # Sync consumers see the old ids go away and the new ones appear
+                ProductChange.objects.record(new_ids, deleted=True)
+                ProductChange.objects.record(new_ids.values())
+            bump_catalog_version()
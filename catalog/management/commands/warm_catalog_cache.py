@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from catalog.cache import access_log_urls, default_warm_urls, warm
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-populate the catalog response and facet caches: the filter/lookup "
+        "endpoints and the top category x sort product pages, or the most requested "
+        "URLs from an access log."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=settings.CATALOG_CACHE_WARM_TOP,
+                            help="Number of categories (or access-log URLs) to warm.")
+        parser.add_argument('--access-log', metavar='PATH',
+                            help="Warm the most requested cacheable URLs in this access log instead.")
+        parser.add_argument('--base-url', default=settings.CATALOG_CACHE_WARM_BASE_URL,
+                            help="Scheme and host clients use; part of the cache key.")
+
+    def handle(self, *args, **options):
+        if options['access_log']:
+            with open(options['access_log'], errors='replace') as log:
+                urls = access_log_urls(log, options['top'])
+        else:
+            urls = default_warm_urls(options['top'])
+
+        warmed = 0
+        for url, status in warm(urls, options['base_url']):
+            if status == 200:
+                warmed += 1
+            self.stdout.write(f"{status or 'skipped'} {url}")
+        self.stdout.write(self.style.SUCCESS(f"Warmed {warmed} of {len(urls)} URL(s)"))
@@ -1,20 +1,69 @@
 # managers.py
-from django.db import models, transaction
+from django.core.exceptions import ValidationError
+from django.db import models, router, transaction
+from django.db.models import Case, Exists, F, OuterRef, Subquery, Count, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .cache import bump_catalog_version
+
+# CatalogCounter holding the last ProductChange.seq given out
+CHANGE_FEED_HEAD = 'change_feed'
 
 class FilterManager(models.Manager):
+    def normalize(self, name):
+        """Normalize `name` the way the model's clean() does (title, upper or lower case)."""
+        obj = self.model(name=name)
+        obj.clean()
+        return obj.name
+
+    def upsert_many(self, names, **fields):
+        """
+        Get or create a row for each name, safe against concurrent writers:
+        one INSERT ... ON CONFLICT DO NOTHING for the whole set, then one
+        SELECT. A row another transaction is inserting makes the INSERT wait
+        for it instead of failing on the unique constraint.
+
+        `fields` are shared by every row (e.g. category for subcategories).
+        Returns {normalized_name: obj}.
+        """
+        return self._upsert_many(names, **fields)[0]
+
+    def _upsert_many(self, names, **fields):
+        objs = {}
+        for name in names:
+            if name and name.strip():
+                obj = self.model(name=name, **fields)
+                # bulk_create skips save(), so normalize and validate here
+                obj.full_clean(exclude=list(fields), validate_unique=False, validate_constraints=False)
+                objs.setdefault(obj.name, obj)
+        if not objs:
+            return {}, set()
+
+        # Primary keys are generated client-side, so the SELECT also tells
+        # which rows this INSERT created; no RETURNING needed. Rows go in
+        # name order, so concurrent upserts of overlapping names take the
+        # unique index locks in the same order and can't deadlock.
+        self.bulk_create([objs[name] for name in sorted(objs)], ignore_conflicts=True)
+        found = {obj.name: obj for obj in self.filter(name__in=objs, **fields)}
+        created = {name for name, obj in found.items() if obj.pk == objs[name].pk}
+        if created:
+            bump_catalog_version()
+        return found, created
+
     def get_or_create_normalized(self, name, normalization_type='title'):
         """
         Normalize the name based on the model type and return (object, created).
-        
+        A single-name upsert_many(). Raises ValidationError for a blank name.
+
         normalization_type:
-        - 'title': Category, Brand, Color, Subcategory 
+        - 'title': Category, Brand, Color, Subcategory
         - 'upper': Size
         - 'lower': Tag
         """
+        name = (name or '').strip()
         if not name:
-            return None, False
-        
-        name = name.strip()
+            raise ValidationError({'name': 'This field cannot be blank.'})
         if normalization_type == 'title':
             normalized = name.title()
         elif normalization_type == 'upper':
@@ -23,22 +72,77 @@ class FilterManager(models.Manager):
             normalized = name.lower()
         else:
             normalized = name
-        
-        return self.get_or_create(name=normalized)
-    
+
+        found, created = self._upsert_many([normalized])
+        name, obj = next(iter(found.items()))
+        return obj, name in created
+
     def with_products(self):
         """
         Return only filters that are linked to at least one product.
+        Reads the denormalized product_count instead of joining products.
         """
-        return self.filter(
-            products__isnull=False
-        ).distinct()
+        return self.filter(product_count__gt=0)
+
+    def adjust_product_count(self, ids, delta):
+        """
+        Atomically add `delta` to product_count for the given filter ids.
+        """
+        ids = {pk for pk in ids if pk is not None}
+        if ids and delta:
+            # Clamp at zero so a drifted count can't violate the column check
+            self.filter(pk__in=ids).update(product_count=Greatest(F('product_count') + delta, 0))
+
+    def recount_products(self):
+        """
+        Recompute product_count for every row with a single UPDATE.
+        """
+        from .models import Product
+
+        relation = self.model._meta.get_field('products')
+        if relation.many_to_many:
+            # Count rows in the product M2M through table
+            through = relation.through
+            column = relation.field.m2m_reverse_field_name()
+            rows = through.objects.filter(**{column: OuterRef('pk')})
+        else:
+            column = relation.field.name
+            rows = Product.objects.filter(**{column: OuterRef('pk')})
+
+        counts = rows.order_by().values(column).annotate(count=Count('pk')).values('count')
+        return self.update(product_count=Coalesce(Subquery(counts), Value(0)))
+
+class SubcategoryManager(FilterManager):
+    def get_queryset(self):
+        # __str__ and SubcategorySerializer both read the parent category
+        return super().get_queryset().select_related('category')
+
+def upserted(model, names, filters=None, **fields):
+    """
+    Filter objects for `names`: taken from an upsert_filters() result where
+    present, the rest upserted. Subcategories are keyed by (category id, name).
+    """
+    known = (filters or {}).get(model, {})
+    objs, missing = {}, []
+    for name in names:
+        if not name or not name.strip():
+            continue
+        normalized = model.objects.normalize(name)
+        key = (fields['category'].pk, normalized) if 'category' in fields else normalized
+        if key in known:
+            objs[normalized] = known[key]
+        else:
+            missing.append(name)
+    if missing:
+        objs.update(model.objects.upsert_many(missing, **fields))
+    return list(objs.values())
 
 class ProductManager(models.Manager):
-    def create_with_filters(self, **validated_data):
+    def create_with_filters(self, filters=None, **validated_data):
         """
         Create a product and automatically upsert related filters.
         Uses transaction for atomicity and single save() call for performance.
+        `filters` is an optional upsert_filters() result for batch imports.
         """
         with transaction.atomic():
             # Import here to avoid circular imports
@@ -59,73 +163,90 @@ class ProductManager(models.Manager):
             
             # Handle foreign key relations first
             if category_name:
-                category, _ = Category.objects.get_or_create_normalized(
-                    category_name, 'title'
-                )
+                category = upserted(Category, [category_name], filters)[0]
                 validated_data['category'] = category
-                
+
                 # Handle subcategory (depends on category)
                 if subcategory_name:
-                    subcategory, _ = Subcategory.objects.get_or_create(
-                        name=subcategory_name.strip().title(),
-                        category=category
-                    )
-                    validated_data['subcategory'] = subcategory
-            
+                    validated_data['subcategory'] = upserted(
+                        Subcategory, [subcategory_name], filters, category=category
+                    )[0]
+
             if brand_name:
-                brand, _ = Brand.objects.get_or_create_normalized(
-                    brand_name, 'title'
-                )
-                validated_data['brand'] = brand
-            
+                validated_data['brand'] = upserted(Brand, [brand_name], filters)[0]
+
             # Create product with all foreign keys in one save()
             product = self.create(**validated_data)
-            
+
             # Handle many-to-many relationships after product creation
-            if size_names or size_ids:
-                sizes = []
-                # Handle size names
-                for size_name in size_names:
-                    size, _ = Size.objects.get_or_create_normalized(
-                        size_name, 'upper'
-                    )
-                    sizes.append(size)
-                # Handle size IDs
-                if size_ids:
-                    sizes.extend(Size.objects.filter(id__in=size_ids))
-                if sizes:
-                    product.sizes.set(sizes)
-            
-            if color_names or color_ids:
-                colors = []
-                # Handle color names
-                for color_name in color_names:
-                    color, _ = Color.objects.get_or_create_normalized(
-                        color_name, 'title'
-                    )
-                    colors.append(color)
-                # Handle color IDs
-                if color_ids:
-                    colors.extend(Color.objects.filter(id__in=color_ids))
-                if colors:
-                    product.colors.set(colors)
-            
-            if tag_names or tag_ids:
-                tags = []
-                # Handle tag names
-                for tag_name in tag_names:
-                    tag, _ = Tag.objects.get_or_create_normalized(
-                        tag_name, 'lower'
-                    )
-                    tags.append(tag)
-                # Handle tag IDs
-                if tag_ids:
-                    tags.extend(Tag.objects.filter(id__in=tag_ids))
-                if tags:
-                    product.tags.set(tags)
-            
+            for field, model, names, ids in (
+                ('sizes', Size, size_names, size_ids),
+                ('colors', Color, color_names, color_ids),
+                ('tags', Tag, tag_names, tag_ids),
+            ):
+                objs = upserted(model, names, filters)
+                if ids:
+                    objs.extend(model.objects.filter(id__in=ids))
+                if objs:
+                    getattr(product, field).set(objs)
+
             return product
-    
+
+    def upsert_filters(self, payloads):
+        """
+        Upsert every filter named in a batch of create_with_filters()
+        payloads with one upsert_many() per table. Pass the result as
+        `filters` to create_with_filters() so each row only looks them up.
+        """
+        from .models import Category, Subcategory, Brand, Size, Color, Tag
+
+        filters = {
+            Category: Category.objects.upsert_many(p.get('category_name') for p in payloads),
+            Brand: Brand.objects.upsert_many(p.get('brand_name') for p in payloads),
+            Size: Size.objects.upsert_many(name for p in payloads for name in p.get('size_names', [])),
+            Color: Color.objects.upsert_many(name for p in payloads for name in p.get('color_names', [])),
+            Tag: Tag.objects.upsert_many(name for p in payloads for name in p.get('tag_names', [])),
+            Subcategory: {},
+        }
+        subcategory_names = {}
+        for p in payloads:
+            if p.get('category_name') and p.get('subcategory_name'):
+                category = filters[Category][Category.objects.normalize(p['category_name'])]
+                subcategory_names.setdefault(category, []).append(p['subcategory_name'])
+        for category, names in subcategory_names.items():
+            for name, subcategory in Subcategory.objects.upsert_many(names, category=category).items():
+                filters[Subcategory][category.pk, name] = subcategory
+        return filters
+
+    def sync_foreign_key_counts(self, product, previous=None):
+        """
+        Move product_count on Category/Subcategory/Brand after `product` was
+        saved. `previous` holds the FK ids it had before (None when new).
+        """
+        from .models import Category, Subcategory, Brand
+
+        for field, model in (('category_id', Category), ('subcategory_id', Subcategory), ('brand_id', Brand)):
+            old_id = previous[field] if previous else None
+            new_id = getattr(product, field)
+            if old_id != new_id:
+                model.objects.adjust_product_count([old_id], -1)
+                model.objects.adjust_product_count([new_id], 1)
+
+    def update_and_record(self, queryset, **values):
+        """
+        Apply `values` to every product in `queryset` with a single UPDATE.
+        save() and the model signals don't run for .update(), so bump
+        updatedAt, the change feed and the response cache here.
+        """
+        from .models import ProductChange
+
+        with transaction.atomic():
+            product_ids = list(queryset.values_list('pk', flat=True))
+            updated = queryset.update(updatedAt=timezone.now(), **values)
+            ProductChange.objects.record(product_ids)
+            bump_catalog_version()
+        return updated
+
     def get_active_filters(self):
         """
         Return a dict of filters that are linked to products.
@@ -134,16 +255,155 @@ class ProductManager(models.Manager):
         from .models import Category, Subcategory, Brand, Size, Color, Tag
         
         return {
-            'categories': list(Category.objects.with_products().values('id', 'name')),
+            'categories': list(Category.objects.with_products().values('id', 'name', 'product_count')),
             'subcategories': list(
                 Subcategory.objects
-                .filter(products__isnull=False)  # More explicit filter
-                .select_related('category')
-                .values('id', 'name', 'category__name')
-                .distinct()
+                .with_products()
+                .values('id', 'name', 'category__name', 'product_count')
             ),
-            'brands': list(Brand.objects.with_products().values('id', 'name')),
-            'sizes': list(Size.objects.with_products().values('id', 'name')),
-            'colors': list(Color.objects.with_products().values('id', 'name')),
-            'tags': list(Tag.objects.with_products().values('id', 'name')),
-        }
\ No newline at end of file
+            'brands': list(Brand.objects.with_products().values('id', 'name', 'product_count')),
+            'sizes': list(Size.objects.with_products().values('id', 'name', 'product_count')),
+            'colors': list(Color.objects.with_products().values('id', 'name', 'product_count')),
+            'tags': list(Tag.objects.with_products().values('id', 'name', 'product_count')),
+        }
+
+class ProductVariantManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().select_related('size', 'color')
+
+    def sync_products(self, product_ids):
+        """
+        Derive hasVariants, sizes and colors of the given products from their
+        variants. Products without variants keep their hand-set options.
+        """
+        from .models import Product
+
+        with transaction.atomic():
+            for product in Product.objects.filter(pk__in=set(product_ids)):
+                options = list(self.filter(product=product).values_list('size_id', 'color_id'))
+                Product.objects.update_and_record(Product.objects.filter(pk=product.pk), hasVariants=bool(options))
+                if options:
+                    # set() only touches the difference, so counts and signals stay exact
+                    product.sizes.set({size for size, _ in options if size})
+                    product.colors.set({color for _, color in options if color})
+            self.sync_in_stock(product_ids)
+
+    # Stock. For products with variants, ProductVariant.stock is the only
+    # stock record: carts reserve the variant (orders.CartItemManager) and
+    # such products have no orders.StockItem. Like StockItem.quantity it
+    # only changes through conditional UPDATEs.
+
+    def take(self, variant_id, quantity):
+        """Remove `quantity` units if at least that many are left (see StockItemManager.take)."""
+        return self.filter(pk=variant_id, stock__gte=quantity).update(stock=F('stock') - quantity) == 1
+
+    def give_back(self, quantities):
+        """Return units to stock; `quantities` maps variant id -> units."""
+        for variant_id, quantity in quantities.items():
+            self.filter(pk=variant_id).update(stock=F('stock') + quantity)
+
+    def adjust(self, variant_id, delta):
+        """Add `delta` units (negative to remove) unless that would go below zero."""
+        with transaction.atomic():
+            adjusted = self.filter(pk=variant_id, stock__gte=max(-delta, 0)).update(stock=F('stock') + delta) == 1
+            if adjusted:
+                self.sync_in_stock(self.filter(pk=variant_id).values('product'))
+        return adjusted
+
+    def available(self, variant_id):
+        return self.filter(pk=variant_id).values_list('stock', flat=True).first() or 0
+
+    def sync_in_stock(self, product_ids):
+        """Set Product.inStock of the given products with variants: any variant in stock."""
+        from .models import Product
+
+        products = Product.objects.filter(pk__in=product_ids, hasVariants=True).annotate(
+            available=Exists(self.model.objects.filter(product=OuterRef('pk'), stock__gt=0))
+        )
+        stale = [(pk, available) for pk, in_stock, available in products.values_list('pk', 'inStock', 'available')
+                 if in_stock != available]
+        for in_stock in (True, False):
+            stale_ids = [pk for pk, available in stale if available == in_stock]
+            if stale_ids:
+                Product.objects.update_and_record(Product.objects.filter(pk__in=stale_ids), inStock=in_stock)
+
+class ProductChangeManager(models.Manager):
+    def record(self, product_ids, deleted=False):
+        """
+        Move the given products to the head of the change feed.
+        Delete + insert gives each change a fresh, higher sequence id.
+        """
+        product_ids = set(product_ids)
+        if not product_ids:
+            return
+        with transaction.atomic():
+            self.filter(product_id__in=product_ids).delete()
+            self.bulk_create([
+                self.model(product_id=product_id, deleted=deleted)
+                for product_id in product_ids
+            ])
+
+    def sequence(self):
+        """
+        Give committed changes without a feed position the next `seq`
+        values, and return the highest position given out so far.
+
+        A writer's rows are only visible here once it has committed, so a
+        long transaction that took a low id still lands after every position
+        a reader has already passed. The feed head counter row is locked
+        while numbering, so positions also become visible in order.
+        """
+        from .models import CatalogCounter
+
+        db = router.db_for_write(self.model)
+        counters = CatalogCounter.objects.db_manager(db)
+        pending = self.using(db).filter(seq__isnull=True)
+        if not pending.exists():
+            return counters.value(CHANGE_FEED_HEAD)
+
+        with transaction.atomic(using=db):
+            head = counters.locked(CHANGE_FEED_HEAD)
+            ids = list(pending.order_by('pk').values_list('pk', flat=True))
+            for offset in range(0, len(ids), 1000):
+                batch = ids[offset:offset + 1000]
+                self.using(db).filter(pk__in=batch).update(seq=Case(
+                    *[When(pk=pk, then=Value(head.value + offset + i + 1)) for i, pk in enumerate(batch)],
+                    output_field=models.BigIntegerField(),
+                ))
+            head.value += len(ids)
+            head.save(update_fields=['value'])
+        return head.value
+
+    def since(self, cursor, limit):
+        """Changes after `cursor` (a seq), oldest first."""
+        self.sequence()
+        return self.filter(seq__gt=cursor).order_by('seq')[:limit]
+
+class CatalogCounterManager(models.Manager):
+    def value(self, name):
+        return self.filter(name=name).values_list('value', flat=True).first() or 0
+
+    def advance(self, name, by=1):
+        """Add `by` to the counter with a single UPDATE, creating it if needed."""
+        if not self.filter(name=name).update(value=F('value') + by):
+            self.get_or_create(name=name)
+            self.filter(name=name).update(value=F('value') + by)
+
+    def locked(self, name):
+        """The counter row, locked until the current transaction ends."""
+        return self.select_for_update().get_or_create(name=name)[0]
+
+class ProductRelationManager(models.Manager):
+    def replace(self, products, batches):
+        """
+        Swap the stored relations of every product in the `products`
+        queryset for the rows in `batches` (an iterable of lists) in one
+        transaction. Returns the number of rows written.
+        """
+        written = 0
+        with transaction.atomic():
+            self.filter(product__in=products).delete()
+            for relations in batches:
+                self.bulk_create(relations)
+                written += len(relations)
+        return written
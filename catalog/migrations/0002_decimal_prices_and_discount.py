@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:19
+
+import django.db.models.expressions
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='originalPrice',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='price',
+            field=models.DecimalField(decimal_places=2, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='discountPercent',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(originalPrice__gt=models.F('price'), then=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('originalPrice'), '-', models.F('price')), '*', models.Value(100)), '/', models.F('originalPrice'))), default=models.Value(Decimal('0'))), output_field=models.DecimalField(decimal_places=2, max_digits=5)),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price'], name='product_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['discountPercent'], name='product_discount_idx'),
+        ),
+    ]
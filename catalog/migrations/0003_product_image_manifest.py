@@ -0,0 +1,77 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:20
+
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copy of catalog.images as of this migration, so later changes to
+# the helpers can't change what it writes
+IMAGE_VARIANTS = {
+    'thumb': (160, 160),
+    'card': (480, 480),
+    'large': (1200, 1200),
+}
+
+
+def normalize_image_url(url):
+    if not url:
+        return ""
+    url = url.strip()
+    if url.startswith('//'):
+        return f'https:{url}'
+    if url.startswith('http://'):
+        return f'https://{url[len("http://"):]}'
+    return url
+
+
+def build_variants(url):
+    template = getattr(settings, 'CATALOG_IMAGE_VARIANT_URL', '')
+    if not template:
+        return {name: {'url': url} for name in IMAGE_VARIANTS}
+    return {
+        name: {
+            'url': template.format(url=quote(url, safe=''), width=width, height=height),
+            'width': width,
+            'height': height,
+        }
+        for name, (width, height) in IMAGE_VARIANTS.items()
+    }
+
+
+def build_image_manifest(image, images):
+    gallery = [normalize_image_url(url) for url in images or [] if url]
+    primary = normalize_image_url(image) or (gallery[0] if gallery else "")
+    return {
+        'primary': build_variants(primary) if primary else None,
+        'gallery': [build_variants(url) for url in gallery],
+    }
+
+
+def backfill_image_manifests(apps, schema_editor):
+    Product = apps.get_model('catalog', 'Product')
+    batch = []
+    for product in Product.objects.only('id', 'image', 'images').iterator(chunk_size=1000):
+        product.imageManifest = build_image_manifest(product.image, product.images)
+        batch.append(product)
+        if len(batch) >= 1000:
+            Product.objects.bulk_update(batch, ['imageManifest'])
+            batch = []
+    if batch:
+        Product.objects.bulk_update(batch, ['imageManifest'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_decimal_prices_and_discount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='imageManifest',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.RunPython(backfill_image_manifests, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:29
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_product_counts(apps, schema_editor):
+    Product = apps.get_model('catalog', 'Product')
+    foreign_keys = {'Category': 'category', 'Subcategory': 'subcategory', 'Brand': 'brand'}
+    many_to_many = {'Size': 'sizes', 'Color': 'colors', 'Tag': 'tags'}
+
+    for model_name, field in foreign_keys.items():
+        counts = (
+            Product.objects.filter(**{field: OuterRef('pk')})
+            .order_by().values(field).annotate(count=Count('pk')).values('count')
+        )
+        apps.get_model('catalog', model_name).objects.update(
+            product_count=Coalesce(Subquery(counts), Value(0))
+        )
+
+    for model_name, field in many_to_many.items():
+        through = Product._meta.get_field(field).remote_field.through
+        column = model_name.lower()
+        counts = (
+            through.objects.filter(**{column: OuterRef('pk')})
+            .order_by().values(column).annotate(count=Count('pk')).values('count')
+        )
+        apps.get_model('catalog', model_name).objects.update(
+            product_count=Coalesce(Subquery(counts), Value(0))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_product_image_manifest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='brand',
+            name='product_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='color',
+            name='product_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='size',
+            name='product_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='subcategory',
+            name='product_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='product_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_product_counts, migrations.RunPython.noop),
+    ]
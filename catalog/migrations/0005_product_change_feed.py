@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:31
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def seed_change_feed(apps, schema_editor):
+    Product = apps.get_model('catalog', 'Product')
+    ProductChange = apps.get_model('catalog', 'ProductChange')
+
+    Product.objects.update(updatedAt=F('createdAt'))
+    product_ids = Product.objects.order_by('createdAt').values_list('pk', flat=True)
+    ProductChange.objects.bulk_create(
+        (ProductChange(product_id=pk) for pk in product_ids.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_filter_product_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.UUIDField(unique=True)),
+                ('deleted', models.BooleanField(default=False)),
+                ('changedAt', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='updatedAt',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.RunPython(seed_change_feed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:36
+
+from django.db import migrations, models
+
+
+# Admin search uses name__istartswith, i.e. UPPER("name"::text) LIKE 'X%'.
+# Only a text_pattern_ops index on that expression can serve it on Postgres.
+
+def create_name_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS product_name_prefix_idx '
+            'ON catalog_product (UPPER("name"::text) text_pattern_ops)'
+        )
+
+
+def drop_name_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS product_name_prefix_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_product_change_feed'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-createdAt'], name='product_created_idx'),
+        ),
+        migrations.RunPython(create_name_prefix_index, drop_name_prefix_index),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:42
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0006_product_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='hasVariants',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.CreateModel(
+            name='ProductVariant',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('sku', models.CharField(max_length=64, unique=True)),
+                ('stock', models.PositiveIntegerField(default=0)),
+                ('priceOverride', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('color', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='variants', to='catalog.color')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variants', to='catalog.product')),
+                ('size', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='variants', to='catalog.size')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('stock__gt', 0)), fields=['product', 'size', 'color'], name='variant_available_idx'), models.Index(condition=models.Q(('stock__gt', 0)), fields=['size', 'color', 'product'], name='variant_option_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'size', 'color'), name='variant_unique_options')],
+            },
+        ),
+    ]
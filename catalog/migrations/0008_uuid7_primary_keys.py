@@ -0,0 +1,58 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:53
+
+import catalog.utils
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0007_product_variants'),
+    ]
+
+    # The default is applied in Python; no schema change (SQLite would
+    # otherwise rebuild every table)
+    operations = [
+        migrations.SeparateDatabaseAndState(state_operations=[
+                migrations.AlterField(
+                    model_name='brand',
+                    name='id',
+                    field=models.UUIDField(default=catalog.utils.uuid7, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='category',
+                    name='id',
+                    field=models.UUIDField(default=catalog.utils.uuid7, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='color',
+                    name='id',
+                    field=models.UUIDField(default=catalog.utils.uuid7, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='product',
+                    name='id',
+                    field=models.UUIDField(default=catalog.utils.uuid7, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='productvariant',
+                    name='id',
+                    field=models.UUIDField(default=catalog.utils.uuid7, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='size',
+                    name='id',
+                    field=models.UUIDField(default=catalog.utils.uuid7, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='subcategory',
+                    name='id',
+                    field=models.UUIDField(default=catalog.utils.uuid7, editable=False, primary_key=True, serialize=False),
+                ),
+                migrations.AlterField(
+                    model_name='tag',
+                    name='id',
+                    field=models.UUIDField(default=catalog.utils.uuid7, editable=False, primary_key=True, serialize=False),
+                ),
+        ]),
+    ]
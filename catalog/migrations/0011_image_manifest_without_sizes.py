@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:00
+
+from django.conf import settings
+from django.db import migrations
+
+
+def drop_unknown_sizes(apps, schema_editor):
+    """
+    Manifests built without a CDN template point at the original images,
+    whose size is unknown; drop the width/height they were given.
+    """
+    if getattr(settings, 'CATALOG_IMAGE_VARIANT_URL', ''):
+        return
+    Product = apps.get_model('catalog', 'Product')
+
+    def strip(variants):
+        return {name: {'url': variant['url']} for name, variant in (variants or {}).items()}
+
+    batch = []
+    for product in Product.objects.only('id', 'imageManifest').iterator(chunk_size=1000):
+        manifest = product.imageManifest or {}
+        product.imageManifest = {
+            'primary': strip(manifest['primary']) if manifest.get('primary') else None,
+            'gallery': [strip(variants) for variants in manifest.get('gallery', [])],
+        }
+        batch.append(product)
+        if len(batch) >= 1000:
+            Product.objects.bulk_update(batch, ['imageManifest'])
+            batch = []
+    if batch:
+        Product.objects.bulk_update(batch, ['imageManifest'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0010_product_relations'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_unknown_sizes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:19
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def seq_from_id(apps, schema_editor):
+    """Existing changes keep their id order; the feed head starts after them."""
+    ProductChange = apps.get_model('catalog', 'ProductChange')
+    CatalogCounter = apps.get_model('catalog', 'CatalogCounter')
+    ProductChange.objects.update(seq=F('id'))
+    head = ProductChange.objects.aggregate(head=Max('seq'))['head'] or 0
+    CatalogCounter.objects.update_or_create(name='change_feed', defaults={'value': head})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0011_image_manifest_without_sizes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogCounter',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='productchange',
+            name='seq',
+            field=models.BigIntegerField(editable=False, null=True, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='productchange',
+            index=models.Index(condition=models.Q(('seq__isnull', True)), fields=['id'], name='productchange_unsequenced_idx'),
+        ),
+        migrations.RunPython(seq_from_id, migrations.RunPython.noop),
+    ]
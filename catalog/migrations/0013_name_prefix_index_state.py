@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:37
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Record product_name_prefix_idx in the model state. 0006 already created
+    it on Postgres with the same definition; SQLite can't have it (no
+    operator classes), and its LIKE is case-insensitive without it.
+    """
+
+    dependencies = [
+        ('catalog', '0012_product_change_seq'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='product',
+                    index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), name='product_name_prefix_idx'),
+                ),
+            ],
+        ),
+    ]
@@ -1,11 +1,20 @@
-import uuid
-from django.db import models
+from decimal import Decimal
+from django.contrib.postgres.indexes import OpClass
+from django.db import models, transaction
+from django.db.models.functions import Upper
 from django.core.exceptions import ValidationError
-from .managers import FilterManager, ProductManager
+from .images import build_image_manifest, normalize_image_url
+from .managers import (
+    FilterManager, SubcategoryManager, ProductManager, ProductVariantManager, ProductChangeManager,
+    ProductRelationManager, CatalogCounterManager,
+)
+from .utils import uuid7
 
 class Category(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     name = models.CharField(max_length=100, unique=True)
+    # Maintained by ProductManager/catalog.signals; repair with `manage.py recount_filters`
+    product_count = models.PositiveIntegerField(default=0, db_index=True, editable=False)
 
     class Meta:
         verbose_name_plural = "categories"
@@ -25,8 +34,10 @@ class Category(models.Model):
     objects = FilterManager()
 
 class Brand(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     name = models.CharField(max_length=100, unique=True)
+    # Maintained by ProductManager/catalog.signals; repair with `manage.py recount_filters`
+    product_count = models.PositiveIntegerField(default=0, db_index=True, editable=False)
 
     def clean(self):
         if self.name:
@@ -42,8 +53,10 @@ class Brand(models.Model):
     objects = FilterManager()
 
 class Size(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     name = models.CharField(max_length=50, unique=True)
+    # Maintained by ProductManager/catalog.signals; repair with `manage.py recount_filters`
+    product_count = models.PositiveIntegerField(default=0, db_index=True, editable=False)
 
     def clean(self):
         if self.name:
@@ -60,8 +73,10 @@ class Size(models.Model):
     objects = FilterManager()
 
 class Color(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     name = models.CharField(max_length=50, unique=True)
+    # Maintained by ProductManager/catalog.signals; repair with `manage.py recount_filters`
+    product_count = models.PositiveIntegerField(default=0, db_index=True, editable=False)
 
     def clean(self):
         if self.name:
@@ -77,8 +92,10 @@ class Color(models.Model):
     objects = FilterManager()
 
 class Tag(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     name = models.CharField(max_length=50, unique=True)
+    # Maintained by ProductManager/catalog.signals; repair with `manage.py recount_filters`
+    product_count = models.PositiveIntegerField(default=0, db_index=True, editable=False)
 
     def clean(self):
         if self.name:
@@ -94,8 +111,10 @@ class Tag(models.Model):
     objects = FilterManager()
 
 class Subcategory(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     name = models.CharField(max_length=100)
+    # Maintained by ProductManager/catalog.signals; repair with `manage.py recount_filters`
+    product_count = models.PositiveIntegerField(default=0, db_index=True, editable=False)
     # CHANGED: CASCADE to PROTECT - prevents accidental deletion
     category = models.ForeignKey(Category, related_name='subcategories', on_delete=models.PROTECT)
 
@@ -114,20 +133,41 @@ class Subcategory(models.Model):
     def __str__(self):
         return f"{self.name} ({self.category.name})"
 
-    objects = FilterManager()
+    objects = SubcategoryManager()
 
 class Product(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     name = models.CharField(max_length=255)
-    price = models.FloatField()
-    originalPrice = models.FloatField(null=True, blank=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    originalPrice = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # Stored, indexed discount percentage so onSale filters and discount sorting
+    # are index scans instead of per-row expressions
+    discountPercent = models.GeneratedField(
+        expression=models.Case(
+            models.When(
+                originalPrice__gt=models.F('price'),
+                then=(models.F('originalPrice') - models.F('price')) * 100 / models.F('originalPrice'),
+            ),
+            default=models.Value(Decimal('0')),
+        ),
+        output_field=models.DecimalField(max_digits=5, decimal_places=2),
+        db_persist=True,
+    )
     description = models.TextField()
     image = models.URLField(blank=True, default="")
     images = models.JSONField(default=list, blank=True)
+    # Resized CDN variants for image/images, rebuilt on every save()
+    imageManifest = models.JSONField(default=dict, blank=True, editable=False)
     inStock = models.BooleanField(default=True)
+    # Set while the product has ProductVariants; sizes/colors are then derived from them
+    hasVariants = models.BooleanField(default=False, editable=False)
     createdAt = models.DateTimeField(auto_now_add=True)
+    updatedAt = models.DateTimeField(auto_now=True, db_index=True)
     rating = models.FloatField(default=0, null=True, blank=True)
     reviewCount = models.IntegerField(default=0, null=True, blank=True)
+    # Written in batches by catalog.popularity, never on save()
+    viewCount = models.BigIntegerField(default=0, editable=False)
+    popularity = models.FloatField(default=0, editable=False)
 
     # CHANGED: SET_NULL to PROTECT for critical relationships
     # This prevents accidental deletion of categories/brands that have products
@@ -142,6 +182,17 @@ class Product(models.Model):
 
     class Meta:
         ordering = ['-createdAt']  # Most recent first by default
+        indexes = [
+            models.Index(fields=['price'], name='product_price_idx'),
+            models.Index(fields=['discountPercent'], name='product_discount_idx'),
+            # Default ordering for the API and admin changelists
+            models.Index(fields=['-createdAt'], name='product_created_idx'),
+            # sortField=popular
+            models.Index(fields=['-popularity'], name='product_popularity_idx'),
+            # Admin search: name__istartswith is UPPER("name"::text) LIKE 'X%'.
+            # Postgres only (SQLite has no operator classes), see migration 0013
+            models.Index(OpClass(Upper('name'), name='text_pattern_ops'), name='product_name_prefix_idx'),
+        ]
 
     def clean(self):
         # Validate price fields
@@ -152,11 +203,134 @@ class Product(models.Model):
         if self.rating and (self.rating < 0 or self.rating > 5):
             raise ValidationError("Rating must be between 0 and 5")
 
+        # Image URL normalization
+        self.image = normalize_image_url(self.image)
+        if isinstance(self.images, list):
+            self.images = [normalize_image_url(url) for url in self.images if url]
+
     def save(self, *args, **kwargs):
         self.full_clean()
-        super().save(*args, **kwargs)
+        self.imageManifest = build_image_manifest(self.image, self.images)
+        if kwargs.get('update_fields') is None and not self._state.adding:
+            # The counters only move through catalog.popularity's batched
+            # increments; a full save must not write back a stale copy
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and not field.generated and field.name not in ('viewCount', 'popularity')
+            ]
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'image', 'images'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'imageManifest'}
+
+        # Save and move the FK filters' product_count in one transaction
+        with transaction.atomic():
+            previous = None
+            adding = self._state.adding
+            if not adding:
+                previous = (
+                    Product.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values('category_id', 'subcategory_id', 'brand_id')
+                    .first()
+                )
+            super().save(*args, **kwargs)
+            # INSERT returns generated columns, UPDATE doesn't: reload the
+            # discount so this instance (and API responses) aren't stale
+            if not adding and {'price', 'originalPrice'} & set(kwargs.get('update_fields') or ()):
+                self.refresh_from_db(fields=['discountPercent'])
+            Product.objects.sync_foreign_key_counts(self, previous)
+            ProductChange.objects.record([self.pk])
 
     def __str__(self):
         return self.name
 
-    objects = ProductManager()
\ No newline at end of file
+    objects = ProductManager()
+
+class ProductVariant(models.Model):
+    """
+    One sellable size x color combination of a product. A product's
+    sizes/colors M2Ms are kept equal to the options of its variants
+    (ProductVariantManager.sync_products), so existing payloads and facet
+    counts keep working. `stock` is the product's stock record: carts
+    reserve variants directly, and inStock follows the variants.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    product = models.ForeignKey(Product, related_name='variants', on_delete=models.CASCADE)
+    size = models.ForeignKey(Size, related_name='variants', on_delete=models.PROTECT, null=True, blank=True)
+    color = models.ForeignKey(Color, related_name='variants', on_delete=models.PROTECT, null=True, blank=True)
+    sku = models.CharField(max_length=64, unique=True)
+    stock = models.PositiveIntegerField(default=0)
+    # Overrides Product.price for this variant when set
+    priceOverride = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    objects = ProductVariantManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'size', 'color'], name='variant_unique_options'),
+        ]
+        indexes = [
+            # Availability semi-joins: in-stock variants of a product by option
+            models.Index(
+                fields=['product', 'size', 'color'], condition=models.Q(stock__gt=0),
+                name='variant_available_idx',
+            ),
+            models.Index(
+                fields=['size', 'color', 'product'], condition=models.Q(stock__gt=0),
+                name='variant_option_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return self.sku
+
+class ProductChange(models.Model):
+    """
+    Change feed entry: one row per product holding its latest change.
+    Every change re-inserts the row; `seq`, its position in the feed and the
+    sync cursor, is given out after commit (ProductChangeManager.sequence),
+    so it follows commit order. Deleted products stay behind as tombstones.
+    """
+    # Not a ForeignKey: tombstones outlive the product they describe
+    product_id = models.UUIDField(unique=True)
+    deleted = models.BooleanField(default=False)
+    changedAt = models.DateTimeField(auto_now=True)
+    seq = models.BigIntegerField(null=True, unique=True, editable=False)
+
+    objects = ProductChangeManager()
+
+    class Meta:
+        indexes = [
+            # Changes still waiting for a feed position
+            models.Index(fields=['id'], condition=models.Q(seq__isnull=True), name='productchange_unsequenced_idx'),
+        ]
+
+    def __str__(self):
+        return f"{'delete' if self.deleted else 'upsert'} {self.product_id} @ {self.pk}"
+
+class CatalogCounter(models.Model):
+    """A named counter that only moves forward, e.g. the change feed head."""
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    objects = CatalogCounterManager()
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+class ProductRelation(models.Model):
+    """
+    Precomputed "related products": the top neighbours of each product,
+    rebuilt in bulk by catalog.related. Keyed (product, rank), so a
+    product's list is one primary key range scan.
+    """
+    pk = models.CompositePrimaryKey('product', 'rank')
+    product = models.ForeignKey(Product, related_name='relations', on_delete=models.CASCADE)
+    rank = models.PositiveSmallIntegerField()
+    related = models.ForeignKey(Product, related_name='related_to', on_delete=models.CASCADE)
+    score = models.FloatField()
+
+    objects = ProductRelationManager()
+
+    def __str__(self):
+        return f"{self.product_id} #{self.rank}: {self.related_id}"
@@ -0,0 +1,127 @@
+# popularity.py
+"""
+Write-behind product popularity.
+
+View and click events are added to a per-process buffer instead of
+updating Product on every request. A background thread flushes the buffer
+every CATALOG_POPULARITY_FLUSH_INTERVAL seconds (sooner once it holds
+CATALOG_POPULARITY_MAX_BUFFER products) with one batched UPDATE per
+CATALOG_POPULARITY_BATCH_SIZE products, so requests never wait on the
+write. It is flushed again when the process exits normally, including a
+gunicorn worker recycle; a killed process loses at most one interval.
+
+Product.popularity is a forward-decayed score: an event at time t adds
+weight * 2 ** ((t - epoch) / half_life). Older events count exponentially
+less relative to new ones, yet stored scores never need rewriting, so
+sorting by the indexed column ranks by recent popularity.
+"""
+import atexit
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+from django.conf import settings
+from django.db import close_old_connections, models, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+# product id -> [events, score]
+_buffer = defaultdict(lambda: [0, 0.0])
+# Set to flush before the interval is up
+_wake = threading.Event()
+_flusher = None
+
+
+def decay_weight(when=None):
+    """Forward-decay multiplier for an event at `when` (default: now)."""
+    epoch = datetime.fromisoformat(settings.CATALOG_POPULARITY_EPOCH)
+    age = ((when or timezone.now()) - epoch).total_seconds()
+    return 2 ** (age / (settings.CATALOG_POPULARITY_HALF_LIFE_DAYS * 86400))
+
+
+def record_event(product_id, event='view'):
+    """Count one `event` (a CATALOG_POPULARITY_WEIGHTS key) for a product."""
+    if _flusher is None or not _flusher.is_alive():
+        start_flusher()
+
+    score = settings.CATALOG_POPULARITY_WEIGHTS[event] * decay_weight()
+    with _lock:
+        entry = _buffer[product_id]
+        entry[0] += 1
+        entry[1] += score
+        if len(_buffer) >= settings.CATALOG_POPULARITY_MAX_BUFFER:
+            _wake.set()
+
+
+def start_flusher():
+    """Start this process's flush thread, unless it is running (threads don't survive a fork)."""
+    global _flusher
+
+    with _lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=flush_periodically, name='popularity-flush', daemon=True)
+            _flusher.start()
+
+
+def flush_periodically():
+    while True:
+        _wake.wait(settings.CATALOG_POPULARITY_FLUSH_INTERVAL)
+        _wake.clear()
+        flush()
+        # Outside the request cycle, so expire the thread's connection here
+        close_old_connections()
+
+
+def flush():
+    """Write buffered counts to the database; returns the number of products updated."""
+    global _buffer
+
+    with _lock:
+        pending, _buffer = _buffer, defaultdict(lambda: [0, 0.0])
+    if not pending:
+        return 0
+
+    try:
+        return write(pending)
+    except Exception:
+        # Keep the counts for the next flush rather than losing them
+        logger.exception("Flushing popularity counts for %d products failed", len(pending))
+        with _lock:
+            for product_id, (events, score) in pending.items():
+                _buffer[product_id][0] += events
+                _buffer[product_id][1] += score
+        return 0
+
+
+def write(pending):
+    """
+    Add {product id: (events, score)} to viewCount/popularity. Ids go in
+    sorted order so concurrent flushes from other workers lock rows in the
+    same order and can't deadlock.
+    """
+    from .models import Product
+
+    product_ids = sorted(pending)
+    batch_size = settings.CATALOG_POPULARITY_BATCH_SIZE
+    updated = 0
+    for offset in range(0, len(product_ids), batch_size):
+        batch = product_ids[offset:offset + batch_size]
+        with transaction.atomic():
+            updated += Product.objects.filter(pk__in=batch).update(
+                viewCount=F('viewCount') + Case(
+                    *[When(pk=pk, then=Value(pending[pk][0])) for pk in batch],
+                    output_field=models.BigIntegerField(),
+                ),
+                popularity=F('popularity') + Case(
+                    *[When(pk=pk, then=Value(pending[pk][1])) for pk in batch],
+                    output_field=models.FloatField(),
+                ),
+            )
+    return updated
+
+
+atexit.register(flush)
@@ -0,0 +1,119 @@
+# related.py
+"""
+Batch computation of "related products".
+
+Products are compared within their category. Each one gets a sparse
+feature vector: a constant category feature, its subcategory and brand,
+and its tags weighted by inverse document frequency. Vectors are L2
+normalized, so a chunk of rows times the category's matrix gives cosine
+similarities. These are damped by the price gap (halved every
+CATALOG_RELATED_PRICE_SCALE doublings of the price ratio). The top
+CATALOG_RELATED_K neighbours of each product are stored in
+ProductRelation.
+
+Similarity blocks are computed CATALOG_RELATED_CHUNK_CELLS at a time, so
+memory stays bounded however large a category gets.
+"""
+import math
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # numpy/scipy are optional; the related endpoint is then empty
+    np = sparse = None
+
+from django.conf import settings
+
+from .cache import bump_catalog_version
+
+
+def build_related_products(k=None):
+    """Recompute ProductRelation for every category. Returns summary counts."""
+    from .models import Category, Product, ProductRelation, Tag
+
+    if np is None:
+        raise RuntimeError("numpy and scipy are required to build related products")
+    k = k or settings.CATALOG_RELATED_K
+
+    product_total = Product.objects.count()
+    idf = {
+        pk: math.log((1 + product_total) / (1 + count))
+        for pk, count in Tag.objects.values_list('pk', 'product_count')
+    }
+
+    stats = {'categories': 0, 'products': 0, 'relations': 0}
+    for category_id in [*Category.objects.values_list('pk', flat=True), None]:
+        products = Product.objects.filter(category_id=category_id)
+        stats['categories'] += 1
+        stats['products'] += products.count()
+        stats['relations'] += ProductRelation.objects.replace(products, related_in_block(products, idf, k))
+
+    bump_catalog_version()
+    return stats
+
+
+def related_in_block(products, idf, k):
+    """Unsaved ProductRelation rows for the products of one category, in batches."""
+    from .models import Product, ProductRelation
+
+    rows = list(products.order_by('pk').values_list('pk', 'subcategory_id', 'brand_id', 'price'))
+    if len(rows) < 2:
+        return
+    ids = [row[0] for row in rows]
+    position = {pk: i for i, pk in enumerate(ids)}
+
+    weights = settings.CATALOG_RELATED_WEIGHTS
+    columns = {}
+
+    def column(key):
+        return columns.setdefault(key, len(columns))
+
+    entries = []  # (row, column, value)
+    for i, (_, subcategory_id, brand_id, _) in enumerate(rows):
+        entries.append((i, column('category'), weights['category']))
+        if subcategory_id:
+            entries.append((i, column(('subcategory', subcategory_id)), weights['subcategory']))
+        if brand_id:
+            entries.append((i, column(('brand', brand_id)), weights['brand']))
+
+    tags = {}
+    for product_id, tag_id in Product.tags.through.objects.filter(product__in=products).values_list(
+        'product_id', 'tag_id'
+    ).iterator(chunk_size=10000):
+        tags.setdefault(position[product_id], []).append(tag_id)
+    for i, tag_ids in tags.items():
+        # Spread the tag weight so heavily tagged products don't dominate
+        scale = weights['tags'] / math.sqrt(len(tag_ids))
+        entries.extend((i, column(('tag', tag_id)), scale * idf.get(tag_id, 1.0)) for tag_id in tag_ids)
+
+    row_index, column_index, values = zip(*entries)
+    features = sparse.csr_matrix(
+        (np.array(values, dtype=np.float32), (row_index, column_index)), shape=(len(rows), len(columns))
+    )
+    norms = np.sqrt(features.multiply(features).sum(axis=1)).A1
+    features = sparse.diags(1 / np.maximum(norms, 1e-12)).astype(np.float32) @ features
+    features_t = features.T.tocsc()
+    log_price = np.log2(np.maximum(np.array([float(row[3]) for row in rows]), 0.01))
+
+    k = min(k, len(rows) - 1)
+    chunk = max(1, settings.CATALOG_RELATED_CHUNK_CELLS // len(rows))
+    for start in range(0, len(rows), chunk):
+        stop = min(start + chunk, len(rows))
+        scores = (features[start:stop] @ features_t).toarray()
+        scores *= np.exp2(
+            -np.abs(log_price[start:stop, None] - log_price[None, :]) / settings.CATALOG_RELATED_PRICE_SCALE
+        )
+        scores[np.arange(stop - start), np.arange(start, stop)] = -1  # never related to itself
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        yield [
+            ProductRelation(product_id=ids[start + offset], rank=rank, related_id=ids[j], score=score)
+            for offset, (neighbours, neighbour_scores) in enumerate(zip(top.tolist(), top_scores.tolist()))
+            for rank, (j, score) in enumerate(zip(neighbours, neighbour_scores))
+            if score > 0
+        ]
@@ -1,3 +1,4 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import (
     Category,
@@ -6,9 +7,41 @@ from .models import (
     Color,
     Tag,
     Subcategory,
-    Product
+    Product,
+    ProductVariant
 )
 
+class SparseFieldsMixin:
+    """
+    Trim readable fields to the set passed in the serializer context under
+    'fields' (used for ?fields= / ?exclude= on list and retrieve).
+
+    Subclasses describe the model columns behind each field in
+    `field_columns` and the M2M fields in `prefetch_fields` so the view can
+    trim the SQL to match. `detail_only_fields` are left out of list-style
+    responses unless requested by name.
+    """
+    field_columns = {}
+    prefetch_fields = ()
+    detail_only_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.context.get('fields')
+        if requested is None:
+            return
+        for name in list(self.fields):
+            if name not in requested and not self.fields[name].write_only:
+                self.fields.pop(name)
+
+    @classmethod
+    def readable_fields(cls):
+        return [name for name, field in cls().fields.items() if not field.write_only]
+
+    @classmethod
+    def columns_for(cls, field_name):
+        return cls.field_columns.get(field_name, [field_name])
+
 # Keep your existing read-only serializers as-is
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -43,7 +76,15 @@ class SubcategorySerializer(serializers.ModelSerializer):
         model = Subcategory
         fields = ['id', 'name', 'category', 'category_name']
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductVariantSerializer(serializers.ModelSerializer):
+    size = serializers.CharField(source='size.name', read_only=True, default=None)
+    color = serializers.CharField(source='color.name', read_only=True, default=None)
+
+    class Meta:
+        model = ProductVariant
+        fields = ['id', 'sku', 'size', 'color', 'stock', 'priceOverride']
+
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     # Read-only nested serializers for response
     category = CategorySerializer(read_only=True)
     subcategory = SubcategorySerializer(read_only=True)
@@ -51,6 +92,10 @@ class ProductSerializer(serializers.ModelSerializer):
     sizes = SizeSerializer(many=True, read_only=True)
     colors = ColorSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
+    variants = ProductVariantSerializer(many=True, read_only=True)
+
+    # Generated column; declared explicitly so schema generation sees its precision
+    discountPercent = serializers.DecimalField(max_digits=5, decimal_places=2, read_only=True)
 
     # Write-only fields for input - support BOTH IDs and names
     category_id = serializers.UUIDField(required=False, allow_null=True, write_only=True)
@@ -86,16 +131,32 @@ class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = [
-            'id', 'name', 'price', 'originalPrice', 'description', 'image', 'images',
-            'inStock', 'createdAt', 'rating', 'reviewCount',
+            'id', 'name', 'price', 'originalPrice', 'discountPercent', 'description',
+            'image', 'images', 'imageManifest', 'inStock', 'hasVariants', 'createdAt', 'updatedAt',
+            'rating', 'reviewCount',
             # Read-only nested objects
-            'category', 'subcategory', 'brand', 'sizes', 'colors', 'tags',
+            'category', 'subcategory', 'brand', 'sizes', 'colors', 'tags', 'variants',
             # Write-only input fields
             'category_id', 'category_name', 'subcategory_id', 'subcategory_name',
             'brand_id', 'brand_name', 'size_ids', 'size_names',
             'color_ids', 'color_names', 'tag_ids', 'tag_names'
         ]
-        read_only_fields = ['id', 'createdAt', 'rating', 'reviewCount']
+        read_only_fields = [
+            'id', 'discountPercent', 'imageManifest', 'hasVariants', 'createdAt', 'updatedAt', 'rating', 'reviewCount'
+        ]
+
+    # Columns loaded for each nested field; scalar fields map to themselves
+    field_columns = {
+        'category': ['category__id', 'category__name'],
+        'subcategory': [
+            'subcategory__id', 'subcategory__name',
+            'subcategory__category__id', 'subcategory__category__name'
+        ],
+        'brand': ['brand__id', 'brand__name'],
+    }
+    prefetch_fields = ('sizes', 'colors', 'tags', 'variants')
+    # Primary + gallery x every variant is too heavy for each row of a list
+    detail_only_fields = ('imageManifest',)
 
     def validate(self, data):
         """
@@ -205,26 +266,56 @@ class ProductSerializer(serializers.ModelSerializer):
         validated_data.pop('color_names', None)
         validated_data.pop('tag_names', None)
 
-        # Update basic fields
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-
-        # Update foreign keys
-        if category_id is not None:
-            instance.category = Category.objects.get(id=category_id) if category_id else None
-        if subcategory_id is not None:
-            instance.subcategory = Subcategory.objects.get(id=subcategory_id) if subcategory_id else None
-        if brand_id is not None:
-            instance.brand = Brand.objects.get(id=brand_id) if brand_id else None
-
-        instance.save()
-
-        # Update many-to-many
-        if size_ids is not None:
-            instance.sizes.set(Size.objects.filter(id__in=size_ids))
-        if color_ids is not None:
-            instance.colors.set(Color.objects.filter(id__in=color_ids))
-        if tag_ids is not None:
-            instance.tags.set(Tag.objects.filter(id__in=tag_ids))
-
-        return instance
\ No newline at end of file
+        # Filter product counts move with the changes, so apply them atomically
+        with transaction.atomic():
+            # Update basic fields
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+
+            # Update foreign keys
+            if category_id is not None:
+                instance.category = Category.objects.get(id=category_id) if category_id else None
+            if subcategory_id is not None:
+                instance.subcategory = Subcategory.objects.get(id=subcategory_id) if subcategory_id else None
+            if brand_id is not None:
+                instance.brand = Brand.objects.get(id=brand_id) if brand_id else None
+
+            instance.save()
+
+            # Update many-to-many
+            if size_ids is not None:
+                instance.sizes.set(Size.objects.filter(id__in=size_ids))
+            if color_ids is not None:
+                instance.colors.set(Color.objects.filter(id__in=color_ids))
+            if tag_ids is not None:
+                instance.tags.set(Tag.objects.filter(id__in=tag_ids))
+
+        return instance
+
+class ProductCardSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Compact read-only shape for product grids (?view=card).
+    Emits the card-sized image variant instead of the full images array.
+    """
+    brand = BrandSerializer(read_only=True)
+    discountPercent = serializers.DecimalField(max_digits=5, decimal_places=2, read_only=True)
+    image = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = [
+            'id', 'name', 'price', 'originalPrice', 'discountPercent', 'image',
+            'inStock', 'rating', 'reviewCount', 'brand'
+        ]
+        read_only_fields = fields
+
+    field_columns = {
+        'image': ['imageManifest'],
+        'brand': ['brand__id', 'brand__name'],
+    }
+
+    def get_image(self, obj):
+        primary = (obj.imageManifest or {}).get('primary')
+        if primary and 'card' in primary:
+            return primary['card']
+        return None
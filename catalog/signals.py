@@ -0,0 +1,124 @@
+# signals.py
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import bump_catalog_version
+from .models import Product, ProductChange, ProductVariant, Category, Subcategory, Brand, Size, Color, Tag
+
+# Product M2M through model -> (product field name, filter model)
+M2M_FILTERS = {
+    Product.sizes.through: ('sizes', Size),
+    Product.colors.through: ('colors', Color),
+    Product.tags.through: ('tags', Tag),
+}
+
+
+@receiver(m2m_changed)
+def sync_m2m_product_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keep Size/Color/Tag.product_count in step with the product M2M tables.
+    Runs inside the same transaction as the add/remove/clear.
+    """
+    if sender not in M2M_FILTERS:
+        return
+    _, filter_model = M2M_FILTERS[sender]
+    product_column, filter_column = f'{Product._meta.model_name}_id', f'{filter_model._meta.model_name}_id'
+
+    if reverse:
+        # instance is a Size/Color/Tag; pk_set holds product ids
+        links = sender.objects.filter(**{filter_column: instance.pk})
+        if action == 'pre_remove':
+            instance._removed_links = links.filter(**{f'{product_column}__in': pk_set}).count()
+        elif action == 'post_remove':
+            filter_model.objects.adjust_product_count([instance.pk], -instance._removed_links)
+        elif action == 'post_add':
+            filter_model.objects.adjust_product_count([instance.pk], len(pk_set))
+        elif action == 'pre_clear':
+            instance._cleared_product_ids = list(links.values_list(product_column, flat=True))
+        elif action == 'post_clear':
+            filter_model.objects.filter(pk=instance.pk).update(product_count=0)
+        return
+
+    # instance is a Product; pk_set holds filter ids
+    links = sender.objects.filter(**{product_column: instance.pk})
+    if action == 'pre_remove':
+        # remove() reports every requested id, linked or not
+        instance._removed_filter_ids = list(
+            links.filter(**{f'{filter_column}__in': pk_set}).values_list(filter_column, flat=True)
+        )
+    elif action == 'post_remove':
+        filter_model.objects.adjust_product_count(instance._removed_filter_ids, -1)
+    elif action == 'post_add':
+        filter_model.objects.adjust_product_count(pk_set, 1)
+    elif action == 'pre_clear':
+        instance._removed_filter_ids = list(links.values_list(filter_column, flat=True))
+    elif action == 'post_clear':
+        filter_model.objects.adjust_product_count(instance._removed_filter_ids, -1)
+
+
+@receiver(m2m_changed)
+def record_m2m_changes(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    An M2M edit changes the product payload: bump updatedAt and move the
+    affected products to the head of the change feed.
+    """
+    if sender not in M2M_FILTERS or action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        product_ids = [instance.pk]
+    elif action == 'post_clear':
+        product_ids = instance._cleared_product_ids
+    else:
+        product_ids = pk_set
+
+    if product_ids:
+        Product.objects.filter(pk__in=product_ids).update(updatedAt=timezone.now())
+        ProductChange.objects.record(product_ids)
+
+
+@receiver(pre_delete, sender=Product)
+def release_product_counts(sender, instance, **kwargs):
+    """
+    Decrement every filter a product is linked to before it is deleted.
+    M2M rows are removed by the delete collector without m2m_changed.
+    """
+    Category.objects.adjust_product_count([instance.category_id], -1)
+    Subcategory.objects.adjust_product_count([instance.subcategory_id], -1)
+    Brand.objects.adjust_product_count([instance.brand_id], -1)
+
+    for field_name, filter_model in M2M_FILTERS.values():
+        filter_ids = getattr(instance, field_name).values_list('pk', flat=True)
+        filter_model.objects.adjust_product_count(list(filter_ids), -1)
+
+
+@receiver(post_delete, sender=Product)
+def record_product_tombstone(sender, instance, **kwargs):
+    ProductChange.objects.record([instance.pk], deleted=True)
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def sync_variant_options(sender, instance, origin=None, **kwargs):
+    # Not when the variant goes with its product: release_product_counts
+    # has already accounted for the product's options
+    if isinstance(origin, Product) or getattr(origin, 'model', None) is Product:
+        return
+    ProductVariant.objects.sync_products([instance.product_id])
+
+
+CACHED_MODELS = (Product, Category, Subcategory, Brand, Size, Color, Tag)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_catalog_cache(sender, **kwargs):
+    if sender in CACHED_MODELS:
+        bump_catalog_version()
+
+
+@receiver(m2m_changed)
+def invalidate_catalog_cache_m2m(sender, action, **kwargs):
+    if sender in M2M_FILTERS and action in ('post_add', 'post_remove', 'post_clear'):
+        bump_catalog_version()
@@ -0,0 +1,53 @@
+# tasks.py
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from jobs.registry import task
+
+from . import related
+from .models import Product
+from .serializers import ProductSerializer
+
+
+@task('catalog.import_products')
+def import_products(products):
+    """
+    Create products from a list of ProductSerializer payloads. Invalid rows
+    are reported by index and skipped, including rows that only fail model
+    validation or a constraint on save (each row saves in its own savepoint).
+    The import commits as a whole, so a crash rolls it back and the retry
+    starts clean.
+    """
+    valid, errors = [], []
+    for index, data in enumerate(products):
+        serializer = ProductSerializer(data=data)
+        if serializer.is_valid():
+            valid.append((index, serializer))
+        else:
+            errors.append({'index': index, 'errors': serializer.errors})
+
+    created = 0
+    with transaction.atomic():
+        # One upsert per filter table for the whole batch; rows then only look them up
+        filters = Product.objects.upsert_filters([serializer.validated_data for _, serializer in valid])
+        for index, serializer in valid:
+            try:
+                with transaction.atomic():
+                    serializer.save(filters=filters)
+            except serializers.ValidationError as error:
+                errors.append({'index': index, 'errors': error.detail})
+            except ValidationError as error:
+                errors.append({'index': index, 'errors': getattr(error, 'message_dict', None) or {'non_field_errors': error.messages}})
+            except IntegrityError as error:
+                errors.append({'index': index, 'errors': {'non_field_errors': [str(error)]}})
+            else:
+                created += 1
+    errors.sort(key=lambda error: error['index'])
+    return {'created': created, 'failed': len(errors), 'errors': errors}
+
+
+@task('catalog.build_related_products')
+def build_related_products(k=None):
+    """Recompute the related products table (see catalog.related)."""
+    return related.build_related_products(k)
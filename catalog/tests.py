@@ -1,3 +1,854 @@
-from django.test import TestCase
+import gzip
+import os
+import tempfile
+import threading
+import uuid
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipIf
+from urllib.parse import urlencode
+from xml.etree import ElementTree
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework.throttling import ScopedRateThrottle
+
+from config.db_router import replica_reads_allowed
+from orders.models import Cart, CartItem, Order, OrderItem, StockItem
+
+from . import cache as catalog_cache, feeds, index as catalog_index, popularity, related as catalog_related
+from .models import CatalogCounter, Product, ProductChange, ProductRelation, ProductVariant, Category, Subcategory, Brand, Size, Tag
+from .serializers import SubcategorySerializer
+from .utils import uuid7
+
+
+@override_settings(CATALOG_VERSION_CHECK_INTERVAL=60)
+class SubcategoryQueryCountTests(TestCase):
+    """Listing subcategories must not issue a query per row for its category."""
+
+    def setUp(self):
+        cache.clear()
+        # Read the catalog version now, not inside a counted block
+        catalog_cache._version['expires'] = 0.0
+        catalog_cache.catalog_version()
+        self.client = APIClient()
+
+    def add_subcategories(self, count):
+        for index in range(count):
+            category = Category.objects.create(name=f'Category {Category.objects.count()}')
+            Subcategory.objects.create(name=f'Sub {index}', category=category)
+
+    def assertConstantQueries(self, num, func):
+        """`func` runs in `num` queries with few and with many subcategories."""
+        self.add_subcategories(2)
+        with self.assertNumQueries(num):
+            func()
+        self.add_subcategories(10)
+        cache.clear()
+        with self.assertNumQueries(num):
+            func()
+
+    def test_str(self):
+        self.assertConstantQueries(1, lambda: [str(sub) for sub in Subcategory.objects.all()])
+
+    def test_serializer(self):
+        self.assertConstantQueries(1, lambda: SubcategorySerializer(Subcategory.objects.all(), many=True).data)
+
+    def test_category_reverse_relation(self):
+        def render():
+            for category in Category.objects.prefetch_related('subcategories'):
+                [str(sub) for sub in category.subcategories.all()]
+
+        self.assertConstantQueries(2, render)
+
+    def test_subcategories_all_endpoint(self):
+        def fetch():
+            response = self.client.get('/api/subcategories/all/')
+            self.assertEqual(response.status_code, 200)
+
+        self.assertConstantQueries(1, fetch)
+
+    def test_subcategory_viewset_list(self):
+        def fetch():
+            response = self.client.get('/api/subcategories/')
+            self.assertEqual(response.status_code, 200)
+
+        self.assertConstantQueries(1, fetch)
+
+    def test_filters_endpoint(self):
+        def fetch():
+            response = self.client.get('/api/filters/')
+            self.assertEqual(response.status_code, 200)
+
+        self.assertConstantQueries(7, fetch)
+
+    # The manifest storage needs collectstatic to have run
+    @override_settings(STORAGES={
+        **settings.STORAGES,
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    })
+    def test_admin_changelist(self):
+        user = get_user_model().objects.create_superuser(
+            email='admin@example.com', full_name='Admin', password='password'
+        )
+        self.client.force_login(user)
+
+        def fetch():
+            response = self.client.get('/admin/catalog/subcategory/')
+            self.assertEqual(response.status_code, 200)
+
+        # session, user, count, page, category list filter
+        self.assertConstantQueries(6, fetch)
+
+
+class ProductDiscountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.product = Product.objects.create(
+            name='Sneaker', description='Shoe', price='19.99', originalPrice='29.99',
+        )
+
+    def test_discount_is_generated(self):
+        self.assertEqual(str(self.product.discountPercent), '33.34')
+        self.assertEqual(Product.objects.filter(discountPercent__gt=0).count(), 1)
+
+    def test_price_update_reloads_discount(self):
+        response = self.client.patch(f'/api/products/{self.product.pk}/', {'price': '25'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(str(response.data['discountPercent']), '16.64')
+
+        self.product.price = 30
+        self.product.save()
+        self.assertEqual(str(self.product.discountPercent), '0.00')
+
+    def assertPriceFilters(self):
+        for name in ('minPrice', 'maxPrice'):
+            for value in ('abc', 'NaN', 'sNaN', 'Infinity', '-Infinity', '1e'):
+                cache.clear()
+                response = self.client.get('/api/products/', {name: value})
+                self.assertEqual(response.status_code, 400, f'{name}={value}')
+        cache.clear()
+        response = self.client.get('/api/products/', {'minPrice': '10', 'maxPrice': '1e2'})
+        self.assertEqual(response.data['count'], 1)
+
+    def test_invalid_price_filter(self):
+        self.assertPriceFilters()
+
+    @override_settings(CATALOG_INDEX_ENABLED=True)
+    def test_invalid_price_filter_on_the_index(self):
+        catalog_index._index = None
+        self.addCleanup(setattr, catalog_index, '_index', None)
+        self.assertPriceFilters()
+        self.assertIsNotNone(catalog_index._index)
+
+
+class ImageManifestTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.product = Product.objects.create(
+            name='Sneaker', description='Shoe', price='19.99', image='http://images.example.com/a.jpg',
+        )
+
+    def test_list_leaves_out_manifest_unless_requested(self):
+        row = self.client.get('/api/products/').data['results'][0]
+        self.assertNotIn('imageManifest', row)
+        row = self.client.get('/api/products/', {'fields': 'id,imageManifest'}).data['results'][0]
+        self.assertIn('imageManifest', row)
+        self.assertIn('imageManifest', self.client.get(f'/api/products/{self.product.pk}/').data)
+
+    @override_settings(CATALOG_IMAGE_VARIANT_URL='')
+    def test_originals_have_no_dimensions(self):
+        self.product.save()
+        self.assertEqual(self.product.imageManifest['primary']['card'], {'url': 'https://images.example.com/a.jpg'})
+
+    @override_settings(CATALOG_IMAGE_VARIANT_URL='https://cdn.example.com/{width}x{height}/{url}')
+    def test_cdn_variants(self):
+        self.product.save()
+        card = self.product.imageManifest['primary']['card']
+        self.assertEqual((card['width'], card['height']), (480, 480))
+        self.assertTrue(card['url'].startswith('https://cdn.example.com/480x480/'))
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.product = Product.objects.create(
+            name='Sneaker', description='Shoe', price='19.99', brand=Brand.objects.create(name='Acme'),
+        )
+        self.product.sizes.add(Size.objects.create(name='M'))
+        self.product.tags.add(Tag.objects.create(name='Sale'))
+
+    def get(self, url, params):
+        """The response and the SQL run against the product tables."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        return response, [query['sql'] for query in queries if 'catalog_product' in query['sql']]
+
+    def test_fields_and_exclude_shape_the_response(self):
+        row = self.client.get('/api/products/', {'fields': 'id, name,brand'}).data['results'][0]
+        self.assertEqual(set(row), {'id', 'name', 'brand'})
+        self.assertEqual(row['brand']['name'], 'Acme')
+
+        row = self.client.get('/api/products/', {'exclude': 'description,tags'}).data['results'][0]
+        self.assertNotIn('description', row)
+        self.assertNotIn('tags', row)
+        self.assertIn('sizes', row)
+
+        row = self.client.get('/api/products/', {'fields': 'id,name,price', 'exclude': 'price'}).data['results'][0]
+        self.assertEqual(set(row), {'id', 'name'})
+
+        detail = self.client.get(f'/api/products/{self.product.pk}/', {'fields': 'name'}).data
+        self.assertEqual(detail, {'name': 'Sneaker'})
+
+    def test_unknown_fields_are_rejected(self):
+        for params in ({'fields': 'id,secret'}, {'exclude': 'nope'}, {'fields': 'size_ids'}):
+            response = self.client.get('/api/products/', params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('fields', response.data)
+        response = self.client.get(f'/api/products/{self.product.pk}/', {'fields': 'secret'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_queries_load_only_what_is_returned(self):
+        response, queries = self.get('/api/products/', {'fields': 'id,name'})
+        self.assertEqual(response.status_code, 200)
+        select = next(sql for sql in queries if 'catalog_product"."name' in sql and 'COUNT' not in sql)
+        self.assertNotIn('"description"', select)
+        self.assertNotIn('catalog_brand', select)
+        # No prefetches for sizes, colors, tags or variants
+        self.assertFalse([sql for sql in queries if 'catalog_product_sizes' in sql or 'catalog_productvariant' in sql])
+
+        response, queries = self.get('/api/products/', {'fields': 'id,brand,sizes'})
+        self.assertEqual(response.status_code, 200)
+        select = next(sql for sql in queries if 'catalog_brand' in sql)
+        self.assertNotIn('"description"', select)
+        self.assertTrue([sql for sql in queries if 'catalog_product_sizes' in sql])
+        self.assertFalse([sql for sql in queries if 'catalog_product_tags' in sql])
+
+    def test_trimmed_response_takes_fewer_queries(self):
+        _, full = self.get('/api/products/', {'page': 1})
+        _, sparse = self.get('/api/products/', {'fields': 'id,name,price'})
+        # COUNT and the page, against one per prefetched relation as well
+        self.assertEqual(len(sparse), 2)
+        self.assertGreater(len(full), len(sparse))
+
+
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def create(self, name):
+        return Product.objects.create(name=name, description='Feed test', price='5.00')
+
+    def sync(self, cursor):
+        response = self.client.get('/api/products/changes/', {'since': cursor})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_upserts_and_tombstones(self):
+        first, second = self.create('First'), self.create('Second')
+        page = self.sync(0)
+        self.assertEqual([(r['op'], r['id']) for r in page['results']], [('upsert', first.pk), ('upsert', second.pk)])
+        self.assertFalse(page['hasMore'])
+
+        first_id = first.pk
+        first.delete()
+        second.name = 'Renamed'
+        second.save()
+        page = self.sync(page['cursor'])
+        self.assertEqual([(r['op'], r['id']) for r in page['results']], [('delete', first_id), ('upsert', second.pk)])
+        self.assertEqual(page['results'][1]['product']['name'], 'Renamed')
+        self.assertEqual(self.sync(page['cursor'])['results'], [])
+
+    def test_limit_must_be_1_to_1000(self):
+        self.create('Only')
+        for limit in ('0', '-1', '1001', 'abc', '1.5'):
+            response = self.client.get('/api/products/changes/', {'limit': limit})
+            self.assertEqual(response.status_code, 400, limit)
+        self.assertEqual(self.client.get('/api/products/changes/', {'since': 'x'}).status_code, 400)
+        page = self.client.get('/api/products/changes/', {'limit': 1}).data
+        self.assertEqual((len(page['results']), page['hasMore']), (1, False))
+
+    def test_late_commit_lands_after_the_cursor(self):
+        early, late = self.create('Early'), self.create('Late')
+        ProductChange.objects.filter(product_id=late.pk).delete()
+        cursor = self.sync(0)['cursor']
+
+        # A transaction that took a lower id than an already synced change
+        # and committed afterwards
+        lowest = ProductChange.objects.order_by('pk').first().pk
+        ProductChange.objects.create(pk=lowest - 1, product_id=late.pk)
+        self.assertEqual([r['id'] for r in self.sync(cursor)['results']], [late.pk])
+        self.assertEqual(early.pk, ProductChange.objects.get(seq=cursor).product_id)
+
+
+@override_settings(CATALOG_FEEDS_CHUNK_SIZE=2)
+class FeedBuilderTests(TestCase):
+    """Chunks of two; product ids are 10, 20, ... so tests can place new ids between chunks."""
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = root.name
+        for n in range(1, 6):
+            self.create(n * 10)
+        self.assertEqual(self.build(full=True), [0, 1, 2])
+
+    def create(self, n):
+        return Product.objects.create(
+            id=uuid.UUID(int=n), name=f'Product {n}', description='Feed', price='5.00',
+        )
+
+    def build(self, **kwargs):
+        return feeds.FeedBuilder(self.root).build(**kwargs)
+
+    def sitemaps(self):
+        return {
+            name: os.stat(os.path.join(self.root, name)).st_ino
+            for name in os.listdir(self.root) if name.startswith('sitemap-products-')
+        }
+
+    def rewritten(self, **kwargs):
+        """Build, checking the returned chunk indexes against the files actually replaced."""
+        before = self.sitemaps()
+        written = self.build(**kwargs)
+        after = self.sitemaps()
+        replaced = sorted(
+            index for index in range(len(after)) if before.get(feeds.sitemap_name(index)) != after[feeds.sitemap_name(index)]
+        )
+        self.assertEqual(written, replaced)
+        return written
+
+    def items(self, index):
+        """(id, title) of each item in a chunk's product feed."""
+        with gzip.open(os.path.join(self.root, feeds.feed_name(index))) as f:
+            channel = ElementTree.parse(f).getroot().find('channel')
+        ns = {'g': feeds.GOOGLE_NS}
+        return [
+            (uuid.UUID(item.findtext('g:id', namespaces=ns)).int, item.findtext('g:title', namespaces=ns))
+            for item in channel.findall('item')
+        ]
+
+    def chunk_ids(self):
+        manifest = feeds.FeedBuilder(self.root).load_manifest()
+        return [[n for n, _ in self.items(index)] for index in range(len(manifest['chunks']))]
+
+    def test_full_build(self):
+        self.assertEqual(self.chunk_ids(), [[10, 20], [30, 40], [50]])
+        self.assertEqual(self.items(0)[0], (10, 'Product 10'))
+        with gzip.open(os.path.join(self.root, feeds.sitemap_name(1)), 'rt') as f:
+            self.assertIn(f'<loc>{feeds.product_url(uuid.UUID(int=30))}</loc>', f.read())
+        with open(os.path.join(self.root, feeds.SITEMAP_INDEX)) as f:
+            index = f.read()
+        self.assertEqual([feeds.sitemap_name(i) in index for i in range(4)], [True, True, True, False])
+        self.assertEqual(self.rewritten(), [])
+
+    def test_dirty_middle_chunk(self):
+        product = Product.objects.get(pk=uuid.UUID(int=40))
+        product.name = 'Renamed'
+        product.save()
+        self.assertEqual(self.rewritten(), [1])
+        self.assertEqual(self.items(1), [(30, 'Product 30'), (40, 'Renamed')])
+
+    def test_dirty_last_chunk_splits(self):
+        self.create(60)
+        self.create(70)
+        self.assertEqual(self.rewritten(), [2, 3])
+        self.assertEqual(self.chunk_ids(), [[10, 20], [30, 40], [50, 60], [70]])
+
+    def test_dirty_middle_and_last_chunks(self):
+        product = Product.objects.get(pk=uuid.UUID(int=10))
+        product.name = 'Renamed'
+        product.save()
+        self.create(60)
+        self.assertEqual(self.rewritten(), [0, 2])
+        self.assertEqual(self.items(0)[0], (10, 'Renamed'))
+        self.assertEqual(self.chunk_ids(), [[10, 20], [30, 40], [50, 60]])
+
+    def test_overflowing_middle_chunk_rebuilds_everything(self):
+        self.create(25)
+        self.assertEqual(self.rewritten(), [0, 1, 2])
+        self.assertEqual(self.chunk_ids(), [[10, 20], [25, 30], [40, 50]])
+        self.assertFalse([name for name in os.listdir(self.root) if name.startswith('.')])
+
+    def test_deleted_products(self):
+        Product.objects.get(pk=uuid.UUID(int=30)).delete()
+        Product.objects.get(pk=uuid.UUID(int=50)).delete()
+        self.assertEqual(self.rewritten(), [1, 2])
+        self.assertEqual(self.chunk_ids(), [[10, 20], [40], []])
+
+    def test_stale_chunks_are_removed(self):
+        Product.objects.filter(pk__gt=uuid.UUID(int=20)).delete()
+        self.assertEqual(self.rewritten(full=True), [0])
+        self.assertEqual(sorted(self.sitemaps()), [feeds.sitemap_name(0)])
+        self.assertEqual(
+            sorted(name for name in os.listdir(self.root) if name.startswith('feed-products-')), [feeds.feed_name(0)]
+        )
+        with open(os.path.join(self.root, feeds.SITEMAP_INDEX)) as f:
+            self.assertNotIn(feeds.sitemap_name(1), f.read())
+
+    def test_changed_chunk_size_rebuilds_everything(self):
+        with override_settings(CATALOG_FEEDS_CHUNK_SIZE=3):
+            self.assertEqual(self.rewritten(), [0, 1])
+            self.assertEqual(self.chunk_ids(), [[10, 20, 30], [40, 50]])
+            self.assertEqual(self.rewritten(), [])
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        catalog_cache._version['expires'] = 0.0
+        self.client = APIClient()
+
+    def brand_names(self):
+        return [brand['name'] for brand in self.client.get('/api/brands/all/').data]
+
+    def test_committed_write_invalidates_cached_responses(self):
+        Brand.objects.create(name='Acme')
+        self.assertEqual(self.brand_names(), ['Acme'])
+        with self.captureOnCommitCallbacks(execute=True):
+            Brand.objects.create(name='Zenith')
+        self.assertEqual(self.brand_names(), ['Acme', 'Zenith'])
+
+    def test_version_is_shared_through_the_database(self):
+        version = catalog_cache.catalog_version()
+        # Bumped by another process: this one notices once its copy expires
+        CatalogCounter.objects.advance(catalog_cache.VERSION_COUNTER)
+        self.assertEqual(catalog_cache.catalog_version(), version)
+        catalog_cache._version['expires'] = 0.0
+        self.assertEqual(catalog_cache.catalog_version(), version + 1)
+
+    def test_misses_are_filled_from_the_primary(self):
+        token = replica_reads_allowed.set(True)
+        try:
+            blob = catalog_cache.cached_blob('test', lambda: replica_reads_allowed.get())
+            self.assertIs(blob, False)
+            self.assertTrue(replica_reads_allowed.get())
+        finally:
+            replica_reads_allowed.reset(token)
+
+
+class ProductBatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        catalog_cache._version['expires'] = 0.0
+        self.client = APIClient()
+        self.brand = Brand.objects.create(name='Acme')
+        self.first, self.second, self.third = (
+            Product.objects.create(name=name, description='Batch', price='5.00', brand=self.brand)
+            for name in ('First', 'Second', 'Third')
+        )
+
+    def batch(self, ids, **params):
+        return self.client.post('/api/products/batch/?' + urlencode(params), {'ids': ids}, format='json')
+
+    def test_results_keep_the_input_order(self):
+        unknown = str(uuid.uuid4())
+        ids = [str(self.third.pk), unknown, str(self.first.pk), str(self.third.pk)]
+        response = self.batch(ids)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['name'] for row in response.data['results']], ['Third', 'First'])
+        self.assertEqual([str(pk) for pk in response.data['missing']], [unknown])
+
+        response = self.client.get('/api/products/batch/', {'ids': f'{self.second.pk}, {self.first.pk}'})
+        self.assertEqual([row['name'] for row in response.data['results']], ['Second', 'First'])
+
+    @override_settings(CATALOG_BATCH_MAX_IDS=2)
+    def test_invalid_requests(self):
+        for ids in ([], 'not a list', [str(self.first.pk), 'nope'], [str(p.pk) for p in (self.first, self.second, self.third)]):
+            response = self.batch(ids)
+            self.assertEqual(response.status_code, 400, ids)
+            self.assertIn('ids', response.data)
+        self.assertEqual(self.client.get('/api/products/batch/').status_code, 400)
+
+    def names(self, ids, **params):
+        return [row['name'] for row in self.batch([str(pk) for pk in ids], **params).data['results']]
+
+    def test_cache_hits_and_invalidation(self):
+        ids = [self.first.pk, self.second.pk]
+        self.assertEqual(self.names(ids), ['First', 'Second'])
+        # Changed without a signal or a new updatedAt: still served from the cache
+        Product.objects.filter(pk=self.first.pk).update(name='Renamed')
+        self.assertEqual(self.names(ids), ['First', 'Second'])
+        # Each fieldset is cached under its own key
+        self.assertEqual(self.names(ids, fields='id,name'), ['Renamed', 'Second'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.name = 'Edited'
+            self.second.save()
+        self.assertEqual(self.names(ids), ['Renamed', 'Edited'])
+
+    def test_renamed_brand_is_not_served_stale(self):
+        ids = [str(self.first.pk)]
+        self.assertEqual(self.batch(ids).data['results'][0]['brand']['name'], 'Acme')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.brand.name = 'Zenith'
+            self.brand.save()
+        self.assertEqual(self.batch(ids).data['results'][0]['brand']['name'], 'Zenith')
+
+
+@override_settings(CATALOG_INDEX_ENABLED=True, CATALOG_INDEX_REFRESH_INTERVAL=0)
+class CatalogIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        catalog_cache._version['expires'] = 0.0
+        catalog_index._index = None
+        self.addCleanup(setattr, catalog_index, '_index', None)
+        self.client = APIClient()
+
+    def names(self):
+        response = self.client.get('/api/products/', {'sortField': 'price', 'sortDirection': 'asc'})
+        return [product['name'] for product in response.data['results']]
+
+    def test_follows_committed_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            alpha = Product.objects.create(name='Alpha', description='Indexed', price='5.00')
+        self.assertEqual(self.names(), ['Alpha'])
+        index = catalog_index._index
+        self.assertIsNotNone(index)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name='Beta', description='Indexed', price='3.00')
+            alpha.price = '1.00'
+            alpha.save()
+        self.assertEqual(self.names(), ['Alpha', 'Beta'])
+        # Patched in place from the change feed, not rebuilt
+        self.assertIs(catalog_index._index, index)
+
+
+@override_settings(CATALOG_POPULARITY_FLUSH_INTERVAL=3600)
+class PopularityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        popularity.flush()
+        self.product = Product.objects.create(name='Popular', description='Events test', price='5.00')
+        self.client = APIClient()
+
+    def test_events_are_written_in_the_background(self):
+        with self.assertNumQueries(0):
+            popularity.record_event(self.product.pk, 'click')
+            popularity.record_event(self.product.pk, 'view')
+        self.assertTrue(popularity._flusher.is_alive())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.viewCount, 0)
+
+        self.assertEqual(popularity.flush(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.viewCount, 2)
+        # click (3) + view (1), decayed to now
+        self.assertAlmostEqual(self.product.popularity / popularity.decay_weight(), 4, places=3)
+
+    # Throttle classes read their rates once, at import
+    @mock.patch.object(ScopedRateThrottle, 'THROTTLE_RATES', {'product-events': '2/minute'})
+    def test_events_endpoint_is_throttled(self):
+        url = f'/api/products/{self.product.pk}/events/'
+        statuses = [self.client.post(url, {'type': 'click'}, format='json').status_code for _ in range(3)]
+        self.assertEqual(statuses, [202, 202, 429])
+        popularity.flush()
+
+
+# The manifest storage needs collectstatic to have run
+@override_settings(STORAGES={
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+class ProductAdminTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_superuser(
+            email='admin@example.com', full_name='Admin', password='password'
+        )
+        self.client.force_login(user)
+
+    def create(self, name, **fields):
+        return Product.objects.create(name=name, description='Admin test', price='5.00', **fields)
+
+    def search(self, term):
+        response = self.client.get('/admin/catalog/product/', {'q': term})
+        self.assertEqual(response.status_code, 200)
+        return sorted(product.name for product in response.context['cl'].result_list)
+
+    def test_search_by_name_prefix_or_id(self):
+        shoe = self.create('Red Shoe')
+        self.create('Red Hat')
+        self.create('Shoe Red')
+        self.assertEqual(self.search('red'), ['Red Hat', 'Red Shoe'])
+        # The whole term is one prefix, not one condition per word
+        self.assertEqual(self.search('red shoe'), ['Red Shoe'])
+        self.assertEqual(self.search(f' {shoe.pk} '), ['Red Shoe'])
+
+    def test_stock_actions_skip_products_with_stock_levels(self):
+        from orders.models import StockItem
+
+        manual = self.create('Manual')
+        tracked = self.create('Tracked')
+        StockItem.objects.create(product=tracked, quantity=3)
+        varied = self.create('Varied')
+        ProductVariant.objects.create(product=varied, sku='VARIED-1', stock=2)
+
+        response = self.client.post('/admin/catalog/product/', {
+            'action': 'mark_out_of_stock', '_selected_action': [manual.pk, tracked.pk, varied.pk],
+        }, follow=True)
+        self.assertContains(response, 'Skipped 2 product(s)')
+        self.assertEqual(
+            dict(Product.objects.values_list('name', 'inStock')),
+            {'Manual': False, 'Tracked': True, 'Varied': True},
+        )
+
+
+class ProductCountTests(TestCase):
+    """product_count on the filter tables follows product writes."""
+
+    def counts(self, model):
+        return dict(model.objects.values_list('name', 'product_count'))
+
+    def test_counts_follow_product_writes(self):
+        product = Product.objects.create_with_filters(
+            name='Boot', description='Counts test', price='50.00',
+            category_name='Shoes', brand_name='Acme', tag_names=['winter', 'leather'],
+        )
+        Product.objects.create_with_filters(
+            name='Sandal', description='Counts test', price='20.00', category_name='Shoes', tag_names=['summer'],
+        )
+        self.assertEqual(self.counts(Category), {'Shoes': 2})
+        self.assertEqual(self.counts(Brand), {'Acme': 1})
+        self.assertEqual(self.counts(Tag), {'winter': 1, 'leather': 1, 'summer': 1})
+
+        product.category = Category.objects.create(name='Outdoor')
+        product.save()
+        product.tags.remove(Tag.objects.get(name='winter'))
+        self.assertEqual(self.counts(Category), {'Shoes': 1, 'Outdoor': 1})
+        self.assertEqual(Tag.objects.get(name='winter').product_count, 0)
+
+        product.delete()
+        self.assertEqual(self.counts(Category), {'Shoes': 1, 'Outdoor': 0})
+        self.assertEqual(self.counts(Brand), {'Acme': 0})
+        self.assertEqual(Tag.objects.get(name='leather').product_count, 0)
+
+    def test_recount_matches(self):
+        Product.objects.create_with_filters(
+            name='Boot', description='Counts test', price='50.00', category_name='Shoes', tag_names=['winter'],
+        )
+        expected = self.counts(Category), self.counts(Tag)
+        Category.objects.update(product_count=7)
+        Tag.objects.update(product_count=0)
+        Category.objects.recount_products()
+        Tag.objects.recount_products()
+        self.assertEqual((self.counts(Category), self.counts(Tag)), expected)
+
+
+@skipIf(catalog_related.np is None, "needs numpy and scipy")
+class RelatedProductsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def create(self, name, brand, tags, price='20.00', category='Shirts'):
+        return Product.objects.create_with_filters(
+            name=name, description='Related test', price=price,
+            category_name=category, brand_name=brand, tag_names=tags,
+        )
+
+    def test_ranks_similar_products_in_the_category(self):
+        shirt = self.create('Shirt', 'Acme', ['linen', 'summer'])
+        twin = self.create('Twin', 'Acme', ['linen', 'summer'])
+        cousin = self.create('Cousin', 'Other', ['linen'], price='200.00')
+        self.create('Boot', 'Acme', ['linen', 'summer'], category='Shoes')
+
+        stats = catalog_related.build_related_products(k=5)
+        self.assertEqual(stats['products'], 4)
+
+        response = self.client.get(f'/api/products/{shirt.pk}/related/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([product['id'] for product in response.data['results']], [str(twin.pk), str(cousin.pk)])
+        response = self.client.get(f'/api/products/{shirt.pk}/related/', {'limit': 1})
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_rebuild_replaces_relations(self):
+        shirt = self.create('Shirt', 'Acme', ['linen'])
+        twin = self.create('Twin', 'Acme', ['linen'])
+        catalog_related.build_related_products()
+        twin.delete()
+        catalog_related.build_related_products()
+        self.assertFalse(ProductRelation.objects.filter(product=shirt).exists())
+
+
+class UpsertManyTests(TestCase):
+    def test_normalizes_and_deduplicates(self):
+        Tag.objects.create(name='summer')
+        with self.assertNumQueries(2):
+            tags = Tag.objects.upsert_many(['Summer', ' SUMMER ', 'beach', '', None])
+        self.assertEqual(sorted(tags), ['beach', 'summer'])
+        self.assertEqual(Tag.objects.count(), 2)
+        self.assertEqual(Size.objects.upsert_many(['xl'])['XL'].name, 'XL')
+
+    def test_returns_existing_rows(self):
+        brand = Brand.objects.create(name='Acme')
+        self.assertEqual(Brand.objects.upsert_many(['acme'])['Acme'].pk, brand.pk)
+        self.assertEqual(Brand.objects.get_or_create_normalized('acme'), (brand, False))
+        self.assertTrue(Brand.objects.get_or_create_normalized('new brand')[1])
+
+    def test_conflicting_inserts_keep_existing_rows(self):
+        # Runs the INSERT ... ON CONFLICT DO NOTHING path on every backend
+        existing = {name: Brand.objects.create(name=name) for name in ('Acme', 'Zenith')}
+        with CaptureQueriesContext(connection) as queries:
+            found, created = Brand.objects._upsert_many(['zenith', 'New', 'ACME', 'new', 'Also New'])
+        self.assertEqual(created, {'New', 'Also New'})
+        self.assertEqual({name: found[name].pk for name in existing}, {name: b.pk for name, b in existing.items()})
+        self.assertEqual(Brand.objects.count(), 4)
+        # Inserted in name order, whatever order the caller used
+        insert = next(query['sql'] for query in queries if query['sql'].startswith('INSERT'))
+        positions = [insert.index(f"'{name}'") for name in ('Acme', 'Also New', 'New', 'Zenith')]
+        self.assertEqual(positions, sorted(positions))
+
+    def test_blank_names_are_rejected(self):
+        for name in ('', '   ', None):
+            with self.assertRaises(DjangoValidationError):
+                Brand.objects.get_or_create_normalized(name)
+        self.assertFalse(Brand.objects.exists())
+
+    def test_subcategories_are_scoped_to_their_category(self):
+        shoes, bags = Category.objects.create(name='Shoes'), Category.objects.create(name='Bags')
+        a = Subcategory.objects.upsert_many(['sport'], category=shoes)['Sport']
+        b = Subcategory.objects.upsert_many(['sport'], category=bags)['Sport']
+        self.assertNotEqual(a.pk, b.pk)
+        self.assertEqual(Subcategory.objects.upsert_many(['Sport'], category=shoes)['Sport'].pk, a.pk)
+
+
+@skipIf(connection.vendor == 'sqlite', "SQLite locks the whole database for each writer")
+class ConcurrentUpsertTests(TransactionTestCase):
+    """Parallel product creates that introduce the same new filters must not collide."""
+
+    WRITERS = 8
+
+    def test_concurrent_create_with_filters(self):
+        barrier = threading.Barrier(self.WRITERS)
+        errors = []
+
+        def write(index):
+            try:
+                barrier.wait()
+                Product.objects.create_with_filters(
+                    name=f'Product {index}', description='Stress test', price='9.99',
+                    image='https://example.com/p.jpg',
+                    category_name='new category', subcategory_name='new sub', brand_name='new brand',
+                    size_names=['m', 'l'], tag_names=['fresh', f'tag {index % 2}'],
+                )
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=write, args=(i,)) for i in range(self.WRITERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Product.objects.count(), self.WRITERS)
+        self.assertEqual(list(Brand.objects.values_list('name', 'product_count')), [('New Brand', self.WRITERS)])
+        self.assertEqual(Subcategory.objects.count(), 1)
+        self.assertEqual(
+            dict(Tag.objects.values_list('name', 'product_count')),
+            {'fresh': self.WRITERS, 'tag 0': self.WRITERS // 2, 'tag 1': self.WRITERS // 2},
+        )
+        self.assertEqual(Size.objects.count(), 2)
+
+
+class ImportProductsTests(TestCase):
+    def test_rows_failing_on_save_are_reported_and_skipped(self):
+        from .tasks import import_products
+
+        result = import_products([
+            {'name': 'Good', 'description': 'Imported', 'price': '5.00', 'brand_name': 'Acme'},
+            {'name': 'Negative', 'description': 'Imported', 'price': '-1.00'},
+            {'name': ''},
+            {'name': 'Also good', 'description': 'Imported', 'price': '7.00'},
+        ])
+        self.assertEqual((result['created'], result['failed']), (2, 2))
+        self.assertEqual([error['index'] for error in result['errors']], [1, 2])
+        self.assertEqual(sorted(Product.objects.values_list('name', flat=True)), ['Also good', 'Good'])
+
+
+class Uuid7Tests(TestCase):
+    def test_layout(self):
+        for value in (uuid7(), uuid7(timezone.now())):
+            self.assertEqual((value.version, value.variant), (7, uuid.RFC_4122))
+
+    def test_ids_increase(self):
+        ids = [uuid7() for _ in range(10000)]
+        self.assertEqual(ids, sorted(set(ids)))
+
+    def test_backdated_ids_carry_the_timestamp(self):
+        created = timezone.now() - timedelta(days=30)
+        self.assertEqual(uuid7(created).int >> 80, int(created.timestamp() * 1000))
+        self.assertLess(uuid7(created), uuid7())
+
+
+class RekeyUuid7Tests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.shirt = Product.objects.create(id=uuid.uuid4(), name='Shirt', description='Rekey', price='30.00')
+        self.lamp = Product.objects.create(id=uuid.uuid4(), name='Lamp', description='Rekey', price='20.00')
+        self.shirt.tags.add(Tag.objects.create(name='sale'))
+        # Variant options fill the product's sizes
+        self.variant = ProductVariant.objects.create(
+            product=self.shirt, sku='SHIRT-M', size=Size.objects.create(name='M'), stock=5,
+        )
+        self.stock_item = StockItem.objects.create(product=self.lamp, quantity=5)
+        ProductRelation.objects.create(product=self.shirt, rank=0, related=self.lamp, score=1.0)
+
+        ordered = Cart.objects.create()
+        CartItem.objects.reserve(ordered, self.variant, 1)
+        CartItem.objects.reserve(ordered, self.stock_item, 1)
+        Order.objects.place(ordered)
+        self.cart = Cart.objects.create()
+        CartItem.objects.reserve(self.cart, self.variant, 1)
+        CartItem.objects.reserve(self.cart, self.stock_item, 1)
+        self.old_ids = {self.shirt.pk, self.lamp.pk}
+
+    def test_rekeys_rows_and_references(self):
+        call_command('rekey_uuid7', stdout=StringIO())
+        connection.check_constraints()
+
+        shirt, lamp = Product.objects.get(name='Shirt'), Product.objects.get(name='Lamp')
+        for product, old in ((shirt, self.shirt), (lamp, self.lamp)):
+            self.assertEqual(product.pk.version, 7)
+            self.assertEqual(product.pk.int >> 80, int(old.createdAt.timestamp() * 1000))
+        self.assertFalse(Product.objects.filter(pk__in=self.old_ids).exists())
+
+        self.assertEqual(ProductVariant.objects.get(pk=self.variant.pk).product_id, shirt.pk)
+        self.assertEqual(StockItem.objects.get(pk=self.stock_item.pk).product_id, lamp.pk)
+        self.assertEqual((shirt.sizes.get().name, shirt.tags.get().name), ('M', 'sale'))
+        relation = ProductRelation.objects.get()
+        self.assertEqual((relation.product_id, relation.related_id), (shirt.pk, lamp.pk))
+        self.assertEqual(
+            sorted((item.variant or item.stock_item).product.name for item in self.cart.items.all()), ['Lamp', 'Shirt']
+        )
+        self.assertEqual(set(OrderItem.objects.values_list('product', flat=True)), {shirt.pk, lamp.pk})
+
+        changes = dict(ProductChange.objects.values_list('product_id', 'deleted'))
+        self.assertEqual(changes, {**dict.fromkeys(self.old_ids, True), shirt.pk: False, lamp.pk: False})
+
+    def test_v7_rows_are_left_alone(self):
+        fresh = Product.objects.create(name='Fresh', description='Rekey', price='5.00')
+        out = StringIO()
+        call_command('rekey_uuid7', '--batch-size', '1', stdout=out)
+        self.assertIn('2 rows to rekey', out.getvalue())
+        self.assertTrue(Product.objects.filter(pk=fresh.pk).exists())
+
+        out = StringIO()
+        call_command('rekey_uuid7', stdout=out)
+        self.assertIn('0 rows to rekey', out.getvalue())
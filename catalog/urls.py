@@ -7,20 +7,24 @@ from . import views
 router = DefaultRouter()
 router.register(r'products', views.ProductViewSet)
 router.register(r'categories', views.CategoryViewSet)
+router.register(r'subcategories', views.SubcategoryViewSet)
 router.register(r'brands', views.BrandViewSet)
 router.register(r'sizes', views.SizeViewSet)
 router.register(r'colors', views.ColorViewSet)
 router.register(r'tags', views.TagViewSet)
 
 urlpatterns = [
-    # Include ViewSet routes (no 'api/' prefix since it's already in main urls.py)
-    path('', include(router.urls)),
-
-    # Custom endpoints
+    # Custom endpoints (before the router, whose detail routes would
+    # otherwise match e.g. categories/all/)
     path('filters/', views.filters_view, name='filters'),
     path('categories/all/', views.categories_view, name='categories-all'),
+    path('categories/tree/', views.category_tree_view, name='categories-tree'),
+    path('subcategories/all/', views.subcategories_view, name='subcategories-all'),
     path('brands/all/', views.brands_view, name='brands-all'),
     path('sizes/all/', views.sizes_view, name='sizes-all'),
     path('colors/all/', views.colors_view, name='colors-all'),
     path('tags/all/', views.tags_view, name='tags-all'),
+
+    # Include ViewSet routes (no 'api/' prefix since it's already in main urls.py)
+    path('', include(router.urls)),
 ]
\ No newline at end of file
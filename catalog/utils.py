@@ -0,0 +1,71 @@
+# utils.py
+import os
+import threading
+import time
+
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from rest_framework.exceptions import ValidationError
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+
+def uuid7(timestamp=None):
+    """
+    Time-ordered UUID (RFC 9562 version 7): 48 bits of Unix milliseconds,
+    a 12-bit counter, then random bits. Ids made by one process are
+    strictly increasing, so new rows append to the right edge of the
+    primary key index instead of landing on random pages.
+
+    `timestamp` (a datetime) backdates the id, e.g. when rekeying existing
+    rows from their createdAt; those ids are unique but not monotonic.
+    """
+    global _last_ms, _counter
+
+    if timestamp is not None:
+        ms = int(timestamp.timestamp() * 1000)
+        counter = int.from_bytes(os.urandom(2)) & 0xFFF
+    else:
+        with _lock:
+            ms = time.time_ns() // 1_000_000
+            if ms > _last_ms:
+                # Leave headroom so a busy millisecond rarely overflows
+                _last_ms, _counter = ms, int.from_bytes(os.urandom(2)) & 0x7FF
+            else:
+                _counter += 1
+                if _counter > 0xFFF:
+                    _last_ms, _counter = _last_ms + 1, 0
+            ms, counter = _last_ms, _counter
+
+    value = (
+        (ms & 0xFFFF_FFFF_FFFF) << 80
+        | 0x7 << 76
+        | counter << 64
+        | 0b10 << 62
+        | int.from_bytes(os.urandom(8)) & 0x3FFF_FFFF_FFFF_FFFF
+    )
+    return uuid.UUID(int=value)
+
+
+def parse_price_range(params):
+    """
+    (minPrice, maxPrice) from query params as Decimals, None when absent.
+    Anything but a finite number (garbage, NaN, Infinity) is a 400.
+    """
+    prices = []
+    for name in ('minPrice', 'maxPrice'):
+        value = params.get(name)
+        if not value:
+            prices.append(None)
+            continue
+        try:
+            price = Decimal(value)
+        except InvalidOperation:
+            price = None
+        if price is None or not price.is_finite():
+            raise ValidationError({'price': 'minPrice and maxPrice must be numbers'})
+        prices.append(price)
+    return tuple(prices)
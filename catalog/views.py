@@ -1,14 +1,33 @@
 # views.py
+import hashlib
+import uuid
+
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import action, api_view
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
-from django.db.models import Q, Min, Max
+from rest_framework.permissions import IsAdminUser
+from rest_framework.throttling import ScopedRateThrottle
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q, Min, Max
+from django.http import HttpResponse
+from django.urls import reverse
+
+from config.renderers import FastJSONRenderer
+from jobs.models import Job
+
+from .cache import cached_blob, cached_response, get_cache, product_cache_key
+from .index import indexed_products
+from .popularity import record_event
+from .utils import parse_price_range
 
-from .models import Product, Category, Brand, Size, Color, Tag
+from .models import Product, ProductChange, ProductVariant, Category, Subcategory, Brand, Size, Color, Tag
 from .serializers import (
     ProductSerializer,
+    ProductCardSerializer,
     CategorySerializer,
+    SubcategorySerializer,
     BrandSerializer,
     SizeSerializer,
     ColorSerializer,
@@ -24,14 +43,106 @@ class ProductViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     pagination_class = ProductPagination
+    # Set by actions that throttle (see events)
+    throttle_scope = None
+
+    def is_card_view(self):
+        """?view=card returns the compact grid shape for list/retrieve"""
+        return (
+            self.action in ('list', 'retrieve', 'batch', 'related')
+            and self.request.query_params.get('view') == 'card'
+        )
+
+    def get_serializer_class(self):
+        if self.is_card_view():
+            return ProductCardSerializer
+        return super().get_serializer_class()
+
+    def get_requested_fields(self):
+        """
+        Resolve ?fields= / ?exclude= (comma-separated) into the set of
+        readable fields to return, or None when the full shape is wanted.
+        Only retrieve includes the serializer's detail_only_fields by default.
+        """
+        if self.action not in ('list', 'retrieve', 'changes', 'batch', 'related'):
+            return None
+        if not hasattr(self, '_requested_fields'):
+            self._requested_fields = self._parse_requested_fields()
+        return self._requested_fields
+
+    def _parse_requested_fields(self):
+        fields_param = self.request.query_params.get('fields')
+        exclude_param = self.request.query_params.get('exclude')
+
+        serializer_class = self.get_serializer_class()
+        readable = serializer_class.readable_fields()
+        default = readable
+        if self.action != 'retrieve':
+            default = [f for f in readable if f not in serializer_class.detail_only_fields]
+        if not fields_param and not exclude_param:
+            return None if default == readable else set(default)
+
+        fields = [f.strip() for f in fields_param.split(',') if f.strip()] if fields_param else default
+        exclude = [f.strip() for f in exclude_param.split(',') if f.strip()] if exclude_param else []
+
+        unknown = sorted(set(fields + exclude) - set(readable))
+        if unknown:
+            raise ValidationError({'fields': f"Unknown field(s): {', '.join(unknown)}"})
+
+        return {f for f in fields if f not in exclude}
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_requested_fields()
+        return context
+
+    def get_base_queryset(self):
+        """
+        Load only the columns, joins and prefetches the response will use.
+        """
+        serializer_class = self.get_serializer_class()
+        requested = self.get_requested_fields()
+        if requested is None:
+            requested = serializer_class.readable_fields()
+
+        columns = {'id'}
+        related = set()
+        prefetch = []
+        for name in requested:
+            if name in serializer_class.prefetch_fields:
+                prefetch.append(name)
+                continue
+            for column in serializer_class.columns_for(name):
+                columns.add(column)
+                if '__' in column:
+                    related.add(column.rsplit('__', 1)[0])
+
+        return (
+            Product.objects
+            .select_related(*sorted(related))
+            .prefetch_related(*prefetch)
+            .only(*columns)
+        )
+
+    @cached_response
+    def list(self, request, *args, **kwargs):
+        # Filter and sort in the in-memory index when it can answer the query
+        products = indexed_products(request.query_params, self.get_base_queryset())
+        if products is None:
+            return super().list(request, *args, **kwargs)
+        page = self.paginate_queryset(products)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
 
     def get_queryset(self):
         """
         Filter products based on query parameters
         """
-        queryset = Product.objects.select_related(
-            'category', 'subcategory', 'brand'
-        ).prefetch_related('sizes', 'colors', 'tags')
+        if self.action in ('list', 'retrieve'):
+            queryset = self.get_base_queryset()
+        else:
+            queryset = Product.objects.select_related(
+                'category', 'subcategory', 'brand'
+            ).prefetch_related('sizes', 'colors', 'tags')
 
         # Search functionality
         search = self.request.query_params.get('search')
@@ -59,25 +170,44 @@ class ProductViewSet(viewsets.ModelViewSet):
             brand_list = [b.strip() for b in brands.split(',')]
             queryset = queryset.filter(brand__name__in=brand_list)
 
-        # Filter by sizes (comma-separated)
+        # Filter by sizes/colors (comma-separated). Products with variants
+        # match when one in-stock variant has a requested size AND color;
+        # others by their size/color links. Semi-joins, so no DISTINCT.
         sizes = self.request.query_params.get('sizes')
-        if sizes:
-            size_list = [s.strip() for s in sizes.split(',')]
-            queryset = queryset.filter(sizes__name__in=size_list).distinct()
-
-        # Filter by colors (comma-separated)
         colors = self.request.query_params.get('colors')
-        if colors:
-            color_list = [c.strip() for c in colors.split(',')]
-            queryset = queryset.filter(colors__name__in=color_list).distinct()
+        if sizes or colors:
+            variant_options = {}
+            product_options = Q()
+            if sizes:
+                size_list = [s.strip() for s in sizes.split(',')]
+                variant_options['size__name__in'] = size_list
+                product_options &= Q(Exists(
+                    Product.sizes.through.objects.filter(product=OuterRef('pk'), size__name__in=size_list)
+                ))
+            if colors:
+                color_list = [c.strip() for c in colors.split(',')]
+                variant_options['color__name__in'] = color_list
+                product_options &= Q(Exists(
+                    Product.colors.through.objects.filter(product=OuterRef('pk'), color__name__in=color_list)
+                ))
+            in_stock_variant = Exists(
+                ProductVariant.objects.filter(product=OuterRef('pk'), stock__gt=0, **variant_options)
+            )
+            queryset = queryset.filter(
+                (Q(hasVariants=True) & Q(in_stock_variant)) | (Q(hasVariants=False) & product_options)
+            )
 
         # Filter by price range
-        min_price = self.request.query_params.get('minPrice')
-        max_price = self.request.query_params.get('maxPrice')
-        if min_price:
-            queryset = queryset.filter(price__gte=float(min_price))
-        if max_price:
-            queryset = queryset.filter(price__lte=float(max_price))
+        min_price, max_price = parse_price_range(self.request.query_params)
+        if min_price is not None:
+            queryset = queryset.filter(price__gte=min_price)
+        if max_price is not None:
+            queryset = queryset.filter(price__lte=max_price)
+
+        # Filter to discounted products (backed by the discountPercent index)
+        on_sale = self.request.query_params.get('onSale')
+        if on_sale is not None and on_sale.lower() == 'true':
+            queryset = queryset.filter(discountPercent__gt=0)
 
         # Filter by stock status
         in_stock = self.request.query_params.get('inStock')
@@ -94,7 +224,9 @@ class ProductViewSet(viewsets.ModelViewSet):
             'name': 'name',
             'price': 'price',
             'rating': 'rating',
-            'brand': 'brand__name'
+            'brand': 'brand__name',
+            'discount': 'discountPercent',
+            'popular': 'popularity',
         }
 
         model_sort_field = sort_mapping.get(sort_field, 'createdAt')
@@ -105,7 +237,171 @@ class ProductViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        # A missing product raised 404 above, so the pk is a valid UUID
+        record_event(uuid.UUID(kwargs['pk']), 'view')
+        return response
+
+    @action(
+        detail=True, methods=['post'], url_path='events',
+        throttle_classes=[ScopedRateThrottle], throttle_scope='product-events',
+    )
+    def events(self, request, pk=None):
+        """
+        Count a storefront event ({"type": "click"}) towards the product's
+        popularity. Buffered, so the product isn't looked up or locked here;
+        rate limited per user/IP so a client can't inflate rankings.
+        """
+        event = request.data.get('type', 'view')
+        if event not in settings.CATALOG_POPULARITY_WEIGHTS:
+            raise ValidationError({'type': f"Expected one of: {', '.join(settings.CATALOG_POPULARITY_WEIGHTS)}"})
+        try:
+            product_id = uuid.UUID(pk)
+        except ValueError:
+            return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+        record_event(product_id, event)
+        return Response(status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, url_path='changes')
+    def changes(self, request):
+        """
+        Incremental sync: products changed after ?since=<cursor>, oldest
+        first. Pass the returned cursor back until hasMore is false.
+        """
+        try:
+            since = int(request.query_params.get('since', 0))
+        except ValueError:
+            raise ValidationError({'since': 'Expected an integer cursor'})
+        try:
+            limit = int(request.query_params.get('limit', 500))
+        except ValueError:
+            limit = 0
+        # A zero page would report hasMore without moving the cursor
+        if not 1 <= limit <= 1000:
+            raise ValidationError({'limit': 'Expected an integer from 1 to 1000'})
+
+        changes = list(ProductChange.objects.since(since, limit + 1))
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        upserted = [c.product_id for c in changes if not c.deleted]
+        products = list(self.get_base_queryset().filter(pk__in=upserted))
+        serializer = self.get_serializer(products, many=True)
+        payloads = {product.pk: item for product, item in zip(products, serializer.data)}
+
+        results = []
+        for change in changes:
+            # A product deleted after this row was read shows up as a
+            # tombstone later in the feed; skip it here
+            if not change.deleted and change.product_id not in payloads:
+                continue
+            results.append({
+                'cursor': change.seq,
+                'op': 'delete' if change.deleted else 'upsert',
+                'id': change.product_id,
+                'product': None if change.deleted else payloads[change.product_id],
+            })
+
+        return Response({
+            'results': results,
+            'cursor': changes[-1].seq if changes else since,
+            'hasMore': has_more,
+        })
+
+    @action(detail=False, methods=['get', 'post'], url_path='batch')
+    def batch(self, request):
+        """
+        Hydrate many products at once (carts, wishlists, recently viewed):
+        ?ids=<uuid>,<uuid> or POST {"ids": [...]}. Results keep the input
+        order; unknown ids are listed under "missing".
+        """
+        if request.method == 'POST':
+            ids = request.data.get('ids') if isinstance(request.data, dict) else request.data
+        else:
+            ids = [i for i in request.query_params.get('ids', '').split(',') if i.strip()]
+        if not isinstance(ids, list) or not ids:
+            raise ValidationError({'ids': 'Expected a non-empty list of product ids'})
+        if len(ids) > settings.CATALOG_BATCH_MAX_IDS:
+            raise ValidationError({'ids': f'At most {settings.CATALOG_BATCH_MAX_IDS} ids per request'})
+        try:
+            ids = list(dict.fromkeys(uuid.UUID(str(i).strip()) for i in ids))
+        except ValueError:
+            raise ValidationError({'ids': 'Every id must be a UUID'})
+
+        # One indexed query for the versions, then only cache misses are hydrated
+        versions = dict(Product.objects.filter(pk__in=ids).values_list('pk', 'updatedAt'))
+        variant = self.get_serializer_class().__name__
+        requested = self.get_requested_fields()
+        if requested is not None:
+            # Digest the fieldset to keep keys under the 250-char cache key limit
+            variant += ':' + hashlib.md5(','.join(sorted(requested)).encode()).hexdigest()
+        keys = {pk: product_cache_key(pk, updated_at, variant) for pk, updated_at in versions.items()}
+
+        cache = get_cache()
+        cached = cache.get_many(keys.values())
+        payloads = {pk: cached[key] for pk, key in keys.items() if key in cached}
+
+        misses = [pk for pk in versions if pk not in payloads]
+        if misses:
+            products = list(self.get_base_queryset().filter(pk__in=misses))
+            serializer = self.get_serializer(products, many=True)
+            fresh = {product.pk: item for product, item in zip(products, serializer.data)}
+            payloads.update(fresh)
+            cache.set_many(
+                {keys[pk]: item for pk, item in fresh.items() if pk in keys},
+                settings.CATALOG_CACHE_TIMEOUT,
+            )
+
+        return Response({
+            'results': [payloads[pk] for pk in ids if pk in payloads],
+            'missing': [pk for pk in ids if pk not in payloads],
+        })
+
+    @action(detail=True, url_path='related')
+    @cached_response
+    def related(self, request, pk=None):
+        """
+        Precomputed related products, best match first (?limit=, up to
+        CATALOG_RELATED_K). Rebuilt by the catalog.build_related_products job;
+        one indexed query, empty until the job has run.
+        """
+        try:
+            product_id = uuid.UUID(pk)
+        except ValueError:
+            return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            limit = min(int(request.query_params.get('limit', settings.CATALOG_RELATED_K)), settings.CATALOG_RELATED_K)
+        except ValueError:
+            raise ValidationError({'limit': 'Expected an integer'})
+
+        products = (
+            self.get_base_queryset()
+            .filter(related_to__product_id=product_id)
+            .order_by('related_to__rank')[:max(limit, 0)]
+        )
+        return Response({'results': self.get_serializer(products, many=True).data})
+
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[IsAdminUser])
+    def bulk_import(self, request):
+        """
+        Queue a bulk product import. Accepts a list of product payloads (or
+        {"products": [...]}) and returns 202 with the job to poll.
+        """
+        products = request.data.get('products') if isinstance(request.data, dict) else request.data
+        if not isinstance(products, list) or not products or not all(isinstance(p, dict) for p in products):
+            raise ValidationError({'products': 'Expected a non-empty list of product objects'})
+
+        job = Job.objects.enqueue('catalog.import_products', {'products': products})
+        status_url = request.build_absolute_uri(reverse('job-status', args=[job.pk]))
+        return Response(
+            {'jobId': job.pk, 'status': job.status, 'statusUrl': status_url},
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': status_url},
+        )
+
 @api_view(['GET'])
+@cached_response
 def filters_view(request):
     """
     Return all active filters for frontend dropdowns/checkboxes.
@@ -121,19 +417,26 @@ def filters_view(request):
             max=Max('price')
         )
 
+        def with_counts(rows):
+            return [
+                {'id': row['id'], 'name': row['name'], 'productCount': row['product_count']}
+                for row in rows
+            ]
+
         response_data = {
-            'categories': filters['categories'],
+            'categories': with_counts(filters['categories']),
             'subcategories': [
                 {
                     'id': sc['id'],
                     'name': sc['name'],
-                    'category': sc['category__name']
+                    'category': sc['category__name'],
+                    'productCount': sc['product_count']
                 } for sc in filters['subcategories']
             ],
-            'brands': filters['brands'],
-            'sizes': filters['sizes'],
-            'colors': filters['colors'],
-            'tags': filters['tags'],
+            'brands': with_counts(filters['brands']),
+            'sizes': with_counts(filters['sizes']),
+            'colors': with_counts(filters['colors']),
+            'tags': with_counts(filters['tags']),
             'priceRange': {
                 'min': price_range['min'] or 0,
                 'max': price_range['max'] or 0
@@ -148,13 +451,49 @@ def filters_view(request):
         )
 
 @api_view(['GET'])
+@cached_response
 def categories_view(request):
-    """Get all categories with their subcategories"""
-    categories = Category.objects.prefetch_related('subcategories').all()
+    """Get all categories"""
+    categories = Category.objects.all()
     serializer = CategorySerializer(categories, many=True)
     return Response(serializer.data)
 
 @api_view(['GET'])
+def category_tree_view(request):
+    """
+    Categories with their subcategories and product counts, for menus.
+    Served as one pre-rendered JSON blob, rebuilt after catalog changes.
+    """
+    return HttpResponse(cached_blob('category-tree', build_category_tree), content_type='application/json')
+
+def build_category_tree():
+    subcategories = {}
+    for sub in Subcategory.objects.order_by('name').values('id', 'name', 'product_count', 'category_id'):
+        subcategories.setdefault(sub['category_id'], []).append(
+            {'id': sub['id'], 'name': sub['name'], 'productCount': sub['product_count']}
+        )
+
+    tree = [
+        {
+            'id': category['id'],
+            'name': category['name'],
+            'productCount': category['product_count'],
+            'subcategories': subcategories.get(category['id'], []),
+        }
+        for category in Category.objects.order_by('name').values('id', 'name', 'product_count')
+    ]
+    return FastJSONRenderer().render(tree)
+
+@api_view(['GET'])
+@cached_response
+def subcategories_view(request):
+    """Get all subcategories with their category"""
+    subcategories = Subcategory.objects.all()
+    serializer = SubcategorySerializer(subcategories, many=True)
+    return Response(serializer.data)
+
+@api_view(['GET'])
+@cached_response
 def brands_view(request):
     """Get all brands"""
     brands = Brand.objects.all()
@@ -162,6 +501,7 @@ def brands_view(request):
     return Response(serializer.data)
 
 @api_view(['GET'])
+@cached_response
 def sizes_view(request):
     """Get all sizes"""
     sizes = Size.objects.all()
@@ -169,6 +509,7 @@ def sizes_view(request):
     return Response(serializer.data)
 
 @api_view(['GET'])
+@cached_response
 def colors_view(request):
     """Get all colors"""
     colors = Color.objects.all()
@@ -176,6 +517,7 @@ def colors_view(request):
     return Response(serializer.data)
 
 @api_view(['GET'])
+@cached_response
 def tags_view(request):
     """Get all tags"""
     tags = Tag.objects.all()
@@ -187,6 +529,10 @@ class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
+class SubcategoryViewSet(viewsets.ModelViewSet):
+    queryset = Subcategory.objects.all()
+    serializer_class = SubcategorySerializer
+
 class BrandViewSet(viewsets.ModelViewSet):
     queryset = Brand.objects.all()
     serializer_class = BrandSerializer
@@ -0,0 +1,9 @@
+"""
+Admin URLconf, imported lazily from config.urls the first time an admin
+URL is resolved or reversed, so API workers never load the admin.
+"""
+from django.contrib import admin
+
+admin.autodiscover()
+
+urlpatterns = admin.site.get_urls()
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class SpectacularConfig(AppConfig):
+    """
+    drf_spectacular without its startup import of the schema checks, which
+    pulls in most of the package on every worker boot. The schema itself is
+    only needed by the docs endpoints and is imported on first use there.
+    """
+    name = 'drf_spectacular'
+    label = 'drf_spectacular'
+    verbose_name = "drf-spectacular"
@@ -0,0 +1,70 @@
+import os
+
+import dj_database_url
+
+
+def env_flag(name, default=False):
+    return os.getenv(name, str(default)).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def database_config(url):
+    """
+    Build a DATABASES entry for `url`.
+
+    PostgreSQL connections can use Django's native psycopg 3 pool (DB_POOL)
+    and/or run behind PgBouncer in transaction-pooling mode (DB_PGBOUNCER).
+    Without a pool, connections persist for DB_CONN_MAX_AGE seconds.
+    """
+    config = dj_database_url.parse(url)
+    is_postgres = 'postgresql' in config['ENGINE']
+    use_pool = is_postgres and env_flag('DB_POOL')
+    behind_pgbouncer = is_postgres and env_flag('DB_PGBOUNCER')
+
+    # Pooled connections go back to the pool after each request instead of
+    # persisting (and being health-checked) per worker thread
+    config['CONN_MAX_AGE'] = 0 if use_pool else int(os.getenv('DB_CONN_MAX_AGE', 600))
+    # With a pool, Django turns CONN_HEALTH_CHECKS into the pool's own
+    # checkout check (check=ConnectionPool.check_connection); it can't be
+    # set in OPTIONS['pool'], which Django passes alongside its check=.
+    # Off by default since max_lifetime/max_idle already retire stale
+    # connections
+    config['CONN_HEALTH_CHECKS'] = env_flag('DB_POOL_CHECK') if use_pool else True
+    # Server-side cursors don't survive PgBouncer transaction pooling
+    config['DISABLE_SERVER_SIDE_CURSORS'] = behind_pgbouncer
+    config.setdefault('OPTIONS', {})
+
+    if is_postgres and env_flag('DB_SSL_REQUIRE', True):
+        config['OPTIONS']['sslmode'] = 'require'
+
+    if use_pool:
+        config['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+            # Seconds a request waits for a free connection before erroring
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            # Connections are recycled after this many seconds
+            'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+            'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', 300)),
+        }
+
+    if behind_pgbouncer:
+        # Prepared statements are bound to a server connection, which
+        # PgBouncer swaps between transactions
+        config['OPTIONS']['prepare_threshold'] = None
+
+    return config
+
+
+def pool_stats():
+    """
+    Return psycopg pool statistics (waits, timeouts, sizes) for every
+    pooled database alias in this process.
+    """
+    from django.db import connections
+
+    stats = {}
+    for alias in connections:
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is not None:
+            stats[alias] = pool.get_stats()
+    return stats
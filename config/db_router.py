@@ -0,0 +1,106 @@
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+# Whether reads in the current request may be served by a replica. Off by
+# default so management commands, shells and workers always read the primary.
+replica_reads_allowed = ContextVar('replica_reads_allowed', default=False)
+
+
+@contextmanager
+def primary_reads():
+    """Read from the primary inside the block, whatever the request allows."""
+    token = replica_reads_allowed.set(False)
+    try:
+        yield
+    finally:
+        replica_reads_allowed.reset(token)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica_')]
+
+
+class ReplicaPool:
+    """
+    Round-robin over the configured replicas, skipping any that failed a
+    health check within the last REPLICA_HEALTH_CHECK_INTERVAL seconds.
+    """
+
+    def __init__(self):
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._checked_at = {}
+        self._unhealthy_until = {}
+
+    def choose(self):
+        now = time.monotonic()
+        healthy = [
+            alias for alias in replica_aliases()
+            if self._unhealthy_until.get(alias, 0) <= now
+        ]
+        for _ in range(len(healthy)):
+            with self._lock:
+                alias = healthy[next(self._counter) % len(healthy)]
+            if self.is_healthy(alias, now):
+                return alias
+        return None
+
+    def is_healthy(self, alias, now):
+        interval = settings.REPLICA_HEALTH_CHECK_INTERVAL
+        if now - self._checked_at.get(alias, float('-inf')) < interval:
+            return True
+
+        connection = connections[alias]
+        try:
+            connection.ensure_connection()
+            healthy = connection.is_usable()
+        except DatabaseError:
+            healthy = False
+
+        self._checked_at[alias] = now
+        if not healthy:
+            connection.close()
+            self._unhealthy_until[alias] = now + interval
+        return healthy
+
+
+replica_pool = ReplicaPool()
+
+
+class ReplicaRouter:
+    """
+    Send reads for REPLICA_APPS to a healthy replica when the current request
+    allows it (see ReplicaPinningMiddleware); everything else uses default.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not replica_reads_allowed.get():
+            return None
+        if model._meta.app_label not in settings.REPLICA_APPS:
+            return None
+        # Keep related/prefetch reads on the database the instance came from
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        # Reads inside a transaction on the primary must see its writes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return replica_pool.choose()
+
+    def db_for_write(self, model, **hints):
+        # Once a request writes, the rest of it reads from the primary too
+        replica_reads_allowed.set(False)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
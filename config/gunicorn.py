@@ -0,0 +1,112 @@
+"""
+Gunicorn settings, loaded with `gunicorn -c python:config.gunicorn`.
+
+Every value can be overridden from the environment; the defaults target a
+small container running threaded sync workers behind a proxy.
+"""
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+
+from config.database import env_flag
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+# Threaded workers overlap DB/network waits without an async stack
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+# CPUs this process may run on (cpu_count() reports the whole host in a
+# container), capped since every worker holds its own DB connections
+_cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else multiprocessing.cpu_count()
+workers = int(os.getenv('WEB_CONCURRENCY', min(_cpus * 2 + 1, int(os.getenv('GUNICORN_MAX_WORKERS', 8)))))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+# Import Django once in the master so workers fork with it already loaded
+preload_app = env_flag('GUNICORN_PRELOAD', True)
+
+# Recycle workers periodically; jitter keeps them from restarting together
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+
+
+_feeds_process = None
+
+
+def when_ready(server):
+    # Sitemaps and feeds are files on this instance's disk, so they are
+    # refreshed next to the web server rather than by the job worker
+    global _feeds_process
+    # Without preload_app the master hasn't loaded Django yet
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    from django.conf import settings
+    if settings.CATALOG_FEEDS_REFRESH_INTERVAL > 0:
+        manage = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'manage.py')
+        _feeds_process = subprocess.Popen([
+            sys.executable, manage, 'build_feeds', '--every', str(settings.CATALOG_FEEDS_REFRESH_INTERVAL),
+        ])
+        server.log.info("Started feed refresher (pid %d)", _feeds_process.pid)
+
+
+def on_exit(server):
+    if _feeds_process is not None:
+        _feeds_process.terminate()
+
+
+def post_fork(server, worker):
+    # Database connections must never be shared between processes
+    from django.db import connections
+    connections.close_all()
+
+
+def worker_exit(server, worker):
+    # Recycled workers (max_requests) exit here; keep their buffered counts
+    from catalog.popularity import flush
+    flush()
+
+
+def post_worker_init(worker):
+    # The app is loaded by now (with or without preload_app)
+    from django.conf import settings
+    if settings.CATALOG_CACHE_WARM_ON_START:
+        # In the background so the worker starts serving right away; with a
+        # shared cache the URLs another worker already warmed are cache hits
+        threading.Thread(target=_warm_catalog_cache, args=(worker,), daemon=True).start()
+    if settings.CATALOG_INDEX_ENABLED:
+        threading.Thread(target=_build_catalog_index, args=(worker,), daemon=True).start()
+
+
+def _warm_catalog_cache(worker):
+    from django.conf import settings
+    from django.db import connection
+
+    from catalog.cache import default_warm_urls, warm
+
+    try:
+        urls = default_warm_urls(settings.CATALOG_CACHE_WARM_TOP)
+        results = warm(urls, settings.CATALOG_CACHE_WARM_BASE_URL)
+        worker.log.info("Warmed %d catalog cache entries", sum(status == 200 for _, status in results))
+    except Exception:
+        worker.log.exception("Catalog cache warm-up failed")
+    finally:
+        connection.close()
+
+
+def _build_catalog_index(worker):
+    from django.db import connection
+
+    from catalog.index import get_catalog_index
+
+    try:
+        if get_catalog_index() is not None:
+            worker.log.info("Built catalog index")
+    except Exception:
+        worker.log.exception("Catalog index build failed")
+    finally:
+        connection.close()
@@ -0,0 +1,226 @@
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.module_loading import import_string
+from django.utils.regex_helper import _lazy_re_compile
+from whitenoise.base import WhiteNoise
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .db_router import replica_aliases, replica_reads_allowed
+
+re_accepts_brotli = _lazy_re_compile(r"\bbr\b")
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Negotiated response compression: brotli for API JSON when the client
+    accepts it and the `brotli` package is installed, gzip otherwise.
+
+    Everything else (admin HTML with CSRF tokens in particular) goes through
+    GZipMiddleware, whose random padding mitigates BREACH.
+
+    Responses smaller than COMPRESSION_MIN_SIZE bytes are sent as-is, since
+    compressing them costs more CPU than it saves on the wire.
+    """
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        if response.has_header("Content-Encoding"):
+            return response
+
+        ae = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        if (
+            brotli is None
+            or response.streaming
+            or not re_accepts_brotli.search(ae)
+            or not request.path_info.startswith('/api/')
+            or not response.get("Content-Type", "").startswith("application/json")
+        ):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        # Return the compressed content only if it's actually shorter.
+        compressed_content = brotli.compress(
+            response.content, quality=settings.COMPRESSION_BROTLI_QUALITY
+        )
+        if len(compressed_content) >= len(response.content):
+            return response
+        response.content = compressed_content
+        response.headers["Content-Length"] = str(len(response.content))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+
+        return response
+
+
+class FeedFilesMiddleware(WhiteNoise):
+    """
+    Serve the sitemap and product feed files (catalog.feeds) from
+    CATALOG_FEEDS_ROOT at CATALOG_FEEDS_URL. They are rewritten while the
+    server runs, so unlike static files they are looked up on each request;
+    sitemap.xml goes out as its .gz variant to clients that accept gzip.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        super().__init__(
+            None, autorefresh=True, max_age=settings.CATALOG_FEEDS_MAX_AGE,
+            mimetypes={'.gz': 'application/gzip'},
+        )
+        self.prefix = settings.CATALOG_FEEDS_URL
+        self.add_files(settings.CATALOG_FEEDS_ROOT, prefix=self.prefix)
+
+    def __call__(self, request):
+        path = request.path_info
+        # Only the published files, never the manifest or half-written temp files
+        if path.startswith(self.prefix) and path.endswith(('.xml', '.xml.gz')):
+            static_file = self.find_file(path)
+            if static_file is not None:
+                return WhiteNoiseMiddleware.serve(static_file, request)
+        return self.get_response(request)
+
+
+class ReplicaPinningMiddleware:
+    """
+    Allow replica reads for safe requests, and pin a client to the primary
+    for REPLICA_PIN_SECONDS after it writes (read-your-writes).
+
+    The pin is sent both as a cookie and as a REPLICA_PIN_HEADER response
+    header holding its expiry (unix time). The storefront is cross-site to
+    the API, so the cookie is SameSite=None in production; clients whose
+    browser blocks third-party cookies echo the header back instead.
+    """
+
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def is_pinned(self, request):
+        if settings.REPLICA_PIN_COOKIE in request.COOKIES:
+            return True
+        try:
+            return float(request.headers.get(settings.REPLICA_PIN_HEADER, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def __call__(self, request):
+        if not replica_aliases():
+            return self.get_response(request)
+
+        pinned = self.is_pinned(request)
+        token = replica_reads_allowed.set(request.method in self.safe_methods and not pinned)
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_reads_allowed.reset(token)
+
+        if request.method not in self.safe_methods and response.status_code < 400:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                secure=settings.REPLICA_PIN_COOKIE_SECURE,
+                samesite=settings.REPLICA_PIN_COOKIE_SAMESITE,
+                path="/",
+            )
+            response.headers[settings.REPLICA_PIN_HEADER] = str(int(time.time()) + settings.REPLICA_PIN_SECONDS)
+        return response
+
+
+class RouteMiddleware:
+    """
+    Extra middleware for requests under a path prefix only.
+
+    ROUTE_MIDDLEWARE maps a prefix (e.g. '/admin/') to a list of middleware
+    that runs inside the global MIDDLEWARE for matching requests, with their
+    process_view/process_exception/process_template_response hooks, just as
+    if they were listed last in MIDDLEWARE. Other requests skip them, so the
+    JWT-authenticated API doesn't pay for sessions, CSRF or messages.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Longest prefix first, so the most specific route wins
+        self.routes = [
+            (prefix, MiddlewareStack(paths, get_response))
+            for prefix, paths in sorted(settings.ROUTE_MIDDLEWARE.items(), key=lambda item: -len(item[0]))
+        ]
+
+    def stack_for(self, request):
+        for prefix, stack in self.routes:
+            if request.path_info.startswith(prefix):
+                return stack
+        return None
+
+    def __call__(self, request):
+        stack = self.stack_for(request)
+        return stack(request) if stack else self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        stack = self.stack_for(request)
+        if stack:
+            for hook in stack.view_middleware:
+                response = hook(request, view_func, view_args, view_kwargs)
+                if response:
+                    return response
+        return None
+
+    def process_template_response(self, request, response):
+        stack = self.stack_for(request)
+        if stack:
+            for hook in stack.template_response_middleware:
+                response = hook(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        stack = self.stack_for(request)
+        if stack:
+            for hook in stack.exception_middleware:
+                response = hook(request, exception)
+                if response:
+                    return response
+        return None
+
+
+class MiddlewareStack:
+    """A middleware chain built the way BaseHandler.load_middleware() does."""
+
+    def __init__(self, paths, get_response):
+        self.view_middleware = []
+        self.template_response_middleware = []
+        self.exception_middleware = []
+
+        handler = get_response
+        for path in reversed(paths):
+            try:
+                middleware = import_string(path)(handler)
+            except MiddlewareNotUsed:
+                continue
+            if hasattr(middleware, 'process_view'):
+                self.view_middleware.insert(0, middleware.process_view)
+            if hasattr(middleware, 'process_template_response'):
+                self.template_response_middleware.append(middleware.process_template_response)
+            if hasattr(middleware, 'process_exception'):
+                self.exception_middleware.append(middleware.process_exception)
+            handler = convert_exception_to_response(middleware)
+        self.handler = handler
+
+    def __call__(self, request):
+        return self.handler(request)
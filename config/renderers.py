@@ -0,0 +1,30 @@
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to DRF's stdlib encoder
+    orjson = None
+
+from rest_framework.renderers import JSONRenderer
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed.
+
+    Types orjson doesn't handle natively (Decimal, lazy strings, ...) and
+    datetimes are passed to DRF's encoder so the output matches the stdlib
+    renderer byte-for-byte in meaning.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.get_indent(accepted_media_type, renderer_context):
+            option |= orjson.OPT_INDENT_2
+
+        return orjson.dumps(data, default=self.encoder_class().default, option=option)
@@ -0,0 +1,32 @@
+import sys
+
+from rest_framework.schemas.inspectors import ViewInspector
+
+
+class AutoSchema(ViewInspector):
+    """
+    DEFAULT_SCHEMA_CLASS placeholder that defers importing drf_spectacular.
+
+    DRF instantiates the schema class while views are being defined (every
+    @api_view does), which would import drf_spectacular.openapi and all its
+    contrib extensions on each worker boot. Until the schema views have
+    imported drf_spectacular, a placeholder is handed out instead; it turns
+    into drf_spectacular's AutoSchema when accessed on a view instance.
+    """
+
+    def __new__(cls, *args, **kwargs):
+        if 'drf_spectacular.openapi' in sys.modules:
+            return cls.spectacular_class()(*args, **kwargs)
+        return super().__new__(cls)
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        schema = self.spectacular_class()()
+        schema.view = instance
+        return schema
+
+    @staticmethod
+    def spectacular_class():
+        from drf_spectacular.openapi import AutoSchema as SpectacularAutoSchema
+        return SpectacularAutoSchema
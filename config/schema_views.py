@@ -0,0 +1,74 @@
+"""
+OpenAPI schema and docs views, imported lazily from config.urls.
+
+Outside DEBUG the schema is never introspected per request: the JSON file
+written at build time by `manage.py build_openapi_schema` is served when
+present (WhiteNoise also serves it, compressed, under STATIC_URL), and any
+other format is generated and rendered once per process, then kept in memory.
+"""
+from django.conf import settings
+from django.http import HttpResponse
+from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+
+_prebuilt_schema = None
+_schema_cache = {}
+
+
+def prebuilt_schema():
+    """Contents of the prebuilt JSON schema, or None if it wasn't built."""
+    global _prebuilt_schema
+    if _prebuilt_schema is None:
+        try:
+            with open(settings.OPENAPI_SCHEMA_FILE, 'rb') as f:
+                _prebuilt_schema = f.read()
+        except FileNotFoundError:
+            _prebuilt_schema = b''
+    return _prebuilt_schema or None
+
+
+def prebuilt_schema_url():
+    if settings.DEBUG or prebuilt_schema() is None:
+        return None
+    return settings.OPENAPI_SCHEMA_URL
+
+
+class SchemaView(SpectacularAPIView):
+    def get(self, request, *args, **kwargs):
+        if settings.DEBUG:
+            return super().get(request, *args, **kwargs)
+
+        if request.accepted_renderer.format == 'json':
+            content = prebuilt_schema()
+            if content is not None:
+                return HttpResponse(content, content_type=request.accepted_renderer.media_type)
+
+        renderer = request.accepted_renderer
+        key = (renderer.media_type, request.GET.get('lang'), request.GET.get('version'))
+        if key not in _schema_cache:
+            response = super().get(request, *args, **kwargs)
+            content = renderer.render(response.data, request.accepted_media_type, self.get_renderer_context())
+            _schema_cache[key] = (content, response['Content-Disposition'])
+
+        content, disposition = _schema_cache[key]
+        content_type = request.accepted_media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        response = HttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = disposition
+        return response
+
+
+class SwaggerView(SpectacularSwaggerView):
+    url_name = 'schema'
+
+    @property
+    def url(self):
+        return prebuilt_schema_url()
+
+
+class RedocView(SpectacularRedocView):
+    url_name = 'schema'
+
+    @property
+    def url(self):
+        return prebuilt_schema_url()
@@ -12,12 +12,15 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
-import dj_database_url
 from datetime import timedelta
 
+from corsheaders.defaults import default_headers
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 load_dotenv()
 
+from .database import database_config, env_flag
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -25,19 +28,29 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
+# DJANGO_ENV selects the settings profile; Render deployments default to production
+ENVIRONMENT = os.getenv('DJANGO_ENV', 'production' if os.getenv('RENDER') else 'development')
+IS_PRODUCTION = ENVIRONMENT == 'production'
+
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-qyypr1--2_(%sa%vkg0f2-#*aoohe=xy^ya!btn5eo=iz==sas'
+SECRET_KEY = os.getenv('SECRET_KEY')
+if not SECRET_KEY:
+    if IS_PRODUCTION:
+        raise ImproperlyConfigured("SECRET_KEY must be set in production")
+    SECRET_KEY = 'django-insecure-qyypr1--2_(%sa%vkg0f2-#*aoohe=xy^ya!btn5eo=iz==sas'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# (DEBUG also keeps every SQL query of a request in memory)
+DEBUG = env_flag('DEBUG', not IS_PRODUCTION)
 
-ALLOWED_HOSTS = ['.onrender.com', 'localhost']
+ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '.onrender.com,localhost').split(',')
 
 
 # Application definition
 
 INSTALLED_APPS = [
-    'django.contrib.admin',
+    # Admin modules are registered lazily by config.admin_urls
+    'django.contrib.admin.apps.SimpleAdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -46,30 +59,61 @@ INSTALLED_APPS = [
     'rest_framework',
     'accounts',
     'catalog',
+    'jobs',
+    'orders',
     'corsheaders',
-    'drf_spectacular',
+    'config.apps.SpectacularConfig',
     'rest_framework_simplejwt',
     "rest_framework_simplejwt.token_blacklist",
 ]
 
 MIDDLEWARE = [
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'config.middleware.FeedFilesMiddleware',
+    'config.middleware.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'config.middleware.ReplicaPinningMiddleware',
+    'config.middleware.RouteMiddleware',
 ]
 
+# Middleware for some URL prefixes only (see config.middleware.RouteMiddleware).
+# The API authenticates with JWT, so sessions, CSRF, messages and
+# clickjacking protection only run for the admin
+ROUTE_MIDDLEWARE = {
+    '/admin/': [
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        'django.middleware.csrf.CsrfViewMiddleware',
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'django.contrib.messages.middleware.MessageMiddleware',
+        'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    ],
+}
+# The admin checks only look for its middleware in MIDDLEWARE
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
+
+# Response compression (see config.middleware.CompressionMiddleware)
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 4))
+
 REST_FRAMEWORK = {
     # ... any other DRF settings ...
-    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_SCHEMA_CLASS': 'config.schema.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': (
+        'config.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    # Prices are DecimalFields; keep emitting them as JSON numbers for the frontend
+    'COERCE_DECIMAL_TO_STRING': False,
+    # Per user (or IP) rates for views with a throttle_scope
+    'DEFAULT_THROTTLE_RATES': {
+        'carts': os.getenv('CARTS_THROTTLE_RATE', '60/minute'),
+        'product-events': os.getenv('PRODUCT_EVENTS_THROTTLE_RATE', '30/minute'),
+    },
 }
 
 SIMPLE_JWT = {
@@ -105,6 +149,9 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+# Read-your-writes pin (config.middleware.ReplicaPinningMiddleware)
+CORS_ALLOW_HEADERS = (*default_headers, 'x-db-pin')
+CORS_EXPOSE_HEADERS = ['X-DB-Pin']
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
@@ -112,15 +159,32 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# PostgreSQL pooling is configured through DB_POOL, DB_POOL_MIN_SIZE,
+# DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT, DB_POOL_MAX_LIFETIME, DB_POOL_MAX_IDLE,
+# DB_POOL_CHECK and DB_PGBOUNCER; see config.database.
+
 DATABASES = {
-    'default': dj_database_url.config(
-        default="sqlite:///db.sqlite3",
-        conn_max_age=600,
-        conn_health_checks=True,
-        ssl_require=True
-    ),
+    'default': database_config(os.getenv('DATABASE_URL', 'sqlite:///db.sqlite3')),
 }
 
+# Optional read replicas, comma-separated. Catalog reads from safe requests
+# are spread across them; see config.db_router.
+
+for index, url in enumerate(filter(None, map(str.strip, os.getenv('REPLICA_DATABASE_URLS', '').split(',')))):
+    DATABASES[f'replica_{index}'] = {**database_config(url), 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_ROUTERS = ['config.db_router.ReplicaRouter']
+REPLICA_APPS = ('catalog',)
+REPLICA_HEALTH_CHECK_INTERVAL = int(os.getenv('REPLICA_HEALTH_CHECK_INTERVAL', 30))
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+REPLICA_PIN_COOKIE = 'db_pin'
+# The storefront is on another site, so browsers only send the pin cookie
+# with its API calls when it is SameSite=None (which requires Secure)
+REPLICA_PIN_COOKIE_SECURE = IS_PRODUCTION
+REPLICA_PIN_COOKIE_SAMESITE = 'None' if IS_PRODUCTION else 'Lax'
+# Fallback for browsers that block third-party cookies: echo this header back
+REPLICA_PIN_HEADER = 'X-DB-Pin'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -159,10 +223,155 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
-STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+# Written at build time by `manage.py build_openapi_schema`
+OPENAPI_SCHEMA_FILE = os.path.join(STATIC_ROOT, 'openapi', 'schema.json')
+OPENAPI_SCHEMA_URL = f'{STATIC_URL}openapi/schema.json'
+
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
+    },
+}
+
+
+# Cache
+# REDIS_URL shares the cache across workers and instances; otherwise each
+# process keeps its own in-memory cache (warmed per worker, see gunicorn.py)
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': int(os.getenv('LOCMEM_CACHE_MAX_ENTRIES', 1000))},
+        }
+    }
+
+CATALOG_CACHE_ALIAS = 'default'
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', 600))
+# How often each process re-reads the catalog version from the database;
+# other processes serve a change at most this many seconds late
+CATALOG_VERSION_CHECK_INTERVAL = float(os.getenv('CATALOG_VERSION_CHECK_INTERVAL', 1))
+CATALOG_BATCH_MAX_IDS = int(os.getenv('CATALOG_BATCH_MAX_IDS', 200))
+
+# Warm-up (manage.py warm_catalog_cache, CATALOG_CACHE_WARM_ON_START)
+CATALOG_CACHE_WARM_ON_START = env_flag('CATALOG_CACHE_WARM_ON_START', IS_PRODUCTION)
+CATALOG_CACHE_WARM_BASE_URL = os.getenv('SITE_URL') or (
+    f"https://{os.environ['RENDER_EXTERNAL_HOSTNAME']}" if os.getenv('RENDER_EXTERNAL_HOSTNAME')
+    else 'http://localhost:8000'
+)
+CATALOG_CACHE_WARM_TOP = int(os.getenv('CATALOG_CACHE_WARM_TOP', 10))
+CATALOG_CACHE_WARM_URLS = [
+    url.strip() for url in os.getenv(
+        'CATALOG_CACHE_WARM_URLS',
+        '/api/filters/,/api/categories/all/,/api/categories/tree/,/api/subcategories/all/,'
+        '/api/brands/all/,/api/sizes/all/,/api/colors/all/,/api/tags/all/,/api/products/',
+    ).split(',') if url.strip()
+]
+CATALOG_CACHE_WARM_SORTS = ['createdAt:desc', 'popular:desc', 'price:asc', 'price:desc', 'rating:desc']
+
+
+# In-memory product index (catalog/index.py; needs numpy). Each worker
+# holds its own copy and re-checks the change feed at most this often
+
+CATALOG_INDEX_ENABLED = env_flag('CATALOG_INDEX_ENABLED', False)
+CATALOG_INDEX_REFRESH_INTERVAL = float(os.getenv('CATALOG_INDEX_REFRESH_INTERVAL', 5))
+
+
+# Product popularity (catalog/popularity.py): view/click events are buffered
+# per process and flushed by a background thread as batched UPDATEs. Scores are forward-decayed from
+# a fixed epoch; at a 7 day half-life they stay within float range for ~19 years.
+# POST /api/products/<id>/events/ is limited by the 'product-events' throttle
+
+CATALOG_POPULARITY_WEIGHTS = {'view': 1, 'click': 3}
+CATALOG_POPULARITY_HALF_LIFE_DAYS = float(os.getenv('CATALOG_POPULARITY_HALF_LIFE_DAYS', 7))
+CATALOG_POPULARITY_EPOCH = '2026-01-01T00:00:00+00:00'
+CATALOG_POPULARITY_FLUSH_INTERVAL = float(os.getenv('CATALOG_POPULARITY_FLUSH_INTERVAL', 10))
+CATALOG_POPULARITY_MAX_BUFFER = int(os.getenv('CATALOG_POPULARITY_MAX_BUFFER', 5000))
+CATALOG_POPULARITY_BATCH_SIZE = 500
+
+
+# Related products (catalog/related.py; needs numpy and scipy), rebuilt by
+# the catalog.build_related_products job / `manage.py build_related_products`
+
+CATALOG_RELATED_K = int(os.getenv('CATALOG_RELATED_K', 12))
+CATALOG_RELATED_WEIGHTS = {'category': 0.5, 'subcategory': 1.0, 'brand': 0.8, 'tags': 1.0}
+# Similarity halves for every this many doublings of the price ratio
+CATALOG_RELATED_PRICE_SCALE = 1.0
+# Similarity scores held in memory at once (float64 cells)
+CATALOG_RELATED_CHUNK_CELLS = int(os.getenv('CATALOG_RELATED_CHUNK_CELLS', 8_000_000))
+
+
+# Sitemaps and product feeds (catalog/feeds.py), written by `manage.py
+# build_feeds` and served by config.middleware.FeedFilesMiddleware. The files
+# live on the web instance's disk, so gunicorn keeps them fresh from a
+# background process every CATALOG_FEEDS_REFRESH_INTERVAL seconds (0: off)
+
+CATALOG_FEEDS_ROOT = os.getenv('CATALOG_FEEDS_ROOT', os.path.join(BASE_DIR, 'feeds'))
+CATALOG_FEEDS_URL = '/feeds/'
+CATALOG_FEEDS_BASE_URL = f'{CATALOG_CACHE_WARM_BASE_URL}{CATALOG_FEEDS_URL}'
+CATALOG_FEEDS_CHUNK_SIZE = int(os.getenv('CATALOG_FEEDS_CHUNK_SIZE', 50000))
+CATALOG_FEEDS_REFRESH_INTERVAL = int(os.getenv('CATALOG_FEEDS_REFRESH_INTERVAL', 600 if IS_PRODUCTION else 0))
+CATALOG_FEEDS_MAX_AGE = int(os.getenv('CATALOG_FEEDS_MAX_AGE', 300))
+CATALOG_PRODUCT_URL = os.getenv('PRODUCT_URL', 'https://ecommerce-pro-five.vercel.app/products/{id}')
+CATALOG_FEED_CURRENCY = os.getenv('CATALOG_FEED_CURRENCY', 'USD')
+
+
+# Background jobs (jobs app; `manage.py run_worker`)
+
+JOBS_WORKER_PROCESSES = int(os.getenv('JOBS_WORKER_PROCESSES', 1))
+JOBS_WORKER_THREADS = int(os.getenv('JOBS_WORKER_THREADS', 2))
+JOBS_POLL_INTERVAL = float(os.getenv('JOBS_POLL_INTERVAL', 1))
+JOBS_VISIBILITY_TIMEOUT = int(os.getenv('JOBS_VISIBILITY_TIMEOUT', 300))
+JOBS_MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', 3))
+JOBS_RETRY_BACKOFF = int(os.getenv('JOBS_RETRY_BACKOFF', 10))
+
+
+# Orders: cart reservations hold stock for this long before
+# `release_reservations` (or the orders.release_expired_reservations job)
+# returns it
+
+ORDERS_RESERVATION_TTL = int(os.getenv('ORDERS_RESERVATION_TTL', 900))
+ORDERS_RELEASE_BATCH_SIZE = int(os.getenv('ORDERS_RELEASE_BATCH_SIZE', 500))
+# Units of one product a cart may hold; cart writes are also rate limited
+# per user/IP by the 'carts' throttle scope
+ORDERS_MAX_LINE_QUANTITY = int(os.getenv('ORDERS_MAX_LINE_QUANTITY', 10))
+
+
+# Product images
+# Variant URL template for the image CDN, e.g. 'https://cdn.example.com/{width}x{height}/{url}'
+
+CATALOG_IMAGE_VARIANT_URL = os.getenv('IMAGE_VARIANT_URL', '')
+CATALOG_IMAGE_VARIANTS = {
+    'thumb': (160, 160),
+    'card': (480, 480),
+    'large': (1200, 1200),
+}
 
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Production profile
+
+if IS_PRODUCTION:
+    # JSON only; the browsable API pulls in templates, forms and markdown
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = ('config.renderers.FastJSONRenderer',)
+
+    SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+    SECURE_SSL_REDIRECT = env_flag('SECURE_SSL_REDIRECT', True)
+    SESSION_COOKIE_SECURE = True
+    CSRF_COOKIE_SECURE = True
+    SECURE_HSTS_SECONDS = int(os.getenv('SECURE_HSTS_SECONDS', 3600))
@@ -0,0 +1,241 @@
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from catalog.models import Product
+from jobs.models import Job
+
+from .db_router import ReplicaPool, ReplicaRouter, replica_reads_allowed
+from .middleware import ReplicaPinningMiddleware, RouteMiddleware
+
+
+class Tag:
+    """Test middleware that records itself on the request."""
+
+    name = 'tag'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.tags = [*getattr(request, 'tags', []), self.name]
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.views = [*getattr(request, 'views', []), self.name]
+
+    def process_exception(self, request, exception):
+        return HttpResponse(f'{self.name} handled {exception}', status=500)
+
+
+class Outer(Tag):
+    name = 'outer'
+
+
+class Inner(Tag):
+    name = 'inner'
+
+
+class Unused:
+    def __init__(self, get_response):
+        raise MiddlewareNotUsed
+
+
+@override_settings(ROUTE_MIDDLEWARE={
+    '/a/': ['config.tests.Outer', 'config.tests.Unused', 'config.tests.Inner'],
+    '/a/b/': ['config.tests.Inner'],
+})
+class RouteMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.middleware = RouteMiddleware(lambda request: HttpResponse('view'))
+
+    def call(self, path):
+        request = RequestFactory().get(path)
+        response = self.middleware(request)
+        self.middleware.process_view(request, None, (), {})
+        return request, response
+
+    def test_matching_prefix_runs_its_middleware_in_order(self):
+        request, response = self.call('/a/page/')
+        self.assertEqual(response.content, b'view')
+        self.assertEqual((request.tags, request.views), (['outer', 'inner'], ['outer', 'inner']))
+
+    def test_longest_prefix_wins(self):
+        request, _ = self.call('/a/b/page/')
+        self.assertEqual((request.tags, request.views), (['inner'], ['inner']))
+
+    def test_other_paths_skip_the_stack(self):
+        request, response = self.call('/api/products/')
+        self.assertEqual(response.content, b'view')
+        self.assertFalse(hasattr(request, 'tags') or hasattr(request, 'views'))
+        self.assertIsNone(self.middleware.process_exception(request, ValueError('boom')))
+
+    def test_exceptions_go_to_the_innermost_middleware_first(self):
+        request = RequestFactory().get('/a/page/')
+        response = self.middleware.process_exception(request, ValueError('boom'))
+        self.assertEqual(response.content, b'inner handled boom')
+
+
+# The manifest storage needs collectstatic to have run
+@override_settings(STORAGES={
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+class RoutedMiddlewareSettingsTests(TestCase):
+    """The admin gets sessions, CSRF, messages and clickjacking protection; the API doesn't."""
+
+    def setUp(self):
+        self.client = Client(enforce_csrf_checks=True)
+        self.credentials = {'username': 'admin@example.com', 'password': 'password'}
+        get_user_model().objects.create_superuser(
+            email='admin@example.com', full_name='Admin', password='password'
+        )
+
+    def test_admin_requests(self):
+        response = self.client.get('/admin/login/')
+        self.assertEqual(response['X-Frame-Options'], 'DENY')
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+        request = response.wsgi_request
+        self.assertTrue(hasattr(request, 'session') and hasattr(request, 'user') and hasattr(request, '_messages'))
+
+        self.assertEqual(self.client.post('/admin/login/', self.credentials).status_code, 403)
+        token = response.cookies[settings.CSRF_COOKIE_NAME].value
+        response = self.client.post('/admin/login/', {**self.credentials, 'csrfmiddlewaretoken': token})
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertEqual(self.client.get('/admin/').status_code, 200)
+
+    def test_api_requests(self):
+        for response in (self.client.get('/api/products/'), self.client.post('/api/carts/')):
+            self.assertLess(response.status_code, 300)
+            self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+            self.assertNotIn(settings.CSRF_COOKIE_NAME, response.cookies)
+            self.assertFalse(response.has_header('X-Frame-Options'))
+            request = response.wsgi_request
+            self.assertFalse(hasattr(request, 'session') or hasattr(request, '_messages'))
+
+
+class ReplicaPinningMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch('config.middleware.replica_aliases', return_value=['replica_0'])
+        self.replica_aliases = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+        self.middleware = ReplicaPinningMiddleware(self.view)
+
+    def view(self, request):
+        response = HttpResponse(status=getattr(request, 'status', 200))
+        response.replica_reads = replica_reads_allowed.get()
+        return response
+
+    def call(self, method, status=200, **extra):
+        request = getattr(self.factory, method)('/api/products/', **extra)
+        request.status = status
+        return self.middleware(request)
+
+    def test_safe_methods_may_read_replicas(self):
+        for method in ('get', 'head', 'options'):
+            response = self.call(method)
+            self.assertTrue(response.replica_reads, method)
+            self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        self.assertFalse(replica_reads_allowed.get())
+
+    def test_writes_read_the_primary_and_pin(self):
+        before = time.time()
+        for method in ('post', 'put', 'patch', 'delete'):
+            response = self.call(method)
+            self.assertFalse(response.replica_reads, method)
+            cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+            self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
+            self.assertTrue(cookie['httponly'])
+            expires = int(response[settings.REPLICA_PIN_HEADER])
+            self.assertGreaterEqual(expires, int(before) + settings.REPLICA_PIN_SECONDS)
+
+    def test_failed_writes_do_not_pin(self):
+        response = self.call('post', status=400)
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        self.assertFalse(response.has_header(settings.REPLICA_PIN_HEADER))
+
+    def test_pinned_by_cookie(self):
+        self.factory.cookies[settings.REPLICA_PIN_COOKIE] = '1'
+        self.assertFalse(self.call('get').replica_reads)
+
+    def test_pinned_by_header(self):
+        header = f"HTTP_{settings.REPLICA_PIN_HEADER.upper().replace('-', '_')}"
+        pin = self.call('post')[settings.REPLICA_PIN_HEADER]
+        self.assertFalse(self.call('get', **{header: pin}).replica_reads)
+        # Expired or garbled pins are ignored
+        self.assertTrue(self.call('get', **{header: str(int(time.time()) - 1)}).replica_reads)
+        self.assertTrue(self.call('get', **{header: 'soon'}).replica_reads)
+
+    def test_without_replicas_everything_reads_the_primary(self):
+        self.replica_aliases.return_value = []
+        self.assertFalse(self.call('get').replica_reads)
+        response = self.call('post')
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        self.assertFalse(response.has_header(settings.REPLICA_PIN_HEADER))
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        token = replica_reads_allowed.set(True)
+        self.addCleanup(replica_reads_allowed.reset, token)
+        choose = mock.patch('config.db_router.replica_pool.choose', return_value='replica_0')
+        self.choose = choose.start()
+        self.addCleanup(choose.stop)
+
+    def test_reads_go_to_a_replica_when_allowed(self):
+        self.assertEqual(self.router.db_for_read(Product), 'replica_0')
+        replica_reads_allowed.set(False)
+        self.assertIsNone(self.router.db_for_read(Product))
+
+    def test_only_replica_apps(self):
+        self.assertNotIn(Job._meta.app_label, settings.REPLICA_APPS)
+        self.assertIsNone(self.router.db_for_read(Job))
+
+    def test_related_reads_follow_the_instance(self):
+        product = Product()
+        product._state.db = 'default'
+        self.assertEqual(self.router.db_for_read(Product, instance=product), 'default')
+
+    def test_a_write_ends_replica_reads(self):
+        self.assertEqual(self.router.db_for_write(Product), 'default')
+        self.assertIsNone(self.router.db_for_read(Product))
+
+    def test_no_healthy_replica_falls_back_to_the_primary(self):
+        self.choose.return_value = None
+        self.assertIsNone(self.router.db_for_read(Product))
+
+
+@override_settings(REPLICA_HEALTH_CHECK_INTERVAL=30)
+@mock.patch('config.db_router.replica_aliases', return_value=['replica_0', 'replica_1'])
+class ReplicaPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.pool = ReplicaPool()
+        self.connections = {alias: mock.Mock() for alias in ('replica_0', 'replica_1')}
+        patcher = mock.patch('config.db_router.connections', self.connections)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_round_robin(self, replica_aliases):
+        self.assertEqual([self.pool.choose() for _ in range(4)], ['replica_0', 'replica_1'] * 2)
+        # Health is only checked once per interval
+        self.assertEqual(self.connections['replica_0'].is_usable.call_count, 1)
+
+    def test_unhealthy_replicas_are_skipped(self, replica_aliases):
+        self.connections['replica_0'].is_usable.return_value = False
+        self.assertEqual([self.pool.choose() for _ in range(3)], ['replica_1'] * 3)
+        self.connections['replica_0'].close.assert_called_once()
+
+    def test_no_replicas(self, replica_aliases):
+        for connection in self.connections.values():
+            connection.is_usable.return_value = False
+        self.assertIsNone(self.pool.choose())
+        replica_aliases.return_value = []
+        self.assertIsNone(ReplicaPool().choose())
@@ -1,9 +1,35 @@
-from django.contrib import admin
 from django.urls import path, include
-from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+from django.urls.resolvers import RoutePattern, URLResolver
+from django.utils.module_loading import import_string
+
+from .views import db_pool_stats_view
+
+
+def lazy_include(route, urlconf_name, app_name=None, namespace=None):
+    """
+    path(route, include(urlconf_name)) that imports the URLconf module the
+    first time a URL under `route` is resolved or reversed.
+    """
+    return URLResolver(
+        RoutePattern(route, is_endpoint=False), urlconf_name, app_name=app_name, namespace=namespace
+    )
+
+
+def lazy_view(view_path, **initkwargs):
+    """Class-based view that is imported on its first request."""
+    view = None
+
+    def wrapper(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            view = import_string(view_path).as_view(**initkwargs)
+        return view(request, *args, **kwargs)
+
+    return wrapper
+
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    lazy_include('admin/', 'config.admin_urls', app_name='admin', namespace='admin'),
 
     # Auth endpoints
     path('api/auth/', include('accounts.urls')),
@@ -11,8 +37,17 @@ urlpatterns = [
     # Catalog API endpoints
     path('api/', include('catalog.urls')),
 
+    # Carts and checkout
+    path('api/', include('orders.urls')),
+
+    # Background job status
+    path('api/jobs/', include('jobs.urls')),
+
+    # Operational metrics
+    path('api/ops/db-pool/', db_pool_stats_view, name='db-pool-stats'),
+
     # OpenAPI schema
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
-    path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
-    path('api/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
+    path('api/schema/', lazy_view('config.schema_views.SchemaView'), name='schema'),
+    path('api/docs/', lazy_view('config.schema_views.SwaggerView'), name='swagger-ui'),
+    path('api/redoc/', lazy_view('config.schema_views.RedocView'), name='redoc'),
 ]
@@ -0,0 +1,15 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from .database import pool_stats
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def db_pool_stats_view(request):
+    """
+    Connection pool metrics for this worker process: pool size, idle
+    connections, requests waiting and total wait time, timeouts.
+    """
+    return Response(pool_stats())
@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'attempts', 'createdAt', 'finishedAt']
+    list_filter = ['status', 'name']
+    readonly_fields = [field.name for field in Job._meta.fields]
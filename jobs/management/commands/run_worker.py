@@ -0,0 +1,71 @@
+import multiprocessing
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.worker import Worker, run_threads
+
+
+def _child(threads, worker_options):
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *args: stop_event.set())
+    run_threads(threads, stop_event, **worker_options)
+
+
+class Command(BaseCommand):
+    help = "Run background job workers: --processes x --threads polling the job table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.JOBS_WORKER_PROCESSES)
+        parser.add_argument('--threads', type=int, default=settings.JOBS_WORKER_THREADS)
+        parser.add_argument('--poll-interval', type=float, default=settings.JOBS_POLL_INTERVAL)
+        parser.add_argument('--visibility-timeout', type=int, default=settings.JOBS_VISIBILITY_TIMEOUT,
+                            help="Seconds a claimed job stays leased before another worker may retry it.")
+        parser.add_argument('--burst', action='store_true',
+                            help="Run jobs in this process until the queue is empty, then exit.")
+
+    def handle(self, *args, **options):
+        worker_options = {
+            'poll_interval': options['poll_interval'],
+            'visibility_timeout': options['visibility_timeout'],
+        }
+
+        if options['burst']:
+            from jobs.registry import autodiscover
+            autodiscover()
+            worker = Worker(**worker_options)
+            processed = 0
+            while worker.run_once():
+                processed += 1
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} job(s)"))
+            return
+
+        processes, threads = options['processes'], options['threads']
+        self.stdout.write(f"Starting {processes} process(es) x {threads} thread(s)")
+
+        if processes == 1:
+            _child(threads, worker_options)
+            return
+
+        # Children must open their own database connections
+        connections.close_all()
+        children = [
+            multiprocessing.Process(target=_child, args=(threads, worker_options))
+            for _ in range(processes)
+        ]
+        for child in children:
+            child.start()
+
+        def stop_children(*args):
+            # Children finish their current job, then exit
+            for child in children:
+                child.terminate()
+
+        signal.signal(signal.SIGTERM, stop_children)
+        signal.signal(signal.SIGINT, stop_children)
+        for child in children:
+            child.join()
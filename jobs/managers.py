@@ -0,0 +1,55 @@
+# managers.py
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+class JobManager(models.Manager):
+    def enqueue(self, name, payload=None, delay=0, max_attempts=None):
+        return self.create(
+            name=name,
+            payload=payload or {},
+            runAfter=timezone.now() + timedelta(seconds=delay),
+            maxAttempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        )
+
+    def claimable(self):
+        """Queued jobs that are due, plus running jobs whose lease expired."""
+        now = timezone.now()
+        return self.filter(
+            Q(status=self.model.QUEUED, runAfter__lte=now)
+            | Q(status=self.model.RUNNING, lockedUntil__lt=now)
+        )
+
+    def claim(self, worker_id, visibility_timeout=None):
+        """
+        Lease the next due job to `worker_id`, or return None.
+
+        Each candidate is taken with a conditional UPDATE on the columns we
+        read, so only one worker can win it; no SELECT ... FOR UPDATE SKIP
+        LOCKED, which SQLite lacks. The lease expires after
+        `visibility_timeout` seconds, after which another worker may pick the
+        job up again (counted as a new attempt).
+        """
+        timeout = visibility_timeout or settings.JOBS_VISIBILITY_TIMEOUT
+        candidates = self.claimable().order_by('runAfter').values('pk', 'status', 'lockedUntil')[:10]
+        for candidate in candidates:
+            token = uuid.uuid4()
+            now = timezone.now()
+            claimed = self.filter(
+                pk=candidate['pk'], status=candidate['status'], lockedUntil=candidate['lockedUntil']
+            ).update(
+                status=self.model.RUNNING,
+                lockedBy=worker_id,
+                lockToken=token,
+                lockedUntil=now + timedelta(seconds=timeout),
+                attempts=F('attempts') + 1,
+                startedAt=now,
+            )
+            if claimed:
+                return self.get(pk=candidate['pk'])
+        return None
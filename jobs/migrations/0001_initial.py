@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:33
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('maxAttempts', models.PositiveIntegerField(default=3)),
+                ('runAfter', models.DateTimeField(default=django.utils.timezone.now)),
+                ('lockedBy', models.CharField(blank=True, max_length=100)),
+                ('lockToken', models.UUIDField(blank=True, null=True)),
+                ('lockedUntil', models.DateTimeField(blank=True, null=True)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('createdAt', models.DateTimeField(auto_now_add=True)),
+                ('startedAt', models.DateTimeField(blank=True, null=True)),
+                ('finishedAt', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-createdAt'],
+                'indexes': [models.Index(fields=['status', 'runAfter'], name='job_claim_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,76 @@
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from .managers import JobManager
+
+
+class Job(models.Model):
+    """A unit of background work, leased to one worker at a time."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    maxAttempts = models.PositiveIntegerField(default=3)
+    runAfter = models.DateTimeField(default=timezone.now)
+    lockedBy = models.CharField(max_length=100, blank=True)
+    lockToken = models.UUIDField(null=True, blank=True)
+    lockedUntil = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    createdAt = models.DateTimeField(auto_now_add=True)
+    startedAt = models.DateTimeField(null=True, blank=True)
+    finishedAt = models.DateTimeField(null=True, blank=True)
+
+    objects = JobManager()
+
+    class Meta:
+        ordering = ['-createdAt']
+        indexes = [
+            models.Index(fields=['status', 'runAfter'], name='job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+    def _finish(self, **fields):
+        """
+        Write the outcome only while we still hold the lease: if it expired
+        and another worker re-claimed the job, its run owns the row now.
+        """
+        return Job.objects.filter(pk=self.pk, lockToken=self.lockToken).update(
+            lockedBy='', lockToken=None, lockedUntil=None, **fields
+        ) == 1
+
+    def extend_lease(self, visibility_timeout):
+        """Push lockedUntil forward; False if the lease was already lost."""
+        return Job.objects.filter(pk=self.pk, lockToken=self.lockToken).update(
+            lockedUntil=timezone.now() + timedelta(seconds=visibility_timeout)
+        ) == 1
+
+    def mark_succeeded(self, result=None):
+        return self._finish(status=self.SUCCEEDED, result=result, error='', finishedAt=timezone.now())
+
+    def mark_failed(self, error):
+        """Requeue with exponential backoff, or fail for good once out of attempts."""
+        if self.attempts < self.maxAttempts:
+            delay = settings.JOBS_RETRY_BACKOFF * 2 ** (self.attempts - 1)
+            return self._finish(
+                status=self.QUEUED, error=error, runAfter=timezone.now() + timedelta(seconds=delay)
+            )
+        return self._finish(status=self.FAILED, error=error, finishedAt=timezone.now())
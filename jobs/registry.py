@@ -0,0 +1,27 @@
+# registry.py
+from django.utils.module_loading import autodiscover_modules
+
+_tasks = {}
+
+
+def task(name):
+    """
+    Register a function as a background task under `name`. The function is
+    called with the job's payload as keyword arguments; its return value
+    (JSON-serializable) is stored as the job result.
+    """
+    def decorator(func):
+        _tasks[name] = func
+        return func
+    return decorator
+
+
+def get_task(name):
+    if name not in _tasks:
+        autodiscover()
+    return _tasks[name]
+
+
+def autodiscover():
+    """Import every installed app's tasks module."""
+    autodiscover_modules('tasks')
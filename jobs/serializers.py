@@ -0,0 +1,13 @@
+from rest_framework import serializers
+
+from .models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'name', 'status', 'attempts', 'maxAttempts', 'result', 'error',
+            'createdAt', 'startedAt', 'finishedAt',
+        ]
+        read_only_fields = fields
@@ -0,0 +1,97 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import Job
+from .registry import task
+from .worker import Worker
+
+
+@task('jobs.tests.add')
+def add(a, b):
+    return a + b
+
+
+@task('jobs.tests.fail')
+def fail():
+    raise RuntimeError('boom')
+
+
+@override_settings(JOBS_RETRY_BACKOFF=10)
+class JobLeaseTests(TestCase):
+    def test_claim_leases_a_job_once(self):
+        job = Job.objects.enqueue('jobs.tests.add', {'a': 1, 'b': 2})
+        claimed = Job.objects.claim('worker-1', visibility_timeout=60)
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual((claimed.status, claimed.lockedBy, claimed.attempts), (Job.RUNNING, 'worker-1', 1))
+        self.assertIsNone(Job.objects.claim('worker-2', visibility_timeout=60))
+
+    def test_delayed_jobs_wait(self):
+        Job.objects.enqueue('jobs.tests.add', {'a': 1, 'b': 2}, delay=60)
+        self.assertIsNone(Job.objects.claim('worker-1'))
+
+    def test_expired_lease_is_claimed_again(self):
+        Job.objects.enqueue('jobs.tests.add', {'a': 1, 'b': 2})
+        first = Job.objects.claim('worker-1', visibility_timeout=60)
+        Job.objects.filter(pk=first.pk).update(lockedUntil=timezone.now() - timedelta(seconds=1))
+
+        second = Job.objects.claim('worker-2', visibility_timeout=60)
+        self.assertEqual((second.pk, second.attempts), (first.pk, 2))
+        # The first worker no longer owns the row
+        self.assertFalse(first.extend_lease(60))
+        self.assertFalse(first.mark_succeeded(3))
+        self.assertTrue(second.extend_lease(60))
+        self.assertTrue(second.mark_succeeded(3))
+
+    def test_extend_lease(self):
+        Job.objects.enqueue('jobs.tests.add', {'a': 1, 'b': 2})
+        job = Job.objects.claim('worker-1', visibility_timeout=1)
+        self.assertTrue(job.extend_lease(600))
+        job.refresh_from_db()
+        self.assertGreater(job.lockedUntil, timezone.now() + timedelta(seconds=500))
+        self.assertIsNone(Job.objects.claim('worker-2'))
+
+    def test_retry_backs_off_then_fails(self):
+        job = Job.objects.enqueue('jobs.tests.fail', max_attempts=2)
+        worker = Worker(name='worker-1', visibility_timeout=60)
+
+        before = timezone.now()
+        self.assertTrue(worker.run_once())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.lockToken), (Job.QUEUED, 1, None))
+        self.assertIn('boom', job.error)
+        self.assertGreaterEqual(job.runAfter, before + timedelta(seconds=10))
+        self.assertFalse(worker.run_once())
+
+        Job.objects.filter(pk=job.pk).update(runAfter=timezone.now())
+        self.assertTrue(worker.run_once())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIsNotNone(job.finishedAt)
+
+    def test_backoff_doubles(self):
+        job = Job.objects.enqueue('jobs.tests.fail', max_attempts=5)
+        for attempts, delay in ((1, 10), (2, 20), (3, 40)):
+            claimed = Job.objects.claim('worker-1')
+            self.assertEqual(claimed.attempts, attempts)
+            before = timezone.now()
+            self.assertTrue(claimed.mark_failed('boom'))
+            job.refresh_from_db()
+            self.assertGreaterEqual(job.runAfter, before + timedelta(seconds=delay))
+            self.assertLess(job.runAfter, before + timedelta(seconds=delay + 5))
+            Job.objects.filter(pk=job.pk).update(runAfter=timezone.now())
+
+    def test_worker_stores_the_result(self):
+        job = Job.objects.enqueue('jobs.tests.add', {'a': 2, 'b': 3})
+        self.assertTrue(Worker(name='worker-1', visibility_timeout=60).run_once())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.lockToken), (Job.SUCCEEDED, 5, None))
+
+    def test_lease_lost_on_the_final_attempt_fails_the_job(self):
+        job = Job.objects.enqueue('jobs.tests.add', {'a': 1, 'b': 2}, max_attempts=1)
+        Job.objects.claim('worker-1', visibility_timeout=60)
+        Job.objects.filter(pk=job.pk).update(lockedUntil=timezone.now() - timedelta(seconds=1))
+        self.assertTrue(Worker(name='worker-2', visibility_timeout=60).run_once())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
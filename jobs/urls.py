@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .views import JobStatusView
+
+urlpatterns = [
+    path('<uuid:pk>/', JobStatusView.as_view(), name='job-status'),
+]
@@ -0,0 +1,12 @@
+from rest_framework import generics
+from rest_framework.permissions import IsAdminUser
+
+from .models import Job
+from .serializers import JobSerializer
+
+
+class JobStatusView(generics.RetrieveAPIView):
+    """Status and result of a background job (poll after a 202 response)."""
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    permission_classes = [IsAdminUser]
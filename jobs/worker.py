@@ -0,0 +1,101 @@
+# worker.py
+import logging
+import os
+import socket
+import threading
+import traceback
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from .models import Job
+from .registry import autodiscover, get_task
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    Polls the job table and runs due jobs, one at a time. Run several in
+    threads and/or processes for concurrency; they coordinate only
+    through the conditional UPDATE in JobManager.claim(). While a job
+    runs, a heartbeat thread keeps extending its lease, so a long job is
+    not claimed again just because it outlasts the visibility timeout.
+    """
+
+    def __init__(self, name=None, poll_interval=None, visibility_timeout=None):
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+        self.poll_interval = poll_interval or settings.JOBS_POLL_INTERVAL
+        self.visibility_timeout = visibility_timeout or settings.JOBS_VISIBILITY_TIMEOUT
+
+    def run_once(self):
+        """Claim and run one job. Returns False when the queue was empty."""
+        close_old_connections()
+        job = Job.objects.claim(self.name, self.visibility_timeout)
+        if job is None:
+            return False
+
+        if job.attempts > job.maxAttempts:
+            # Leased out and lost (worker killed, timeout too short) on its last attempt
+            job.mark_failed(job.error or 'Visibility timeout expired on the final attempt')
+            return True
+
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self.heartbeat, args=(job, done), daemon=True)
+        heartbeat.start()
+        try:
+            result = get_task(job.name)(**job.payload)
+        except Exception:
+            logger.exception("Job %s (%s) failed on attempt %s", job.pk, job.name, job.attempts)
+            error = traceback.format_exc()
+        else:
+            error = None
+        finally:
+            # Stop extending before the outcome releases the lease
+            done.set()
+            heartbeat.join()
+
+        if error is not None:
+            job.mark_failed(error)
+        elif not job.mark_succeeded(result):
+            logger.warning("Job %s finished after its lease expired; result discarded", job.pk)
+        return True
+
+    def heartbeat(self, job, done):
+        """Extend `job`'s lease every third of the visibility timeout until `done` is set."""
+        try:
+            while not done.wait(self.visibility_timeout / 3):
+                try:
+                    if not job.extend_lease(self.visibility_timeout):
+                        logger.warning("Job %s lost its lease while running", job.pk)
+                        return
+                except Exception:
+                    # Keep trying; the lease only lapses if this keeps failing
+                    logger.exception("Could not extend the lease of job %s", job.pk)
+        finally:
+            connection.close()
+
+    def run(self, stop_event):
+        while not stop_event.is_set():
+            try:
+                busy = self.run_once()
+            except Exception:
+                # Database hiccup while claiming; back off and retry
+                logger.exception("Worker %s could not claim a job", self.name)
+                busy = False
+            if not busy:
+                stop_event.wait(self.poll_interval)
+        connection.close()
+
+
+def run_threads(threads, stop_event, **worker_options):
+    """Run `threads` workers in this process until `stop_event` is set."""
+    autodiscover()
+    workers = [
+        threading.Thread(target=Worker(**worker_options).run, args=(stop_event,), daemon=True)
+        for _ in range(threads)
+    ]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
@@ -0,0 +1,68 @@
+from django import forms
+from django.contrib import admin, messages
+
+from .models import StockItem, Order, OrderItem
+
+
+class StockItemForm(forms.ModelForm):
+    adjustment = forms.IntegerField(
+        required=False,
+        help_text="Units to add, or negative to remove. Applied to the current quantity, "
+                  "so reservations made while this form was open are kept.",
+    )
+
+    class Meta:
+        model = StockItem
+        fields = ['product']
+
+    def clean_product(self):
+        product = self.cleaned_data['product']
+        if product.hasVariants:
+            raise forms.ValidationError("This product's stock is kept on its variants")
+        return product
+
+
+@admin.register(StockItem)
+class StockItemAdmin(admin.ModelAdmin):
+    """
+    The quantity is read-only: reservations change it concurrently, so the
+    form only takes a delta, applied by StockItemManager.adjust().
+    """
+    form = StockItemForm
+    list_display = ['product', 'quantity', 'updatedAt']
+    list_select_related = ['product']
+    autocomplete_fields = ['product']
+    search_fields = ['^product__name']
+    fields = ['product', 'quantity', 'adjustment', 'updatedAt']
+    readonly_fields = ['quantity', 'updatedAt']
+
+    def get_readonly_fields(self, request, obj=None):
+        if obj is not None:
+            return ['product', *self.readonly_fields]
+        return self.readonly_fields
+
+    def save_model(self, request, obj, form, change):
+        # Never save a changed item: that would write back the quantity read with the form
+        if not change:
+            super().save_model(request, obj, form, change)
+            StockItem.objects.sync_in_stock([obj.pk])
+        adjustment = form.cleaned_data.get('adjustment')
+        if adjustment and not StockItem.objects.adjust(obj.pk, adjustment):
+            left = StockItem.objects.filter(pk=obj.pk).values_list('quantity', flat=True).first()
+            self.message_user(request, f"Stock not adjusted: only {left} left", messages.ERROR)
+
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    extra = 0
+    readonly_fields = ['product', 'productName', 'unitPrice', 'quantity']
+    can_delete = False
+
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'status', 'total', 'createdAt']
+    list_select_related = ['user']
+    list_filter = ['status']
+    readonly_fields = ['user', 'total', 'createdAt']
+    inlines = [OrderItemInline]
@@ -0,0 +1,109 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from catalog.models import Brand, Category, Product, ProductChange, Subcategory
+from orders.managers import InsufficientStock
+from orders.models import Cart, CartItem, Order, StockItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrency benchmark: many parallel buyers reserve and check out the "
+        "same SKU. Verifies nothing is oversold and reports checkout throughput."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=300, help='Total buyers')
+        parser.add_argument('--threads', type=int, default=32, help='Buyers running at once')
+        parser.add_argument('--stock', type=int, default=200, help='Units of the SKU on sale')
+        parser.add_argument('--quantity', type=int, default=1, help='Units each buyer wants')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write(
+                "Not PostgreSQL: SQLite serializes writers, so throughput numbers "
+                "are not representative (lock timeouts are counted as errors).\n"
+            )
+
+        # Buyers commit in their own connections, so the fixture can't live in
+        # a rolled-back transaction; it is deleted at the end instead
+        product, stock_item = self.create_fixture(options['stock'])
+        self.cart_ids = []
+        try:
+            results = self.run_buyers(stock_item, options)
+            self.report(stock_item, options, results)
+        finally:
+            Order.objects.filter(items__product=product).delete()
+            Cart.objects.filter(pk__in=self.cart_ids).delete()
+            product_id, category, subcategory, brand = product.pk, product.category, product.subcategory, product.brand
+            product.delete()
+            ProductChange.objects.filter(product_id=product_id).delete()
+            subcategory.delete()
+            category.delete()
+            brand.delete()
+
+    def create_fixture(self, stock):
+        category = Category.objects.create(name='Bench Checkout Category')
+        subcategory = Subcategory.objects.create(name='Bench Checkout Sub', category=category)
+        brand = Brand.objects.create(name='Bench Checkout Brand')
+        product = Product.objects.create(
+            name='Bench Checkout Product', price=Decimal('19.99'), description='Benchmark SKU',
+            category=category, subcategory=subcategory, brand=brand,
+        )
+        return product, StockItem.objects.create(product=product, quantity=stock)
+
+    def run_buyers(self, stock_item, options):
+        def buy(_):
+            start = time.perf_counter()
+            try:
+                cart = Cart.objects.create()
+                self.cart_ids.append(cart.pk)
+                CartItem.objects.reserve(cart, stock_item, options['quantity'])
+                Order.objects.place(cart)
+                outcome = 'sold'
+            except InsufficientStock:
+                outcome = 'sold out'
+            except OperationalError:
+                outcome = 'error'
+            finally:
+                connection.close()
+            return outcome, (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            results = list(pool.map(buy, range(options['buyers'])))
+        return results, time.perf_counter() - start
+
+    def report(self, stock_item, options, results):
+        outcomes, elapsed = results
+        sold = [ms for outcome, ms in outcomes if outcome == 'sold']
+        counts = {
+            name: sum(1 for outcome, _ in outcomes if outcome == name) for name in ('sold', 'sold out', 'error')
+        }
+
+        stock_item.refresh_from_db()
+        units_sold = sum(
+            Order.objects.filter(items__product_id=stock_item.product_id).values_list('items__quantity', flat=True)
+        )
+        # Buyers that errored between reserve and checkout still hold units
+        units_held = sum(stock_item.reservations.values_list('quantity', flat=True))
+        expected_left = options['stock'] - units_sold - units_held
+
+        self.stdout.write(f"buyers={options['buyers']} threads={options['threads']} stock={options['stock']}")
+        self.stdout.write(f"sold={counts['sold']} sold_out={counts['sold out']} errors={counts['error']}")
+        if sold:
+            sold.sort()
+            self.stdout.write(
+                f"checkouts/s={len(sold) / elapsed:.0f} p50={statistics.median(sold):.1f}ms "
+                f"p99={sold[min(len(sold) - 1, int(len(sold) * 0.99))]:.1f}ms"
+            )
+        self.stdout.write(f"units sold={units_sold} held={units_held} stock left={stock_item.quantity}")
+
+        if units_sold > options['stock'] or stock_item.quantity != expected_left:
+            raise CommandError("Oversold or stock out of balance")
+        self.stdout.write(self.style.SUCCESS("No oversell; stock balances"))
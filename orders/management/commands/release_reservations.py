@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orders.models import CartItem
+
+
+class Command(BaseCommand):
+    help = "Return expired cart reservations to stock (run from cron or enqueue the job)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.ORDERS_RELEASE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        released = CartItem.objects.release_expired(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Released {released} expired reservation(s)"))
@@ -0,0 +1,192 @@
+# managers.py
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+class InsufficientStock(Exception):
+    pass
+
+
+class EmptyCart(Exception):
+    pass
+
+
+class LineLimitExceeded(Exception):
+    pass
+
+
+class StockItemManager(models.Manager):
+    def take(self, stock_item_id, quantity):
+        """
+        Remove `quantity` units if at least that many are left. A single
+        UPDATE ... WHERE quantity >= n: concurrent buyers queue on the row
+        lock and each re-checks the condition, so stock can't go negative.
+        """
+        return self.filter(pk=stock_item_id, quantity__gte=quantity).update(
+            quantity=F('quantity') - quantity, updatedAt=timezone.now()
+        ) == 1
+
+    def give_back(self, quantities):
+        """Return units to stock; `quantities` maps stock item id -> units."""
+        for stock_item_id, quantity in quantities.items():
+            self.filter(pk=stock_item_id).update(
+                quantity=F('quantity') + quantity, updatedAt=timezone.now()
+            )
+
+    def adjust(self, stock_item_id, delta):
+        """
+        Add `delta` units (negative to remove) unless that would take the
+        quantity below zero: restocks and stock counts, applied as one
+        UPDATE so units reserved meanwhile are kept.
+        """
+        with transaction.atomic():
+            adjusted = self.filter(pk=stock_item_id, quantity__gte=max(-delta, 0)).update(
+                quantity=F('quantity') + delta, updatedAt=timezone.now()
+            ) == 1
+            if adjusted:
+                self.sync_in_stock([stock_item_id])
+        return adjusted
+
+    def available(self, stock_item_id):
+        return self.filter(pk=stock_item_id).values_list('quantity', flat=True).first() or 0
+
+    def sync_in_stock(self, stock_item_ids):
+        """
+        Keep Product.inStock in step with tracked quantities for products
+        whose stock just hit or left zero.
+        """
+        from catalog.models import Product
+
+        stale = dict(
+            Product.objects.filter(stock__in=stock_item_ids)
+            .filter(Q(stock__quantity=0, inStock=True) | Q(stock__quantity__gt=0, inStock=False))
+            .values_list('pk', 'inStock')
+        )
+        for in_stock in (True, False):
+            product_ids = [pk for pk, was_in_stock in stale.items() if was_in_stock != in_stock]
+            if product_ids:
+                Product.objects.update_and_record(Product.objects.filter(pk__in=product_ids), inStock=in_stock)
+
+
+class CartItemManager(models.Manager):
+    def reserve(self, cart, stock, quantity):
+        """
+        Hold `quantity` more units of `stock` in `cart` for
+        ORDERS_RESERVATION_TTL seconds, up to ORDERS_MAX_LINE_QUANTITY per
+        line. `stock` is the StockItem of a product without variants or the
+        ProductVariant being bought. Raises InsufficientStock or
+        LineLimitExceeded.
+        """
+        from catalog.models import ProductVariant
+
+        is_variant = isinstance(stock, ProductVariant)
+        stock_manager = type(stock).objects
+        limit = settings.ORDERS_MAX_LINE_QUANTITY
+        if quantity > limit:
+            raise LineLimitExceeded(f"At most {limit} of an item per cart")
+        reserved_until = timezone.now() + timedelta(seconds=settings.ORDERS_RESERVATION_TTL)
+        with transaction.atomic():
+            if not stock_manager.take(stock.pk, quantity):
+                raise InsufficientStock(f"Only {stock_manager.available(stock.pk)} left in stock")
+            item, created = self.get_or_create(
+                cart=cart, **{'variant' if is_variant else 'stock_item': stock},
+                defaults={'quantity': quantity, 'reservedUntil': reserved_until},
+            )
+            if not created:
+                # Conditional, so concurrent adds can't push the line past the limit
+                added = self.filter(pk=item.pk, quantity__lte=limit - quantity).update(
+                    quantity=F('quantity') + quantity, reservedUntil=reserved_until
+                )
+                if not added:
+                    raise LineLimitExceeded(f"At most {limit} of an item per cart")
+                item.refresh_from_db()
+            if is_variant:
+                stock_manager.sync_in_stock([stock.product_id])
+            else:
+                stock_manager.sync_in_stock([stock.pk])
+        return item
+
+    def release(self, items):
+        """Delete cart items and put their units back in stock."""
+        from catalog.models import ProductVariant
+        from .models import StockItem
+
+        items = list(items)
+        stock_items, variants = defaultdict(int), defaultdict(int)
+        for item in items:
+            if item.variant_id:
+                variants[item.variant_id] += item.quantity
+            else:
+                stock_items[item.stock_item_id] += item.quantity
+        with transaction.atomic():
+            self.filter(pk__in=[item.pk for item in items]).delete()
+            StockItem.objects.give_back(stock_items)
+            StockItem.objects.sync_in_stock(list(stock_items))
+            ProductVariant.objects.give_back(variants)
+            ProductVariant.objects.sync_in_stock(ProductVariant.objects.filter(pk__in=list(variants)).values('product'))
+
+    def release_expired(self, batch_size=None):
+        """
+        Return expired reservations to stock, `batch_size` rows per
+        transaction. Rows a checkout has locked are skipped (SKIP LOCKED),
+        so releasing never races a checkout. Returns the number released.
+        """
+        batch_size = batch_size or settings.ORDERS_RELEASE_BATCH_SIZE
+        released = 0
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    self.select_for_update(skip_locked=True)
+                    .filter(reservedUntil__lt=timezone.now())
+                    .only('pk', 'stock_item_id', 'variant_id', 'quantity')[:batch_size]
+                )
+                if not batch:
+                    return released
+                self.release(batch)
+            released += len(batch)
+
+
+class OrderManager(models.Manager):
+    def place(self, cart, user=None):
+        """
+        Turn the cart's reservations into an order. The reserved units are
+        already out of stock, so checkout only has to claim its cart items.
+        """
+        from .models import CartItem, OrderItem
+
+        with transaction.atomic():
+            items = list(
+                # Lock only the cart rows, not the joined stock/product rows
+                CartItem.objects.select_for_update(of=('self',))
+                .filter(cart=cart)
+                .select_related('stock_item__product', 'variant__product', 'variant__size', 'variant__color')
+            )
+            if not items:
+                raise EmptyCart("Cart is empty")
+
+            # The reservations must still exist: a concurrent release that got
+            # there first (backends without row locks) rolls the order back
+            deleted, _ = CartItem.objects.filter(pk__in=[item.pk for item in items]).delete()
+            if deleted != len(items):
+                raise InsufficientStock("Cart reservations expired; please retry")
+
+            order = self.create(
+                user=user,
+                total=sum(item.unit_price * item.quantity for item in items),
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    product=item.product,
+                    productName=item.name,
+                    unitPrice=item.unit_price,
+                    quantity=item.quantity,
+                )
+                for item in items
+            ])
+        return order
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0012_product_change_seq'),
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cartitem',
+            name='variant',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='catalog.productvariant'),
+        ),
+        migrations.AlterField(
+            model_name='cartitem',
+            name='stock_item',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='orders.stockitem'),
+        ),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'variant'), name='cart_item_variant_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.CheckConstraint(condition=models.Q(('stock_item__isnull', True), ('variant__isnull', True), _connector='XOR'), name='cart_item_one_stock'),
+        ),
+    ]
@@ -0,0 +1,124 @@
+import uuid
+
+from django.conf import settings
+from django.db import models
+
+from catalog.models import Product, ProductVariant
+from .managers import StockItemManager, CartItemManager, OrderManager
+
+
+class StockItem(models.Model):
+    """
+    Sellable quantity of a product. Only changed through conditional
+    UPDATEs (StockItemManager), never read-modify-write; the CHECK on the
+    positive integer column is the last line of defence against oversell.
+    Only for products without variants: those with variants keep their
+    stock on ProductVariant.stock. Products with neither are not
+    stock-tracked.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    product = models.OneToOneField(Product, related_name='stock', on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=0)
+    updatedAt = models.DateTimeField(auto_now=True)
+
+    objects = StockItemManager()
+
+    def __str__(self):
+        return f"{self.product.name}: {self.quantity}"
+
+
+class Cart(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name='carts', on_delete=models.CASCADE, null=True, blank=True
+    )
+    createdAt = models.DateTimeField(auto_now_add=True)
+    updatedAt = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return str(self.id)
+
+
+class CartItem(models.Model):
+    """
+    A cart line; its quantity is held out of the StockItem, or for a product
+    with variants out of the chosen variant, until reservedUntil.
+    """
+    cart = models.ForeignKey(Cart, related_name='items', on_delete=models.CASCADE)
+    stock_item = models.ForeignKey(
+        StockItem, related_name='reservations', on_delete=models.CASCADE, null=True, blank=True
+    )
+    variant = models.ForeignKey(
+        ProductVariant, related_name='reservations', on_delete=models.CASCADE, null=True, blank=True
+    )
+    quantity = models.PositiveIntegerField()
+    reservedUntil = models.DateTimeField(db_index=True)
+
+    objects = CartItemManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'stock_item'], name='cart_item_unique'),
+            models.UniqueConstraint(fields=['cart', 'variant'], name='cart_item_variant_unique'),
+            models.CheckConstraint(
+                condition=models.Q(stock_item__isnull=True) ^ models.Q(variant__isnull=True),
+                name='cart_item_one_stock',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.name}"
+
+    @property
+    def product(self):
+        return self.variant.product if self.variant_id else self.stock_item.product
+
+    @property
+    def name(self):
+        if not self.variant_id:
+            return self.product.name
+        options = ', '.join(option.name for option in (self.variant.size, self.variant.color) if option)
+        return f"{self.product.name} ({options})" if options else self.product.name
+
+    @property
+    def unit_price(self):
+        if self.variant_id and self.variant.priceOverride is not None:
+            return self.variant.priceOverride
+        return self.product.price
+
+
+class Order(models.Model):
+    PLACED = 'placed'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (PLACED, 'Placed'),
+        (CANCELLED, 'Cancelled'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name='orders', on_delete=models.SET_NULL, null=True, blank=True
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PLACED)
+    total = models.DecimalField(max_digits=12, decimal_places=2)
+    createdAt = models.DateTimeField(auto_now_add=True)
+
+    objects = OrderManager()
+
+    class Meta:
+        ordering = ['-createdAt']
+
+    def __str__(self):
+        return f"Order {self.id} ({self.status})"
+
+
+class OrderItem(models.Model):
+    order = models.ForeignKey(Order, related_name='items', on_delete=models.CASCADE)
+    # Snapshot of the product at checkout; the product itself may go away
+    product = models.ForeignKey(Product, related_name='order_items', on_delete=models.SET_NULL, null=True)
+    productName = models.CharField(max_length=255)
+    unitPrice = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.quantity} x {self.productName}"
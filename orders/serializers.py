@@ -0,0 +1,43 @@
+from rest_framework import serializers
+
+from .models import Cart, CartItem, Order, OrderItem
+
+
+class CartItemSerializer(serializers.ModelSerializer):
+    product_id = serializers.UUIDField(source='product.pk', read_only=True)
+    variant_id = serializers.UUIDField(read_only=True, allow_null=True)
+    name = serializers.CharField(read_only=True)
+    price = serializers.DecimalField(source='unit_price', max_digits=10, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = CartItem
+        fields = ['product_id', 'variant_id', 'name', 'price', 'quantity', 'reservedUntil']
+
+
+class CartSerializer(serializers.ModelSerializer):
+    items = CartItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Cart
+        fields = ['id', 'items', 'createdAt', 'updatedAt']
+
+
+class AddToCartSerializer(serializers.Serializer):
+    product_id = serializers.UUIDField()
+    # Required for products with variants
+    variant_id = serializers.UUIDField(required=False)
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class OrderItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = OrderItem
+        fields = ['product', 'productName', 'unitPrice', 'quantity']
+
+
+class OrderSerializer(serializers.ModelSerializer):
+    items = OrderItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Order
+        fields = ['id', 'status', 'total', 'items', 'createdAt']
@@ -0,0 +1,9 @@
+# tasks.py
+from jobs.registry import task
+
+from .models import CartItem
+
+
+@task('orders.release_expired_reservations')
+def release_expired_reservations(batch_size=None):
+    return {'released': CartItem.objects.release_expired(batch_size)}
@@ -0,0 +1,220 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework.throttling import ScopedRateThrottle
+
+from catalog.models import Color, Product, ProductVariant, Size
+from .managers import EmptyCart, InsufficientStock, LineLimitExceeded
+from .models import Cart, CartItem, Order, StockItem
+
+
+class StockTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = Product.objects.create(name='Lamp', description='Orders test', price='20.00')
+        self.stock_item = StockItem.objects.create(product=self.product, quantity=5)
+        self.cart = Cart.objects.create()
+
+    def quantity(self):
+        self.stock_item.refresh_from_db()
+        return self.stock_item.quantity
+
+    def in_stock(self):
+        self.product.refresh_from_db()
+        return self.product.inStock
+
+
+class ReservationTests(StockTestCase):
+    def test_reserve_takes_stock(self):
+        item = CartItem.objects.reserve(self.cart, self.stock_item, 2)
+        CartItem.objects.reserve(self.cart, self.stock_item, 1)
+        item.refresh_from_db()
+        self.assertEqual((item.quantity, self.quantity()), (3, 2))
+
+    def test_reserve_never_oversells(self):
+        CartItem.objects.reserve(self.cart, self.stock_item, 5)
+        self.assertFalse(self.in_stock())
+        with self.assertRaisesMessage(InsufficientStock, 'Only 0 left'):
+            CartItem.objects.reserve(Cart.objects.create(), self.stock_item, 1)
+        self.assertEqual(self.quantity(), 0)
+
+    @override_settings(ORDERS_MAX_LINE_QUANTITY=3)
+    def test_line_limit(self):
+        with self.assertRaises(LineLimitExceeded):
+            CartItem.objects.reserve(self.cart, self.stock_item, 4)
+        CartItem.objects.reserve(self.cart, self.stock_item, 2)
+        with self.assertRaises(LineLimitExceeded):
+            CartItem.objects.reserve(self.cart, self.stock_item, 2)
+        # The rejected add gave its units back
+        self.assertEqual(self.quantity(), 3)
+
+    def test_release_returns_stock(self):
+        CartItem.objects.reserve(self.cart, self.stock_item, 5)
+        CartItem.objects.release(self.cart.items.all())
+        self.assertEqual((self.quantity(), self.cart.items.count()), (5, 0))
+        self.assertTrue(self.in_stock())
+
+    def test_release_expired(self):
+        CartItem.objects.reserve(self.cart, self.stock_item, 2)
+        other = Cart.objects.create()
+        CartItem.objects.reserve(other, self.stock_item, 1)
+        self.cart.items.update(reservedUntil=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(CartItem.objects.release_expired(), 1)
+        self.assertEqual(self.quantity(), 4)
+        self.assertEqual(list(CartItem.objects.values_list('cart', flat=True)), [other.pk])
+
+    def test_place_order(self):
+        CartItem.objects.reserve(self.cart, self.stock_item, 2)
+        order = Order.objects.place(self.cart)
+        self.assertEqual(order.total, 40)
+        self.assertEqual(
+            list(order.items.values_list('productName', 'unitPrice', 'quantity')), [('Lamp', 20, 2)]
+        )
+        # The reservation became the order; stock stays taken
+        self.assertEqual((self.cart.items.count(), self.quantity()), (0, 3))
+        with self.assertRaises(EmptyCart):
+            Order.objects.place(self.cart)
+
+    def test_adjust_keeps_reservations(self):
+        CartItem.objects.reserve(self.cart, self.stock_item, 5)
+        self.assertTrue(StockItem.objects.adjust(self.stock_item.pk, 3))
+        self.assertEqual(self.quantity(), 3)
+        self.assertTrue(self.in_stock())
+        self.assertFalse(StockItem.objects.adjust(self.stock_item.pk, -4))
+        self.assertTrue(StockItem.objects.adjust(self.stock_item.pk, -3))
+        self.assertFalse(self.in_stock())
+
+
+class VariantReservationTests(TestCase):
+    """Products with variants keep their stock on the variants only."""
+
+    def setUp(self):
+        cache.clear()
+        self.product = Product.objects.create(name='Shirt', description='Orders test', price='30.00')
+        self.medium = ProductVariant.objects.create(
+            product=self.product, sku='SHIRT-M', size=Size.objects.create(name='M'), stock=2,
+        )
+        self.large = ProductVariant.objects.create(
+            product=self.product, sku='SHIRT-L-RED', size=Size.objects.create(name='L'),
+            color=Color.objects.create(name='Red'), stock=1, priceOverride='35.00',
+        )
+        self.cart = Cart.objects.create()
+
+    def stock(self):
+        return dict(ProductVariant.objects.values_list('sku', 'stock'))
+
+    def test_variants_drive_options_and_in_stock(self):
+        self.product.refresh_from_db()
+        self.assertTrue(self.product.hasVariants)
+        self.assertEqual(sorted(self.product.sizes.values_list('name', flat=True)), ['L', 'M'])
+        self.assertTrue(self.product.inStock)
+
+    def test_reserve_and_release_variants(self):
+        CartItem.objects.reserve(self.cart, self.medium, 2)
+        CartItem.objects.reserve(self.cart, self.large, 1)
+        self.assertEqual(self.stock(), {'SHIRT-M': 0, 'SHIRT-L-RED': 0})
+        self.product.refresh_from_db()
+        self.assertFalse(self.product.inStock)
+        with self.assertRaisesMessage(InsufficientStock, 'Only 0 left'):
+            CartItem.objects.reserve(Cart.objects.create(), self.medium, 1)
+
+        CartItem.objects.release(self.cart.items.filter(variant=self.medium))
+        self.assertEqual(self.stock(), {'SHIRT-M': 2, 'SHIRT-L-RED': 0})
+        self.product.refresh_from_db()
+        self.assertTrue(self.product.inStock)
+
+    def test_place_order_with_variants(self):
+        CartItem.objects.reserve(self.cart, self.medium, 1)
+        CartItem.objects.reserve(self.cart, self.large, 1)
+        order = Order.objects.place(self.cart)
+        self.assertEqual(order.total, 65)
+        self.assertEqual(
+            sorted(order.items.values_list('productName', 'unitPrice')),
+            [('Shirt (L, Red)', 35), ('Shirt (M)', 30)],
+        )
+
+    def test_add_to_cart_needs_a_variant(self):
+        client = APIClient()
+        cart_id = client.post('/api/carts/').data['id']
+        url = f'/api/carts/{cart_id}/items/'
+        payload = {'product_id': str(self.product.pk), 'quantity': 1}
+        self.assertEqual(client.post(url, payload, format='json').status_code, 400)
+        response = client.post(url, {**payload, 'variant_id': str(self.large.pk)}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [(item['variant_id'], item['name'], item['price']) for item in response.data['items']],
+            [(str(self.large.pk), 'Shirt (L, Red)', 35)],
+        )
+
+
+class CartViewTests(StockTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='buyer@example.com', full_name='Buyer', password='password'
+        )
+
+    def add(self, cart_id, quantity=1):
+        return self.client.post(
+            f'/api/carts/{cart_id}/items/', {'product_id': str(self.product.pk), 'quantity': quantity}, format='json'
+        )
+
+    def test_checkout(self):
+        cart_id = self.client.post('/api/carts/').data['id']
+        self.assertEqual(self.add(cart_id, 2).status_code, 201)
+        self.assertEqual(self.add(cart_id, 4).status_code, 409)
+        self.assertEqual(self.add(cart_id, settings.ORDERS_MAX_LINE_QUANTITY + 1).status_code, 400)
+        response = self.client.post(f'/api/carts/{cart_id}/checkout/')
+        self.assertEqual((response.status_code, response.data['total']), (201, 40))
+
+    def test_user_carts_are_private(self):
+        self.client.force_authenticate(self.user)
+        cart_id = self.client.post('/api/carts/').data['id']
+        self.assertEqual(self.client.get(f'/api/carts/{cart_id}/').status_code, 200)
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(f'/api/carts/{cart_id}/').status_code, 404)
+        self.assertEqual(self.add(cart_id).status_code, 404)
+        self.assertEqual(self.quantity(), 5)
+
+    # Throttle classes read their rates once, at import
+    @mock.patch.object(ScopedRateThrottle, 'THROTTLE_RATES', {'carts': '2/minute'})
+    def test_cart_writes_are_throttled(self):
+        self.assertEqual(self.client.post('/api/carts/').status_code, 201)
+        self.assertEqual(self.client.post('/api/carts/').status_code, 201)
+        self.assertEqual(self.client.post('/api/carts/').status_code, 429)
+
+
+# The manifest storage needs collectstatic to have run
+@override_settings(STORAGES={
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+class StockItemAdminTests(StockTestCase):
+    def setUp(self):
+        super().setUp()
+        user = get_user_model().objects.create_superuser(
+            email='admin@example.com', full_name='Admin', password='password'
+        )
+        self.client.force_login(user)
+        self.url = f'/admin/orders/stockitem/{self.stock_item.pk}/change/'
+
+    def test_adjustment_is_applied_as_a_delta(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        # Reserved after the form was loaded
+        CartItem.objects.reserve(self.cart, self.stock_item, 2)
+        response = self.client.post(self.url, {'adjustment': 4, 'quantity': 99})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.quantity(), 7)
+
+    def test_adjustment_below_zero_is_refused(self):
+        self.client.post(self.url, {'adjustment': -6})
+        self.assertEqual(self.quantity(), 5)
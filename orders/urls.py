@@ -0,0 +1,11 @@
+from django.urls import path, include
+from rest_framework.routers import SimpleRouter
+
+from . import views
+
+router = SimpleRouter()
+router.register(r'carts', views.CartViewSet)
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
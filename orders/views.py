@@ -0,0 +1,86 @@
+from django.db.models import Prefetch, Q
+from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+from rest_framework.throttling import ScopedRateThrottle
+
+from catalog.models import Product, ProductVariant
+from .managers import EmptyCart, InsufficientStock, LineLimitExceeded
+from .models import Cart, CartItem, Order, StockItem
+from .serializers import AddToCartSerializer, CartSerializer, OrderSerializer
+
+
+class CartViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Carts are addressed by their (unguessable) id; a cart that belongs to a
+    user is only visible to that user. Adding an item reserves the stock
+    until checkout or until the reservation expires. Writes are throttled
+    and each line is capped, so one client can't hold all the stock.
+    """
+    queryset = Cart.objects.prefetch_related(
+        Prefetch('items', queryset=CartItem.objects.select_related(
+            'stock_item__product', 'variant__product', 'variant__size', 'variant__color',
+        ))
+    )
+    serializer_class = CartSerializer
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'carts'
+
+    def get_queryset(self):
+        owner = Q(user=None)
+        if self.request.user.is_authenticated:
+            owner |= Q(user=self.request.user)
+        return super().get_queryset().filter(owner)
+
+    def get_throttles(self):
+        if self.request.method in permissions.SAFE_METHODS:
+            return []
+        return super().get_throttles()
+
+    def perform_create(self, serializer):
+        user = self.request.user if self.request.user.is_authenticated else None
+        serializer.save(user=user)
+
+    def cart_response(self, cart, status_code=status.HTTP_200_OK):
+        return Response(self.get_serializer(self.get_queryset().get(pk=cart.pk)).data, status=status_code)
+
+    @action(detail=True, methods=['post'])
+    def items(self, request, pk=None):
+        cart = self.get_object()
+        serializer = AddToCartSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        product_id, variant_id = serializer.validated_data['product_id'], serializer.validated_data.get('variant_id')
+        # Products with variants keep their stock per variant
+        if variant_id:
+            stock = get_object_or_404(ProductVariant, pk=variant_id, product_id=product_id)
+        elif Product.objects.filter(pk=product_id, hasVariants=True).exists():
+            return Response({'error': "Choose a variant of this product"}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            stock = get_object_or_404(StockItem, product_id=product_id)
+        try:
+            CartItem.objects.reserve(cart, stock, serializer.validated_data['quantity'])
+        except InsufficientStock as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_409_CONFLICT)
+        except LineLimitExceeded as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return self.cart_response(cart, status.HTTP_201_CREATED)
+
+    @items.mapping.delete
+    def clear_items(self, request, pk=None):
+        cart = self.get_object()
+        CartItem.objects.release(cart.items.all())
+        return self.cart_response(cart)
+
+    @action(detail=True, methods=['post'])
+    def checkout(self, request, pk=None):
+        cart = self.get_object()
+        user = request.user if request.user.is_authenticated else cart.user
+        try:
+            order = Order.objects.place(cart, user=user)
+        except EmptyCart as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except InsufficientStock as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_409_CONFLICT)
+        order = Order.objects.prefetch_related('items').get(pk=order.pk)
+        return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)